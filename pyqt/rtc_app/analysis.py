@@ -0,0 +1,207 @@
+import asyncio
+from collections import namedtuple
+
+import numpy as np
+from av import VideoFrame
+from av.video.reformatter import VideoReformatter
+from PyQt5.QtCore import QObject, pyqtSignal
+
+
+class AnalysisResult(namedtuple('AnalysisResult', ['processor', 'score', 'boxes', 'events'])):
+    """
+    What a processor found in a frame: a score, boxes as (x, y, width, height)
+    fractions of the frame, drawn over the stream's tile, and event messages for the log.
+    """
+    __slots__ = ()
+
+
+class AnalysisFrame:
+    """
+    A decoded frame as given to the processors: `gray` is a downscaled grayscale
+    copy, converted once per analyzed frame and shared by all processors, which
+    must not modify it. `frame` is the decoded frame itself.
+    """
+    def __init__(self, frame: VideoFrame, gray: np.ndarray):
+        self.frame = frame
+        self.gray = gray
+        self.time = frame.time
+
+
+class Processor:
+    """
+    Base of the analysis processors. process() runs on an executor thread, one
+    frame at a time per stream; each stream has processor instances of its own,
+    so they may keep state between frames.
+    """
+    name = None
+
+    def process(self, frame: AnalysisFrame) -> AnalysisResult:
+        raise NotImplementedError
+
+
+def label_cells(mask: np.ndarray) -> np.ndarray:
+    """
+    Labels the 4-connected regions of a boolean grid: each cell of a region gets the
+    smallest flat index among its cells, cells outside regions get -1.
+    """
+    size = mask.size
+    labels = np.where(mask, np.arange(size).reshape(mask.shape), size)
+    while True:
+        padded = np.pad(labels, 1, constant_values=size)
+        neighbours = np.minimum.reduce([
+            labels, padded[:-2, 1:-1], padded[2:, 1:-1], padded[1:-1, :-2], padded[1:-1, 2:],
+        ])
+        spread = np.where(mask, neighbours, size)
+        if np.array_equal(spread, labels):
+            break
+        labels = spread
+    return np.where(mask, labels, -1)
+
+
+class MotionDetector(Processor):
+    """
+    Frame differencing on the shared grayscale frame. Pixels changing by more
+    than `threshold` since the previous analyzed frame count as moving; the frame
+    is divided into `cell` pixel squares, and adjoining squares with more than
+    `cell_fraction` moving pixels form the motion boxes. The score is the moving
+    fraction of the frame. Motion starts once it exceeds `min_score` and stops
+    after `hold` analyzed frames below it, each reported as an event.
+    """
+    name = "motion"
+
+    def __init__(self, threshold=25, cell=8, cell_fraction=0.2, min_score=0.002, hold=5):
+        self.threshold = threshold
+        self.cell = cell
+        self.cell_fraction = cell_fraction
+        self.min_score = min_score
+        self.hold = hold
+        self.previous = None
+        self.active = False
+        self.quiet = 0
+
+    def process(self, frame: AnalysisFrame) -> AnalysisResult:
+        gray = frame.gray
+        previous, self.previous = self.previous, gray
+        if previous is None or previous.shape != gray.shape:
+            return AnalysisResult(self.name, 0.0, [], [])
+
+        # Larger minus smaller, uint8 differences would wrap around otherwise
+        moving = np.maximum(gray, previous) - np.minimum(gray, previous) > self.threshold
+        score = float(moving.mean())
+        return AnalysisResult(self.name, score, self.boxes(moving), self.events(score))
+
+    def boxes(self, moving: np.ndarray):
+        height, width = moving.shape
+        rows, columns = height // self.cell, width // self.cell
+        if not rows or not columns:
+            return []
+        cells = moving[:rows * self.cell, :columns * self.cell].reshape(
+            rows, self.cell, columns, self.cell
+        ).mean(axis=(1, 3)) > self.cell_fraction
+        if not cells.any():
+            return []
+
+        labels = label_cells(cells)
+        cell_rows, cell_columns = np.nonzero(cells)
+        regions, region = np.unique(labels[cell_rows, cell_columns], return_inverse=True)
+        top = np.full(len(regions), rows)
+        left = np.full(len(regions), columns)
+        bottom = np.zeros(len(regions), int)
+        right = np.zeros(len(regions), int)
+        np.minimum.at(top, region, cell_rows)
+        np.minimum.at(left, region, cell_columns)
+        np.maximum.at(bottom, region, cell_rows + 1)
+        np.maximum.at(right, region, cell_columns + 1)
+        return [
+            (x / columns, y / rows, (x_end - x) / columns, (y_end - y) / rows)
+            for x, y, x_end, y_end in zip(left.tolist(), top.tolist(), right.tolist(), bottom.tolist())
+        ]
+
+    def events(self, score: float):
+        if score > self.min_score:
+            self.quiet = 0
+            if not self.active:
+                self.active = True
+                return [f"motion started ({score:.1%} of the frame)"]
+        elif self.active:
+            self.quiet += 1
+            if self.quiet >= self.hold:
+                self.active = False
+                return ["motion stopped"]
+        return []
+
+
+# Processors selectable by name
+PROCESSORS = {
+    MotionDetector.name: MotionDetector,
+}
+
+
+class AnalysisResults(QObject):
+    """
+    Latest result of each processor of a stream. `published` is emitted with the
+    results of each analyzed frame, on the thread of the receiver's event loop.
+    """
+    published = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.latest = {}
+
+    def publish(self, results):
+        for result in results:
+            self.latest[result.processor] = result
+        self.published.emit(results)
+
+
+class AnalysisStage:
+    """
+    Runs the processors of one stream on frames sampled at up to `fps` per second,
+    independent of the display rate, on `executor` (the loop's default executor if
+    None). A frame arriving while the previous one is still analyzed is skipped,
+    so analysis never queues up. Results are published on the loop.
+    """
+    def __init__(self, results: AnalysisResults, processors, executor=None, fps=5, width=160):
+        self.results = results
+        self.processors = processors
+        self.executor = executor
+        self.interval = 1 / fps
+        self.width = width
+        self.reformatter = VideoReformatter()
+        self.analyzed = 0
+        self.skipped = 0
+        self._busy = False
+        self._next = None
+
+    def submit(self, frame: VideoFrame, now: float):
+        if self._busy or (self._next is not None and now < self._next):
+            self.skipped += 1
+            return
+        self._busy = True
+        if self._next is None or now - self._next >= self.interval:
+            # First frame, or after a gap in the frames
+            self._next = now + self.interval
+        else:
+            self._next += self.interval
+        asyncio.ensure_future(self._analyze(frame))
+
+    def analyze(self, frame: VideoFrame):
+        """
+        Converts the frame for the processors and runs them, on the executor.
+        """
+        height = max(2, round(frame.height * self.width / frame.width) // 2 * 2)
+        gray = self.reformatter.reformat(frame, self.width, height, format="gray")
+        plane = gray.planes[0]
+        pixels = np.frombuffer(plane, np.uint8).reshape(height, plane.line_size)[:, :self.width]
+        analysis_frame = AnalysisFrame(frame, pixels)
+        return [processor.process(analysis_frame) for processor in self.processors]
+
+    async def _analyze(self, frame: VideoFrame):
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(self.executor, self.analyze, frame)
+            self.analyzed += 1
+            self.results.publish(results)
+        except Exception as e:
+            print(f"[❌] Frame analysis error: {e}")
+        finally:
+            self._busy = False
@@ -0,0 +1,1151 @@
+# bench.py
+# Headless benchmarks of the receiving side: python bench.py <benchmark> [options]
+
+import os
+import gc
+import sys
+import json
+import time
+import itertools
+import asyncio
+import queue
+import argparse
+import platform
+import threading
+import tempfile
+import subprocess
+import statistics
+import tracemalloc
+import multiprocessing
+from fractions import Fraction
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import aiohttp
+import numpy as np
+import qasync
+from aiohttp.test_utils import TestServer
+from aiortc import RTCIceServer, RTCPeerConnection, RTCSessionDescription, VideoStreamTrack
+import av
+from av import VideoFrame
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import Qt, QTimer, QEventLoop
+from PyQt5.QtGui import QImage, QPixmap
+
+from analysis import AnalysisFrame, AnalysisResults, AnalysisStage, MotionDetector
+from frames import FrameConverter, FrameMailbox, ConversionStage
+from metrics import StreamMetrics
+from recording import SegmentedRecorder, is_keyframe, VIDEO_CLOCK_RATE
+from streams import Stream, StreamRegistry
+from gui import VideoTile, MainWindow
+from workers import ReceiverPool, create_app
+from presentation import MODES
+from preview import JpegPreview
+from client import STAMP_BITS, SyntheticVideoTrack, read_capture_time
+import server
+
+
+def make_frames(width, height, count=8):
+    """
+    Returns decoder-like yuv420p frames with random content.
+    """
+    rng = np.random.default_rng(0)
+    return [
+        VideoFrame.from_ndarray(
+            rng.integers(0, 256, (height * 3 // 2, width), dtype=np.uint8),
+            format="yuv420p"
+        )
+        for _ in range(count)
+    ]
+
+
+def legacy_to_pixmap(frame):
+    """
+    Previous VideoReceiver conversion: ndarray, colour swap, QImage, QPixmap.
+    """
+    img = frame.to_ndarray(format="bgr24")
+    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    h, w, ch = img.shape
+    qt_image = QImage(img.data, w, h, ch * w, QImage.Format_RGB888)
+    return QPixmap.fromImage(qt_image)
+
+
+def measure(convert, frames, iterations):
+    """
+    Returns the mean time per frame in ms and the Python-visible bytes allocated per frame.
+    """
+    for frame in frames:
+        convert(frame)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    allocated = 0
+    start = time.perf_counter()
+    for index in range(iterations):
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        result = convert(frames[index % len(frames)])
+        allocated += tracemalloc.get_traced_memory()[1] - before
+        del result
+    elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+    return elapsed / iterations * 1000, allocated / iterations
+
+
+def bench_convert(args):
+    frames = make_frames(args.width, args.height)
+    converter = FrameConverter()
+    paths = {
+        "legacy (bgr24 + cvtColor + QPixmap)": legacy_to_pixmap,
+        "rgb24 reformat + QImage view": converter.to_qimage,
+    }
+
+    print(f"{args.width}x{args.height}, {args.iterations} frames")
+    print(f"{'path':<38} {'ms/frame':>9} {'traced MB/frame':>16}")
+    for name, convert in paths.items():
+        ms, allocated = measure(convert, frames, args.iterations)
+        print(f"{name:<38} {ms:>9.2f} {allocated / 1e6:>16.2f}")
+
+
+def produce(put, fps, duration, stop):
+    """
+    Puts the production time of each frame at the given rate from a separate thread.
+    """
+    interval = 1 / fps
+    deadline = time.perf_counter() + duration
+    next_frame = time.perf_counter()
+    while next_frame < deadline and not stop.is_set():
+        put(time.perf_counter())
+        next_frame += interval
+        time.sleep(max(0, next_frame - time.perf_counter()))
+
+
+def run_handoff(setup, args):
+    """
+    Runs the producer against a GUI-side consumer set up by `setup(show)` and
+    returns the latencies of the displayed frames and the number of consumer wake-ups.
+    """
+    latencies = []
+    wakeups = [0]
+
+    def show(produced):
+        wakeups[0] += 1
+        if produced is not None:
+            latencies.append(time.perf_counter() - produced)
+
+    put, cleanup = setup(show)
+    stop = threading.Event()
+    loop = QEventLoop()
+    producer = threading.Thread(target=produce, args=(put, args.fps, args.duration, stop))
+
+    def finish():
+        producer.join()
+        loop.quit()
+
+    QTimer.singleShot(int(args.duration * 1000) + 100, finish)
+    producer.start()
+    loop.exec_()
+    stop.set()
+    cleanup()
+    return latencies, wakeups[0]
+
+
+def queue_handoff(show):
+    """
+    Previous handoff: the receiver drains and refills a queue, a 30 ms timer polls it.
+    """
+    frame_queue = queue.Queue()
+
+    def put(frame):
+        while not frame_queue.empty():
+            frame_queue.get_nowait()
+        frame_queue.put_nowait(frame)
+
+    def poll():
+        try:
+            show(frame_queue.get_nowait())
+        except queue.Empty:
+            show(None)
+
+    timer = QTimer()
+    timer.timeout.connect(poll)
+    timer.start(30)
+    return put, timer.stop
+
+
+def mailbox_handoff(show):
+    mailbox = FrameMailbox()
+    mailbox.frame_ready.connect(lambda: show(mailbox.take()), Qt.QueuedConnection)
+    return mailbox.put, lambda: print(f"  mailbox counters: {mailbox.counters()}")
+
+
+def bench_handoff(args):
+    print(f"{args.fps} fps for {args.duration} s")
+    print(f"{'handoff':<22} {'shown fps':>10} {'latency ms':>11} {'p95 ms':>8} {'wake-ups/s':>11}")
+    for name, setup in (("queue + 30 ms timer", queue_handoff), ("mailbox signal", mailbox_handoff)):
+        latencies, wakeups = run_handoff(setup, args)
+        latencies = sorted(latency * 1000 for latency in latencies)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"{name:<22} {len(latencies) / args.duration:>10.1f} {statistics.mean(latencies):>11.2f} "
+              f"{p95:>8.2f} {wakeups / args.duration:>11.1f}")
+
+
+def full_size_paint(converter, width, height):
+    """
+    Previous paint: the frame converted at its source size, the pixmap scaled to the tile.
+    """
+    def convert_and_paint(frame):
+        pixmap = QPixmap.fromImage(converter.to_qimage(frame))
+        return pixmap.scaled(width, height, aspectRatioMode=1)
+    return convert_and_paint
+
+
+def tile_size_paint(converter, width, height):
+    """
+    The frame converted at the tile size, the pixmap painted as is.
+    """
+    def convert_and_paint(frame):
+        return QPixmap.fromImage(converter.to_qimage(frame, (width, height)))
+    return convert_and_paint
+
+
+def bench_mosaic(args):
+    """
+    Per-second cost of showing N streams in mosaic tiles, converting at full size
+    and scaling the pixmap versus scaling to the tile during the conversion.
+    """
+    frames = make_frames(args.width, args.height)
+    converter = FrameConverter()
+
+    print(f"{args.width}x{args.height} at {args.fps:g} fps per stream, ms of work per second")
+    print(f"{'streams':>7} {'full size':>10} {'tile size':>10}")
+    for count in args.streams:
+        columns = max(1, int(np.ceil(np.sqrt(count))))
+        tile_width, tile_height = 1280 // columns, 720 // columns
+        full, _ = measure(full_size_paint(converter, tile_width, tile_height), frames, args.iterations)
+        tile, _ = measure(tile_size_paint(converter, tile_width, tile_height), frames, args.iterations)
+        print(f"{count:>7} {full * count * args.fps:>10.0f} {tile * count * args.fps:>10.0f}")
+
+
+def bench_scale(args):
+    """
+    Cost of one frame shown in a tile of the given size: the converted frame scaled
+    on paint versus the frame scaled by the tile's target size during conversion.
+    """
+    frames = make_frames(args.width, args.height, count=4)
+    tile = VideoTile(Stream(1, "scale"))
+    tile.resize(args.tile_width, args.tile_height)
+    tile.show()
+    width, height = tile.stream.target_size
+    converter = FrameConverter()
+
+    def paint_to_tile(frame):
+        tile.stream.mailbox.put(converter.to_qimage(frame, tile.stream.target_size))
+        tile.update_frame()
+
+    def legacy_paint(frame):
+        return legacy_to_pixmap(frame).scaled(width, height, aspectRatioMode=1)
+
+    paths = {
+        "legacy + scaled on paint": legacy_paint,
+        "full size + scaled on paint": full_size_paint(converter, width, height),
+        "scaled during conversion": tile_size_paint(converter, width, height),
+        "  through VideoTile": paint_to_tile,
+    }
+
+    print(f"{args.width}x{args.height} into a {width}x{height} tile, {args.iterations} frames")
+    print(f"{'path':<30} {'ms/frame':>9} {'traced MB/frame':>16} {'speedup':>8}")
+    baseline = None
+    for name, convert in paths.items():
+        ms, allocated = measure(convert, frames, args.iterations)
+        baseline = baseline or ms
+        print(f"{name:<30} {ms:>9.2f} {allocated / 1e6:>16.2f} {baseline / ms:>7.1f}x")
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0
+
+
+class TimedTile(VideoTile):
+    """
+    Mosaic tile recording how long each repaint takes on the GUI thread.
+    """
+    def __init__(self, stream, *args, **kwargs):
+        self.frame_times = []
+        super().__init__(stream, *args, **kwargs)
+
+    def update_frame(self):
+        start = time.perf_counter()
+        super().update_frame()
+        self.frame_times.append(time.perf_counter() - start)
+
+
+async def run_pipeline(count, executor, args, frames):
+    """
+    Feeds `count` streams at the given rate through their conversion stages into
+    mosaic tiles, while probing how late the event loop wakes up a sleeping task.
+    """
+    registry = StreamRegistry(metrics=args.metrics)
+    tiles = []
+    stages = []
+    for index in range(count):
+        stream = registry.add(f"synthetic {index}")
+        tile = TimedTile(stream)
+        tile.resize(1280 // max(1, int(np.ceil(np.sqrt(count)))), 360)
+        # Shown, so the tile sets the stream's target size
+        tile.show()
+        tiles.append(tile)
+        stages.append(ConversionStage(stream.mailbox, executor, metrics=stream.metrics))
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + args.duration
+
+    async def produce(stage, stream, offset):
+        next_frame = loop.time() + offset
+        index = 0
+        while next_frame < deadline:
+            await asyncio.sleep(max(0, next_frame - loop.time()))
+            stage.submit(frames[index % len(frames)], stream.target_size)
+            index += 1
+            next_frame += 1 / args.fps
+
+    lags = []
+    async def probe():
+        while loop.time() < deadline:
+            start = loop.time()
+            await asyncio.sleep(0.005)
+            lags.append(loop.time() - start - 0.005)
+
+    await asyncio.gather(probe(), *(
+        produce(stage, tile.stream, index / (args.fps * count))
+        for index, (stage, tile) in enumerate(zip(stages, tiles))
+    ))
+    await asyncio.sleep(0.2)
+
+    frame_times = [value for tile in tiles for value in tile.frame_times]
+    shown = sum(tile.stream.mailbox.delivered for tile in tiles)
+    dropped = sum(tile.stream.mailbox.dropped + stage.dropped for tile, stage in zip(tiles, stages))
+    return lags, frame_times, shown / count / args.duration, dropped
+
+
+def bench_pipeline(args):
+    frames = make_frames(args.width, args.height)
+    loop = qasync.QEventLoop(QApplication.instance())
+    asyncio.set_event_loop(loop)
+
+    print(f"{args.width}x{args.height} at {args.fps:g} fps per stream, {args.duration:g} s per run, "
+          f"metrics {'on' if args.metrics else 'off'}")
+    print(f"{'streams':>7} {'workers':>7} {'loop lag ms':>12} {'p99 ms':>7} {'gui frame ms':>13} "
+          f"{'p95 ms':>7} {'shown fps':>10} {'dropped':>8}")
+    for count in args.streams:
+        for workers in (0, args.workers):
+            executor = ThreadPoolExecutor(workers) if workers else None
+            lags, frame_times, fps, dropped = loop.run_until_complete(run_pipeline(count, executor, args, frames))
+            if executor is not None:
+                executor.shutdown()
+            print(f"{count:>7} {workers:>7} {statistics.mean(lags) * 1000:>12.2f} "
+                  f"{percentile(lags, 0.99) * 1000:>7.2f} {statistics.mean(frame_times) * 1000:>13.2f} "
+                  f"{percentile(frame_times, 0.95) * 1000:>7.2f} {fps:>10.1f} {dropped:>8}")
+
+
+def encode_clip(codec_name, width, height, count):
+    """
+    Returns the encoded frames of a moving synthetic clip, keyframes only at the start.
+    """
+    encoder = av.CodecContext.create(codec_name, "w")
+    encoder.width, encoder.height, encoder.pix_fmt = width, height, "yuv420p"
+    encoder.time_base = Fraction(1, 30)
+    encoder.bit_rate = 2_000_000
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 256, (height * 3 // 2, width * 2), dtype=np.uint8)
+    packets = []
+    for index in range(count):
+        offset = index * 8 % width
+        frame = VideoFrame.from_ndarray(np.ascontiguousarray(background[:, offset:offset + width]),
+                                        format="yuv420p")
+        frame.pts = index
+        packets += [bytes(packet) for packet in encoder.encode(frame)]
+    packets += [bytes(packet) for packet in encoder.encode(None)]
+    return packets
+
+
+def bench_record(args):
+    """
+    CPU time per frame of decoding a stream versus recording it as received.
+    """
+    mime_type = f"video/{args.codec.upper()}"
+    packets = encode_clip({"vp8": "libvpx", "h264": "libx264"}[args.codec], args.width, args.height, args.frames)
+
+    decoder = av.CodecContext.create(args.codec, "r")
+    start = time.process_time()
+    for data in packets:
+        decoder.decode(av.Packet(data))
+    decode = (time.process_time() - start) / len(packets)
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.process_time()
+        # All frames are queued at once, none may be dropped
+        recorder = SegmentedRecorder(directory, "bench", segment_duration=args.frames / 60,
+                                     max_queued=len(packets))
+        for index, data in enumerate(packets):
+            recorder.write(mime_type, data, index * VIDEO_CLOCK_RATE // 30, is_keyframe(mime_type, data))
+        recorder.close()
+        recorder._thread.join()
+        record = (time.process_time() - start) / len(packets)
+
+    print(f"{args.codec} {args.width}x{args.height}, {len(packets)} frames, "
+          f"{sum(map(len, packets)) / len(packets) / 1000:.1f} kB/frame")
+    print(f"{'path':<12} {'CPU ms/frame':>13} {'streams/core at 30 fps':>23}")
+    for name, seconds in (("decode", decode), ("passthrough", record)):
+        print(f"{name:<12} {seconds * 1000:>13.3f} {1 / (seconds * 30):>23.1f}")
+
+
+async def run_profiles(args):
+    """
+    Streams the synthetic source of client.py in each profile to the in-process server,
+    which keeps the streams hidden so it only receives them.
+    """
+    server.streams = StreamRegistry(metrics=False)
+    server.streams.stream_added.connect(lambda stream: setattr(stream, "visible", False))
+    test_server = TestServer(server.app, host="127.0.0.1")
+    await test_server.start_server()
+    client = os.path.join(os.path.dirname(os.path.abspath(__file__)), "client.py")
+
+    print(f"{'codec':>5} {'size':>9} {'fps':>4} {'max kbps':>8} {'sent fps':>9} {'kbps':>7} {'sender CPU %':>13}")
+    for codec, size, fps, max_bitrate in itertools.product(args.codecs, args.sizes, args.fps, args.max_bitrates):
+        command = [sys.executable, client, "--server", str(test_server.make_url("/offer")),
+                   "--source", "synthetic", "--size", size, "--fps", str(fps),
+                   "--codec", codec, "--duration", str(args.duration)]
+        if max_bitrate:
+            command += ["--max-bitrate", str(max_bitrate * 1000)]
+        process = await asyncio.create_subprocess_exec(*command, stdout=asyncio.subprocess.PIPE,
+                                                       stderr=asyncio.subprocess.DEVNULL)
+        stdout, _ = await process.communicate()
+        stats = json.loads(stdout.decode().strip().splitlines()[-1])
+        print(f"{codec:>5} {size:>9} {fps:>4g} {max_bitrate or '-':>8} {stats['fps']:>9.1f} "
+              f"{stats['kbps']:>7.0f} {stats['cpu_percent']:>13.1f}")
+        await wait_until(lambda: not server.pcs, 10)
+
+    await test_server.close()
+
+
+def bench_profiles(args):
+    """
+    Sender CPU and achieved framerate of client.py across capture and encoding profiles.
+    """
+    print(f"synthetic source, {args.duration:g} s per profile")
+    asyncio.run(run_profiles(args))
+
+
+class LatencyTile(VideoTile):
+    """
+    Mosaic tile reading the capture time stamped by the synthetic sender into
+    each frame it paints, recording (paint time, glass-to-glass latency) pairs.
+    """
+    def __init__(self, stream, *args, **kwargs):
+        super().__init__(stream, *args, **kwargs)
+        self.painted = []
+        self._image = None
+
+    def show_image(self, image, now):
+        self._image = image
+        super().show_image(image, now)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self._image is None:
+            return
+        now = time.monotonic()
+        image, self._image = self._image, None
+        # Frames from receiver processes point into shared memory, read through the image
+        bits = image.constBits()
+        bits.setsize(image.sizeInBytes())
+        pixels = np.frombuffer(bits, np.uint8).reshape(image.height(), image.bytesPerLine())
+        captured = read_capture_time(pixels[:, :image.width() * 3].reshape(image.height(), image.width(), 3))
+        latency = (int(now * 1000) - captured) % (1 << STAMP_BITS)
+        self.painted.append((now, latency / 1000))
+
+
+def summarize(values):
+    return {
+        "mean": round(statistics.mean(values), 2) if values else None,
+        "p50": round(percentile(values, 0.5), 2) if values else None,
+        "p95": round(percentile(values, 0.95), 2) if values else None,
+        "p99": round(percentile(values, 0.99), 2) if values else None,
+    }
+
+
+def receiver_cpu_time(pool):
+    """
+    CPU seconds used by the benchmark and its receiver processes, if any (Linux).
+    """
+    seconds = time.process_time()
+    for receiver in (pool.processes if pool is not None else ()):
+        with open(f"/proc/{receiver.process.pid}/stat") as stat:
+            fields = stat.read().rsplit(")", 1)[1].split()
+        seconds += (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    return seconds
+
+
+async def run_loopback(url, size, count, args, pool=None):
+    """
+    Streams `count` synthetic client.py senders to the server, shown in an offscreen
+    main window, and returns the measurements of each stream.
+    """
+    registry = StreamRegistry()
+    server.streams = registry
+    if pool is not None:
+        pool.streams = registry
+    window = MainWindow(registry)
+    window.mosaic.tile_class = LatencyTile
+    window.show()
+
+    # Connected after the window, so its tile already exists
+    paints = []
+    registry.stream_added.connect(lambda stream: paints.append(window.mosaic.tiles[stream.id].painted))
+
+    client = os.path.join(os.path.dirname(os.path.abspath(__file__)), "client.py")
+    cpu_start, wall_start = receiver_cpu_time(pool), time.monotonic()
+    clients = []
+    for index in range(count):
+        clients.append(subprocess.Popen(
+            [sys.executable, client, "--server", url, "--source", "synthetic", "--size", size,
+             "--fps", str(args.fps), "--stamp", "--duration", str(args.duration)],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        ))
+        # One at a time, so the n-th stream belongs to the n-th sender
+        await wait_until(lambda: len(paints) > index, args.timeout)
+    while any(process.poll() is None for process in clients):
+        await asyncio.sleep(0.05)
+    receiver_cpu = (receiver_cpu_time(pool) - cpu_start) / (time.monotonic() - wall_start) * 100
+
+    results = []
+    for process, painted in zip(clients, paints):
+        stats = json.loads(process.stdout.read().decode().strip().splitlines()[-1])
+        # Latency and rate once the stream has run for a second
+        steady = [(moment, latency) for moment, latency in painted if moment > painted[0][0] + 1] if painted else []
+        results.append({
+            "setup_ms": round(stats["setup_seconds"] * 1000, 1),
+            "first_frame_ms": round((painted[0][0] - stats["started"]) * 1000, 1) if painted else None,
+            "latency_ms": summarize([latency * 1000 for _, latency in steady]),
+            "sent_fps": stats["fps"],
+            "shown_fps": round((len(steady) - 1) / (steady[-1][0] - steady[0][0]), 1) if len(steady) > 1 else 0,
+            "sender_cpu_percent": stats["cpu_percent"],
+            "kbps": stats["kbps"],
+        })
+
+    await wait_until(lambda: not server.pcs and not registry.streams, args.timeout)
+    window.close()
+    window.deleteLater()
+    return {
+        "size": size,
+        "streams": count,
+        "receiver_cpu_percent_per_stream": round(receiver_cpu / count, 1),
+        "setup_ms": summarize([result["setup_ms"] for result in results]),
+        "first_frame_ms": summarize([result["first_frame_ms"] for result in results if result["first_frame_ms"]]),
+        "latency_p50_ms": summarize([result["latency_ms"]["p50"] for result in results if result["latency_ms"]["p50"]]),
+        "shown_fps": summarize([result["shown_fps"] for result in results]),
+        "per_stream": results,
+    }
+
+
+async def run_loopback_suite(args):
+    app, pool = server.app, None
+    if args.receiver_processes:
+        pool = ReceiverPool(StreamRegistry(), args.receiver_processes, {
+            "metrics": True, "recording_dir": None, "segment_duration": server.SEGMENT_DURATION,
+            "ice_servers": None, "ring_slots": 4, "ring_max_size": (1920, 1080), "conversion_workers": args.workers,
+            "analysis": [], "analysis_fps": server.ANALYSIS_FPS, "analysis_width": server.ANALYSIS_WIDTH,
+            "analysis_workers": 0, "preview_fps": server.PREVIEW_FPS, "preview_workers": 1,
+        })
+        await pool.start()
+        app = create_app(pool)
+    test_server = TestServer(app, host="127.0.0.1")
+    await test_server.start_server()
+    url = str(test_server.make_url("/offer"))
+    runs = []
+    for size in args.sizes:
+        for count in args.streams:
+            run = await run_loopback(url, size, count, args, pool)
+            print(f"{size:>9} x{count:<3} setup {run['setup_ms']['mean']} ms, first frame "
+                  f"{run['first_frame_ms']['mean']} ms, latency p50 {run['latency_p50_ms']['mean']} ms, "
+                  f"{run['shown_fps']['mean']} fps shown, receiver CPU "
+                  f"{run['receiver_cpu_percent_per_stream']} %/stream", file=sys.stderr)
+            runs.append(run)
+    await test_server.close()
+    return runs
+
+
+def bench_loopback(args):
+    """
+    End-to-end media path over loopback: client.py senders with a capture-time
+    stamped synthetic source, the server's offer handler and receivers in-process
+    or in receiver processes, and the main window on the offscreen Qt platform.
+    Emits JSON.
+    """
+    loop = qasync.QEventLoop(QApplication.instance())
+    asyncio.set_event_loop(loop)
+    # Receiver processes are stopped after the last window closed
+    QApplication.instance().setQuitOnLastWindowClosed(False)
+    if args.workers and not args.receiver_processes:
+        server.conversion_executor = ThreadPoolExecutor(args.workers, thread_name_prefix="convert")
+
+    runs = loop.run_until_complete(run_loopback_suite(args))
+    report = {
+        "benchmark": "loopback",
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "machine": {"platform": platform.platform(), "cpus": os.cpu_count(), "python": platform.python_version()},
+        "config": {"fps": args.fps, "duration": args.duration, "workers": args.workers,
+                   "receiver_processes": args.receiver_processes},
+        "runs": runs,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+async def run_trickle(args):
+    """
+    Connects client.py senders with and without trickle ICE, with both sides
+    configured with the STUN server, and returns their setup times.
+    """
+    server.streams = StreamRegistry(metrics=False)
+    server.ice_servers = [RTCIceServer(args.stun)]
+    test_server = TestServer(server.app, host="127.0.0.1")
+    await test_server.start_server()
+    client = os.path.join(os.path.dirname(os.path.abspath(__file__)), "client.py")
+
+    setups = {}
+    for trickle in (False, True):
+        setups[trickle] = []
+        for _ in range(args.runs):
+            command = [sys.executable, client, "--server", str(test_server.make_url("/offer")),
+                       "--source", "synthetic", "--ice-server", args.stun, "--duration", "0.5"]
+            if trickle:
+                command.append("--trickle")
+            process = await asyncio.create_subprocess_exec(*command, stdout=asyncio.subprocess.PIPE,
+                                                           stderr=asyncio.subprocess.DEVNULL)
+            stdout, _ = await process.communicate()
+            setups[trickle].append(json.loads(stdout.decode().strip().splitlines()[-1])["setup_seconds"])
+            await wait_until(lambda: not server.pcs, args.timeout)
+
+    await test_server.close()
+    return setups
+
+
+def bench_trickle(args):
+    """
+    Connection setup time with complete offer/answer versus trickle ICE.
+    """
+    print(f"STUN server {args.stun}, {args.runs} connections each")
+    setups = asyncio.run(run_trickle(args))
+    print(f"{'signaling':<22} {'setup ms':>9} {'max ms':>7}")
+    for trickle, name in ((False, "complete offer/answer"), (True, "trickle ICE")):
+        values = [value * 1000 for value in setups[trickle]]
+        print(f"{name:<22} {statistics.mean(values):>9.1f} {max(values):>7.1f}")
+
+
+def moving_square_frames(width, height, count):
+    """
+    Returns yuv420p frames of a bright square moving across a grey background.
+    """
+    frames = []
+    side = height // 6
+    for index in range(count):
+        image = np.full((height * 3 // 2, width), 128, np.uint8)
+        x = index * 8 % (width - side)
+        image[height // 3:height // 3 + side, x:x + side] = 235
+        frame = VideoFrame.from_ndarray(image, format="yuv420p")
+        frame.pts, frame.time_base = index * 3000, Fraction(1, VIDEO_CLOCK_RATE)
+        frames.append(frame)
+    return frames
+
+
+def full_resolution_motion(detector):
+    """
+    The motion detector on the full resolution luma plane, without the shared downscaled frame.
+    """
+    def analyze(frame):
+        return detector.process(AnalysisFrame(frame, frame.to_ndarray(format="gray")))
+    return analyze
+
+
+async def run_analysis_sampling(frames, args):
+    """
+    Feeds frames at `args.fps` through an AnalysisStage sampling `args.analysis_fps`,
+    returning the analyzed and skipped counts and the motion events.
+    """
+    results = AnalysisResults()
+    events = []
+    results.published.connect(lambda published: events.extend(event for result in published
+                                                               for event in result.events))
+    stage = AnalysisStage(results, [MotionDetector()], None, args.analysis_fps, args.analysis_width)
+    start = time.perf_counter()
+    for index in range(int(args.duration * args.fps)):
+        await asyncio.sleep(max(0, start + index / args.fps - time.perf_counter()))
+        stage.submit(frames[index % len(frames)], time.perf_counter())
+    await asyncio.sleep(0.2)
+    return stage.analyzed, stage.skipped, events
+
+
+def bench_analysis(args):
+    """
+    Throughput of the analysis stage per frame: the motion detector on the shared
+    downscaled grayscale frame versus full resolution, and N processors sharing the
+    downscaled frame versus converting it each. Then the sampling of a live stream.
+    """
+    frames = moving_square_frames(args.width, args.height, 16)
+    stage = AnalysisStage(AnalysisResults(), [MotionDetector() for _ in range(args.processors)],
+                          fps=args.analysis_fps, width=args.analysis_width)
+    separate = [AnalysisStage(AnalysisResults(), [MotionDetector()], width=args.analysis_width)
+                for _ in range(args.processors)]
+
+    paths = {
+        "motion, full resolution": full_resolution_motion(MotionDetector()),
+        f"motion, {args.analysis_width} px wide": AnalysisStage(
+            AnalysisResults(), [MotionDetector()], width=args.analysis_width).analyze,
+        f"{args.processors} processors, shared frame": stage.analyze,
+        f"{args.processors} processors, own frames": lambda frame: [each.analyze(frame) for each in separate],
+    }
+
+    print(f"{args.width}x{args.height}, {args.iterations} frames")
+    print(f"{'path':<32} {'ms/frame':>9} {'frames/s per core':>18}")
+    for name, analyze in paths.items():
+        ms, _ = measure(analyze, frames, args.iterations)
+        print(f"{name:<32} {ms:>9.3f} {1000 / ms:>18.0f}")
+
+    analyzed, skipped, events = asyncio.run(run_analysis_sampling(frames, args))
+    print(f"{args.fps:g} fps stream sampled at {args.analysis_fps:g} fps for {args.duration:g} s: "
+          f"{analyzed} analyzed, {skipped} skipped, events {events}")
+
+
+def bench_metrics(args):
+    """
+    Cost of the metrics recorded per frame and of reading a snapshot.
+    """
+    frame = make_frames(64, 36, count=1)[0]
+    metrics = StreamMetrics()
+
+    def record_frame():
+        now = time.perf_counter()
+        metrics.frame_received(frame, now)
+        metrics.record("convert", time.perf_counter() - now)
+        metrics.record("queue_wait", time.perf_counter() - now)
+        metrics.record("paint", time.perf_counter() - now)
+        metrics.record("display", time.perf_counter() - now)
+        metrics.frame_displayed(time.perf_counter())
+
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        record_frame()
+    per_frame = (time.perf_counter() - start) / args.iterations
+
+    start = time.perf_counter()
+    for _ in range(100):
+        metrics.snapshot()
+    per_snapshot = (time.perf_counter() - start) / 100
+
+    print(f"recording per frame: {per_frame * 1e6:.2f} us "
+          f"({per_frame * args.fps * 100:.4f} % of a core at {args.fps:g} fps)")
+    print(f"snapshot per stream: {per_snapshot * 1e3:.3f} ms")
+
+
+class PaintedTile(VideoTile):
+    """
+    Mosaic tile recording the time each frame is painted.
+    """
+    def __init__(self, stream, *args, **kwargs):
+        super().__init__(stream, *args, **kwargs)
+        self.paint_times = []
+
+    def paintEvent(self, event):
+        shown = self._taken is not None
+        super().paintEvent(event)
+        if shown:
+            self.paint_times.append(time.perf_counter())
+
+
+def arrival_times(args, count):
+    """
+    Arrival times of frames sent at `args.fps`: random network jitter, plus a stall
+    every `args.burst_every` seconds after which the held frames arrive at once.
+    Frames arrive in order, as from aiortc's jitter buffer.
+    """
+    rng = np.random.default_rng(0)
+    arrivals = []
+    previous = 0
+    for index in range(count):
+        captured = index / args.fps
+        arrival = captured + rng.uniform(0, args.jitter / 1000)
+        since_stall = captured % args.burst_every
+        if since_stall < args.burst / 1000 and captured >= args.burst_every:
+            arrival = max(arrival, captured - since_stall + args.burst / 1000)
+        previous = max(previous, arrival)
+        arrivals.append(previous)
+    return arrivals
+
+
+async def run_presentation(mode, args):
+    registry = StreamRegistry()
+    stream = registry.add(mode)
+    tile = PaintedTile(stream, None, mode, args.jitter_budget / 1000)
+    tile.resize(320, 240)
+    tile.show()
+    stage = ConversionStage(stream.mailbox, metrics=stream.metrics)
+    frames = make_frames(320, 240, count=4)
+
+    count = int(args.duration * args.fps)
+    start = time.perf_counter() + 0.1
+    for index, arrival in enumerate(arrival_times(args, count)):
+        await asyncio.sleep(max(0, start + arrival - time.perf_counter()))
+        frame = frames[index % len(frames)]
+        frame.pts = round(index * VIDEO_CLOCK_RATE / args.fps)
+        frame.time_base = Fraction(1, VIDEO_CLOCK_RATE)
+        stage.submit(frame, stream.target_size)
+    await asyncio.sleep(0.5)
+
+    intervals = np.diff(tile.paint_times) * 1000
+    snapshot = stream.metrics_snapshot()
+    tile.close()
+    tile.deleteLater()
+    return {
+        "shown": len(tile.paint_times),
+        "sent": count,
+        "late": snapshot["late"],
+        "dropped": snapshot["dropped"],
+        "interval_ms": summarize(list(intervals)),
+        "interval_stdev_ms": round(float(np.std(intervals)), 2),
+        "display_ms": snapshot["latency_ms"]["display"],
+    }
+
+
+def bench_presentation(args):
+    """
+    Evenness of the frame display and display latency in the lowest latency and smooth
+    presentation modes, for frames arriving with network jitter and bursts.
+    """
+    loop = qasync.QEventLoop(QApplication.instance())
+    asyncio.set_event_loop(loop)
+    print(f"{args.fps:g} fps, up to {args.jitter:g} ms jitter, {args.burst:g} ms stall every "
+          f"{args.burst_every:g} s, {args.jitter_budget:g} ms jitter budget")
+    print(f"{'mode':<9} {'shown':>6} {'late':>5} {'interval p50/p95/p99 ms':>24} {'stdev':>6} "
+          f"{'display p50/p95/p99 ms':>23}")
+    for mode in MODES:
+        result = loop.run_until_complete(run_presentation(mode, args))
+        interval, display = result["interval_ms"], result["display_ms"]
+        print(f"{mode:<9} {result['shown']:>6} {result['late']:>5} "
+              f"{interval['p50']:>8.1f}/{interval['p95']:.1f}/{interval['p99']:.1f} "
+              f"{result['interval_stdev_ms']:>11.1f} "
+              f"{display['p50']:>9.1f}/{display['p95']:.1f}/{display['p99']:.1f}")
+
+
+async def watch_previews(url, clients, duration):
+    """
+    Opens `clients` MJPEG previews of a stream at once, returning the JPEG parts each received.
+    """
+    async def watch(session):
+        parts = 0
+        try:
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=duration)) as response:
+                async for chunk in response.content.iter_any():
+                    parts += chunk.count(f"--{server.MJPEG_BOUNDARY}\r\n".encode())
+        except (asyncio.TimeoutError, aiohttp.ClientError):
+            # Stopped by the timeout, or the receiver stopped first
+            pass
+        return parts
+
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        return await asyncio.gather(*(watch(session) for _ in range(clients)))
+
+
+def run_preview_clients(url, clients, duration, connection):
+    """
+    Entry point of the process running the preview viewers, off the server's event loop.
+    """
+    connection.send(asyncio.run(watch_previews(url, clients, duration)) if clients else [])
+
+
+async def run_preview(clients, test_server, executor, args):
+    """
+    Receives a synthetic track through server.VideoReceiver, with `clients` viewers
+    of its MJPEG preview in another process, while probing the event-loop lag.
+    """
+    # Hidden, so only the preview adds to the cost of receiving
+    stream = server.streams.add("synthetic", visible=False)
+    stream.preview = JpegPreview(executor)
+    receiver = server.VideoReceiver(SyntheticVideoTrack(args.width, args.height, args.fps), stream)
+    url = str(test_server.make_url(f"/streams/{stream.id}/preview.mjpg"))
+
+    connection, child_connection = multiprocessing.Pipe()
+    viewers = multiprocessing.get_context("spawn").Process(
+        target=run_preview_clients, args=(url, clients, args.duration + 1, child_connection), daemon=True)
+    viewers.start()
+    # Viewers connected, and the process past its imports
+    await asyncio.sleep(1)
+
+    loop = asyncio.get_running_loop()
+    lags = []
+    receiving = asyncio.ensure_future(receiver.run())
+    start = time.perf_counter()
+    while time.perf_counter() - start < args.duration:
+        before = loop.time()
+        await asyncio.sleep(0.005)
+        lags.append(loop.time() - before - 0.005)
+    received, encoded = stream.metrics.received.total, stream.preview.encoded
+
+    receiver.running = False
+    await receiving
+    parts = await loop.run_in_executor(None, connection.recv)
+    viewers.join()
+    return {
+        "receive_fps": received / args.duration,
+        "lag_p99_ms": percentile(lags, 0.99) * 1000,
+        "encoded": encoded,
+        "delivered": sum(parts),
+        "client_fps": statistics.mean(parts) / args.duration if parts else 0,
+    }
+
+
+async def run_previews(args):
+    server.streams = StreamRegistry()
+    server.PREVIEW_FPS = args.preview_fps
+    executor = server.preview_executor = ThreadPoolExecutor(1, thread_name_prefix="preview")
+    test_server = TestServer(server.app, host="127.0.0.1")
+    await test_server.start_server()
+    results = [await run_preview(clients, test_server, executor, args) for clients in args.clients]
+    await test_server.close()
+    executor.shutdown()
+    return results
+
+
+def bench_preview(args):
+    """
+    Cost of the MJPEG previews for the receive path: a stream received at `fps` with
+    0 to N viewers, each JPEG encoded once on the preview executor and shared by all.
+    """
+    print(f"{args.width}x{args.height} at {args.fps:g} fps, previews at up to {args.preview_fps:g} fps, "
+          f"{args.duration:g} s per run")
+    print(f"{'viewers':>7} {'receive fps':>12} {'loop lag p99 ms':>16} {'encoded':>8} {'delivered':>10} "
+          f"{'fps per viewer':>15}")
+    for clients, result in zip(args.clients, asyncio.run(run_previews(args))):
+        print(f"{clients:>7} {result['receive_fps']:>12.1f} {result['lag_p99_ms']:>16.2f} "
+              f"{result['encoded']:>8} {result['delivered']:>10} {result['client_fps']:>15.1f}")
+
+
+def process_usage():
+    """
+    Returns the resident set size in MB and the number of open file descriptors (Linux).
+    """
+    with open("/proc/self/status") as status:
+        rss = next(int(line.split()[1]) for line in status if line.startswith("VmRSS:"))
+    return rss / 1024, len(os.listdir("/proc/self/fd"))
+
+
+async def wait_until(condition, timeout):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise asyncio.TimeoutError
+        await asyncio.sleep(0.01)
+
+
+async def soak_cycle(session, url, timeout):
+    """
+    Connects a synthetic sender, waits for its first frame on the receiving side,
+    disconnects it and waits until the server has torn the connection down.
+    """
+    pc = RTCPeerConnection()
+    try:
+        pc.addTrack(VideoStreamTrack())
+        await pc.setLocalDescription(await pc.createOffer())
+        async with session.post(url, json={
+            "sdp": {"type": pc.localDescription.type, "sdp": pc.localDescription.sdp}
+        }) as resp:
+            answer = await resp.json()
+        await pc.setRemoteDescription(RTCSessionDescription(**answer["sdp"]))
+        await wait_until(lambda: any(stream.mailbox.received for stream in server.streams.streams.values()),
+                         timeout)
+    finally:
+        await pc.close()
+    await wait_until(lambda: not server.pcs and not server.streams.streams, timeout)
+
+
+async def run_soak(args):
+    server.streams = StreamRegistry()
+    test_server = TestServer(server.app, host="127.0.0.1")
+    await test_server.start_server()
+    url = test_server.make_url("/offer")
+
+    samples = []
+    failures = 0
+    async with aiohttp.ClientSession() as session:
+        for cycle in range(1, args.cycles + 1):
+            try:
+                await soak_cycle(session, url, args.timeout)
+            except asyncio.TimeoutError:
+                failures += 1
+            if cycle % args.sample_every == 0 or cycle == args.cycles:
+                gc.collect()
+                rss, fds = process_usage()
+                samples.append((cycle, rss, fds))
+                print(f"{cycle:>7} {rss:>8.1f} {fds:>5} {len(server.pcs):>5} {failures:>9}")
+
+    await test_server.close()
+    return samples, failures
+
+
+def bench_soak(args):
+    """
+    Connects and disconnects a synthetic sender over and over, checking that memory
+    and file descriptors stay flat once the first cycles have warmed up the process.
+    """
+    print(f"{args.cycles} connect/disconnect cycles")
+    print(f"{'cycle':>7} {'RSS MB':>8} {'fds':>5} {'peers':>5} {'timeouts':>9}")
+    samples, failures = asyncio.run(run_soak(args))
+
+    # Compared from the first sample after warm-up, when caches and pools are filled
+    _, warm_rss, warm_fds = samples[min(len(samples) - 1, len(samples) // 10)]
+    _, last_rss, last_fds = samples[-1]
+    print(f"after warm-up: RSS {last_rss - warm_rss:+.1f} MB, fds {last_fds - warm_fds:+d}, "
+          f"{failures} cycles timed out")
+    if last_rss - warm_rss > args.max_rss_growth or last_fds > warm_fds or failures:
+        sys.exit("soak failed: resources grew or cycles timed out")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Receiver benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    convert = subparsers.add_parser("convert", help="Frame conversion cost per frame")
+    convert.add_argument("--width", type=int, default=1920)
+    convert.add_argument("--height", type=int, default=1080)
+    convert.add_argument("--iterations", type=int, default=300)
+    convert.set_defaults(run=bench_convert)
+
+    handoff = subparsers.add_parser("handoff", help="Frame handoff from the receiver to the GUI")
+    handoff.add_argument("--fps", type=float, default=60)
+    handoff.add_argument("--duration", type=float, default=3)
+    handoff.set_defaults(run=bench_handoff)
+
+    mosaic = subparsers.add_parser("mosaic", help="Conversion and paint cost of N streams in a mosaic")
+    mosaic.add_argument("--streams", type=int, nargs="+", default=[1, 4, 8, 16])
+    mosaic.add_argument("--width", type=int, default=1920)
+    mosaic.add_argument("--height", type=int, default=1080)
+    mosaic.add_argument("--fps", type=float, default=30)
+    mosaic.add_argument("--iterations", type=int, default=100)
+    mosaic.set_defaults(run=bench_mosaic)
+
+    scale = subparsers.add_parser("scale", help="Scaling to the tile size during conversion versus on paint")
+    scale.add_argument("--width", type=int, default=3840)
+    scale.add_argument("--height", type=int, default=2160)
+    scale.add_argument("--tile-width", type=int, default=640)
+    scale.add_argument("--tile-height", type=int, default=480)
+    scale.add_argument("--iterations", type=int, default=100)
+    scale.set_defaults(run=bench_scale)
+
+    pipeline = subparsers.add_parser("pipeline", help="Event-loop lag and GUI frame time with N streams, "
+                                                      "converting on the loop versus in a thread pool")
+    pipeline.add_argument("--streams", type=int, nargs="+", default=[1, 4, 8])
+    pipeline.add_argument("--workers", type=int, default=4)
+    pipeline.add_argument("--width", type=int, default=1920)
+    pipeline.add_argument("--height", type=int, default=1080)
+    pipeline.add_argument("--fps", type=float, default=30)
+    pipeline.add_argument("--duration", type=float, default=3)
+    pipeline.add_argument("--metrics", action=argparse.BooleanOptionalAction, default=True)
+    pipeline.set_defaults(run=bench_pipeline)
+
+    soak = subparsers.add_parser("soak", help="Connect/disconnect cycles against the server, "
+                                              "checking RSS and open file descriptors stay flat (Linux)")
+    soak.add_argument("--cycles", type=int, default=2000)
+    soak.add_argument("--sample-every", type=int, default=100)
+    soak.add_argument("--timeout", type=float, default=10, help="Seconds a cycle step may take")
+    soak.add_argument("--max-rss-growth", type=float, default=20, help="MB allowed after warm-up")
+    soak.set_defaults(run=bench_soak)
+
+    record = subparsers.add_parser("record", help="Decoding versus passthrough recording cost per frame")
+    record.add_argument("--codec", choices=("vp8", "h264"), default="vp8")
+    record.add_argument("--width", type=int, default=1280)
+    record.add_argument("--height", type=int, default=720)
+    record.add_argument("--frames", type=int, default=300)
+    record.set_defaults(run=bench_record)
+
+    profiles = subparsers.add_parser("profiles", help="Sender CPU and framerate across client.py profiles")
+    profiles.add_argument("--codecs", nargs="+", default=["VP8", "H264"])
+    profiles.add_argument("--sizes", nargs="+", default=["640x480", "1280x720"])
+    profiles.add_argument("--fps", type=float, nargs="+", default=[15, 30])
+    profiles.add_argument("--max-bitrates", type=int, nargs="+", default=[0],
+                          help="Bitrate caps in kbit/s, 0 for aiortc's own limit")
+    profiles.add_argument("--duration", type=float, default=5)
+    profiles.set_defaults(run=bench_profiles)
+
+    loopback = subparsers.add_parser("loopback", help="End-to-end setup, first frame, latency, FPS and CPU "
+                                                      "of synthetic senders over loopback, as JSON")
+    loopback.add_argument("--sizes", nargs="+", default=["640x480", "1280x720"])
+    loopback.add_argument("--streams", type=int, nargs="+", default=[1, 4])
+    loopback.add_argument("--fps", type=float, default=30)
+    loopback.add_argument("--duration", type=float, default=5, help="Seconds each sender streams")
+    loopback.add_argument("--workers", type=int, default=min(8, os.cpu_count() or 1))
+    loopback.add_argument("--receiver-processes", type=int, default=0,
+                          help="Receive in this many processes, as main.py --receiver-processes")
+    loopback.add_argument("--timeout", type=float, default=20)
+    loopback.add_argument("--output", help="JSON file to write, stdout by default")
+    loopback.set_defaults(run=bench_loopback)
+
+    trickle = subparsers.add_parser("trickle", help="Connection setup time with and without trickle ICE")
+    trickle.add_argument("--stun", default="stun:192.0.2.1:3478",
+                         help="STUN server URL, unreachable by default (TEST-NET-1)")
+    trickle.add_argument("--runs", type=int, default=5)
+    trickle.add_argument("--timeout", type=float, default=30)
+    trickle.set_defaults(run=bench_trickle)
+
+    metrics = subparsers.add_parser("metrics", help="Overhead of the pipeline metrics")
+    metrics.add_argument("--iterations", type=int, default=100000)
+    metrics.add_argument("--fps", type=float, default=60)
+    metrics.set_defaults(run=bench_metrics)
+
+    analysis = subparsers.add_parser("analysis", help="Analysis stage throughput and sampling")
+    analysis.add_argument("--width", type=int, default=1280)
+    analysis.add_argument("--height", type=int, default=720)
+    analysis.add_argument("--iterations", type=int, default=200)
+    analysis.add_argument("--processors", type=int, default=3)
+    analysis.add_argument("--analysis-width", type=int, default=server.ANALYSIS_WIDTH)
+    analysis.add_argument("--analysis-fps", type=float, default=server.ANALYSIS_FPS)
+    analysis.add_argument("--fps", type=float, default=30)
+    analysis.add_argument("--duration", type=float, default=3)
+    analysis.set_defaults(run=bench_analysis)
+
+    presentation = subparsers.add_parser("presentation", help="Display evenness and latency of the lowest "
+                                                              "latency and smooth modes under jitter")
+    presentation.add_argument("--fps", type=float, default=30)
+    presentation.add_argument("--duration", type=float, default=10)
+    presentation.add_argument("--jitter", type=float, default=30, help="Highest network jitter in ms")
+    presentation.add_argument("--burst", type=float, default=150, help="Length of each stall in ms")
+    presentation.add_argument("--burst-every", type=float, default=2, help="Seconds between stalls")
+    presentation.add_argument("--jitter-budget", type=float, default=50, help="Smooth mode budget in ms")
+    presentation.set_defaults(run=bench_presentation)
+
+    preview = subparsers.add_parser("preview", help="Receive rate and event-loop lag with N MJPEG preview viewers")
+    preview.add_argument("--clients", type=int, nargs="+", default=[0, 1, 10, 50])
+    preview.add_argument("--width", type=int, default=1280)
+    preview.add_argument("--height", type=int, default=720)
+    preview.add_argument("--fps", type=float, default=30)
+    preview.add_argument("--preview-fps", type=float, default=server.PREVIEW_FPS)
+    preview.add_argument("--duration", type=float, default=5)
+    preview.set_defaults(run=bench_preview)
+
+    args = parser.parse_args()
+
+    # Benchmarks run without a display
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    # Referenced for the whole run, PyQt destroys an unreferenced QApplication at once
+    args.qt_app = QApplication(sys.argv[:1])
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
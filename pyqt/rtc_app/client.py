@@ -1,44 +1,313 @@
 # client.py
 
+import sys
+import json
+import time
 import asyncio
+import argparse
+import fractions
 import aiohttp
-from aiortc import RTCPeerConnection, RTCSessionDescription
+import numpy as np
+from aiortc import (
+    RTCConfiguration,
+    RTCIceServer,
+    RTCPeerConnection,
+    RTCSessionDescription,
+    RTCRtpSender,
+    MediaStreamTrack
+)
+from aiortc.codecs import h264, vpx
 from aiortc.contrib.media import MediaPlayer
+from aiortc.sdp import SessionDescription
+from av import VideoFrame
+from yarl import URL
 
-async def run_webrtc_client():
-    pc = RTCPeerConnection()
-    print("WEBRtc client initialized...")
+from trickle import exchange_candidates, trickle_configuration
 
-    player = MediaPlayer("/dev/video0")
-    video_track = player.video
-    pc.addTrack(video_track)
+# Clock of RTP video timestamps
+VIDEO_CLOCK_RATE = 90000
+
+# Seconds to wait for the connection to be established
+CONNECT_TIMEOUT = 30
+
+# Bits of the capture time stamped into synthetic frames, in ms of time.monotonic()
+STAMP_BITS = 24
+
+
+def parse_size(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="WebRTC video sender")
+    parser.add_argument("--server", default="http://127.0.0.1:8080/offer", help="Offer URL of the receiver")
+    parser.add_argument("--trickle", action="store_true",
+                        help="Send the offer at once and trickle candidates over the receiver's /trickle WebSocket")
+    parser.add_argument("--ice-server", action="append", dest="ice_servers", metavar="URL",
+                        help="STUN or TURN server URL, repeat for several; aiortc's default STUN server if none")
+    parser.add_argument("--source", default="/dev/video0",
+                        help="Camera device, video file, or 'synthetic' for a generated test pattern")
+    parser.add_argument("--size", type=parse_size, help="Capture size as WIDTHxHEIGHT")
+    parser.add_argument("--fps", type=float, help="Capture framerate")
+    parser.add_argument("--pixel-format", help="Capture pixel format, e.g. yuyv422, mjpeg or yuv420p")
+    parser.add_argument("--codec", action="append", dest="codecs", metavar="NAME",
+                        help="Preferred codec, e.g. H264 or VP8; repeat in order of preference")
+    parser.add_argument("--max-bitrate", type=int, help="Highest bitrate the encoder may use, in bits/s")
+    parser.add_argument("--stamp", action="store_true",
+                        help="Stamp the capture time into synthetic frames, for latency measurements")
+    parser.add_argument("--duration", type=float,
+                        help="Seconds to stream before printing stats as JSON and exiting")
+    return parser.parse_args(argv)
+
+
+class SyntheticVideoTrack(MediaStreamTrack):
+    """
+    Moving test pattern at the given size, framerate and pixel format,
+    so the sender can be measured without a camera.
+    With `stamp`, a band across the top of each frame carries its capture time
+    (see stamp_capture_time()), which the receiver can read back after decoding.
+    """
+    kind = "video"
+
+    def __init__(self, width=640, height=480, fps=30, pixel_format="yuv420p", stamp=False):
+        super().__init__()
+        self.fps = fps
+        self.pixel_format = pixel_format
+        self.stamp = stamp
+        # Blocks of random shades twice as wide as a frame, each frame is a window
+        # sliding over it; compressible like camera video, unlike pixel noise
+        rng = np.random.default_rng(0)
+        blocks = rng.integers(0, 256, (height * 3 // 64 + 1, width // 16 + 1), dtype=np.uint8)
+        self.pattern = np.repeat(np.repeat(blocks, 32, axis=0), 32, axis=1)[:height * 3 // 2, :width * 2]
+        self.width = width
+        self.count = 0
+        self.start = None
+
+    async def recv(self):
+        if self.start is None:
+            self.start = time.perf_counter()
+        else:
+            await asyncio.sleep(max(0, self.start + self.count / self.fps - time.perf_counter()))
+
+        offset = self.count * 4 % self.width
+        image = np.ascontiguousarray(self.pattern[:, offset:offset + self.width])
+        if self.stamp:
+            stamp_capture_time(image, self.width, len(image) * 2 // 3)
+        frame = VideoFrame.from_ndarray(image, format="yuv420p")
+        if self.pixel_format != "yuv420p":
+            frame = frame.reformat(format=self.pixel_format)
+        frame.pts = round(self.count * VIDEO_CLOCK_RATE / self.fps)
+        frame.time_base = fractions.Fraction(1, VIDEO_CLOCK_RATE)
+        self.count += 1
+        return frame
+
+
+def stamp_capture_time(image, width, height):
+    """
+    Draws the current time.monotonic() in ms, modulo 2 ** STAMP_BITS, as black and
+    white blocks across the top eighth of a yuv420p image, one block per bit.
+    Chroma under the band is neutral, so the blocks stay grey once converted to RGB.
+    """
+    value = int(time.monotonic() * 1000) % (1 << STAMP_BITS)
+    band = height // 8
+    for bit in range(STAMP_BITS):
+        left, right = bit * width // STAMP_BITS, (bit + 1) * width // STAMP_BITS
+        image[:band, left:right] = 255 if value >> bit & 1 else 0
+    # U and V planes follow Y, each row of the array holds two chroma rows
+    for plane_start in (height, height + height // 4):
+        image[plane_start:plane_start + band // 4 + 1] = 128
+
+
+def read_capture_time(rgb):
+    """
+    Reads the capture time stamped by stamp_capture_time() from an RGB array of
+    the frame, scaled or not. Returns the time in ms modulo 2 ** STAMP_BITS.
+    """
+    height, width = rgb.shape[:2]
+    row = rgb[height // 16]
+    value = 0
+    for bit in range(STAMP_BITS):
+        if row[(2 * bit + 1) * width // (2 * STAMP_BITS)].mean() > 128:
+            value |= 1 << bit
+    return value
+
+
+class ProfileTrack(MediaStreamTrack):
+    """
+    Relays a source track, scaled to `size` when the source can't capture at it
+    (files), and counts the frames the encoder takes.
+    """
+    kind = "video"
+
+    def __init__(self, source: MediaStreamTrack, size=None):
+        super().__init__()
+        self.source = source
+        self.size = size
+        self.frames = 0
+
+    async def recv(self):
+        frame = await self.source.recv()
+        if self.size is not None and (frame.width, frame.height) != self.size:
+            scaled = frame.reformat(width=self.size[0], height=self.size[1])
+            scaled.pts, scaled.time_base = frame.pts, frame.time_base
+            frame = scaled
+        self.frames += 1
+        return frame
+
+
+def open_source(args):
+    """
+    Returns the video track of the source and whether it captures at the requested size itself.
+    """
+    if args.source == "synthetic":
+        width, height = args.size or (640, 480)
+        return SyntheticVideoTrack(width, height, args.fps or 30, args.pixel_format or "yuv420p",
+                                   stamp=args.stamp), True
+
+    if args.source.startswith("/dev/video"):
+        options = {}
+        if args.size:
+            options["video_size"] = f"{args.size[0]}x{args.size[1]}"
+        if args.fps:
+            options["framerate"] = f"{args.fps:g}"
+        if args.pixel_format:
+            options["input_format"] = args.pixel_format
+        return MediaPlayer(args.source, format="v4l2", options=options).video, True
+
+    # Files play at their own rate and size
+    return MediaPlayer(args.source, loop=True).video, False
+
+
+def limit_bitrate(max_bitrate):
+    """
+    Caps the bitrate aiortc's encoders start at and adapt to from receiver estimates.
+    aiortc has no per-sender encoding parameters, the limits are module-wide.
+    """
+    for codec in (vpx, h264):
+        codec.MAX_BITRATE = max_bitrate
+        codec.DEFAULT_BITRATE = min(codec.DEFAULT_BITRATE, max_bitrate)
+        codec.MIN_BITRATE = min(codec.MIN_BITRATE, max_bitrate)
+
+
+def codec_preferences(names):
+    """
+    Returns the sender's video codecs in the order of `names`, followed by retransmission.
+    """
+    codecs = RTCRtpSender.getCapabilities("video").codecs
+    preferred = [
+        codec for name in names for codec in codecs
+        if codec.mimeType.lower() == f"video/{name}".lower()
+    ]
+    if not preferred:
+        raise ValueError(f"No supported codec among {', '.join(names)}")
+    return preferred + [codec for codec in codecs if codec.mimeType.lower() == "video/rtx"]
+
+
+async def collect_stats(pc, track, started, setup, start, cpu_start):
+    elapsed = time.perf_counter() - start
+    bytes_sent = 0
+    for report in (await pc.getSenders()[0].getStats()).values():
+        if report.type == "outbound-rtp":
+            bytes_sent += report.bytesSent
+    # The first codec of the answer is the one sent
+    codecs = SessionDescription.parse(pc.remoteDescription.sdp).media[0].rtp.codecs
+    return {
+        "started": started,
+        "setup_seconds": round(setup, 4),
+        "seconds": round(elapsed, 2),
+        "frames": track.frames,
+        "fps": round(track.frames / elapsed, 1),
+        "kbps": round(bytes_sent * 8 / elapsed / 1000, 1),
+        "cpu_percent": round((time.process_time() - cpu_start) / elapsed * 100, 1),
+        "codec": codecs[0].mimeType if codecs else None,
+    }
+
+
+async def run_webrtc_client(args):
+    # time.monotonic() is shared with the receiver on the same machine
+    started = time.monotonic()
+    ice_servers = [RTCIceServer(url) for url in args.ice_servers] if args.ice_servers else None
+    # With trickle ICE only host candidates are gathered before the offer is sent
+    pc = RTCPeerConnection(trickle_configuration(ice_servers) if args.trickle
+                           else RTCConfiguration(iceServers=ice_servers))
+    print("WEBRtc client initialized...", file=sys.stderr)
+
+    # Set once the connection is established or has failed
+    connected = asyncio.Event()
+
+    @pc.on("connectionstatechange")
+    def on_connectionstatechange():
+        if pc.connectionState in ("connected", "failed", "closed"):
+            connected.set()
+
+    if args.max_bitrate:
+        limit_bitrate(args.max_bitrate)
+    source, sized = open_source(args)
+    video_track = ProfileTrack(source, None if sized else args.size)
+    transceiver = pc.addTransceiver(video_track, direction="sendonly")
+    if args.codecs:
+        transceiver.setCodecPreferences(codec_preferences(args.codecs))
 
     offer = await pc.createOffer()
     await pc.setLocalDescription(offer)
-    async with aiohttp.ClientSession() as session:
-        async with session.post("http://127.0.0.1:8080/offer", json={
-            "sdp": {
-                "type": pc.localDescription.type,
-                "sdp": pc.localDescription.sdp
-            }
-        }) as resp:
-            answer = await resp.json()
-
-    remote_desc = RTCSessionDescription(
-        sdp=answer["sdp"]["sdp"],
-        type=answer["sdp"]["type"]
-    )
-    await pc.setRemoteDescription(remote_desc)
-
-    print("✅ Client connected. Video streaming...")
-
+    session = aiohttp.ClientSession()
+    candidates = None
     try:
-        while True:
-            await asyncio.sleep(1)
+        if args.trickle:
+            ws = await session.ws_connect(URL(args.server).join(URL("trickle")))
+            await ws.send_json({
+                "sdp": {
+                    "type": pc.localDescription.type,
+                    "sdp": pc.localDescription.sdp
+                }
+            })
+            answer = await ws.receive_json()
+        else:
+            async with session.post(args.server, json={
+                "sdp": {
+                    "type": pc.localDescription.type,
+                    "sdp": pc.localDescription.sdp
+                }
+            }) as resp:
+                answer = await resp.json()
+
+        remote_desc = RTCSessionDescription(
+            sdp=answer["sdp"]["sdp"],
+            type=answer["sdp"]["type"]
+        )
+        await pc.setRemoteDescription(remote_desc)
+        if args.trickle:
+            # Runs on while connecting and streaming, until both sides sent their candidates
+            candidates = asyncio.ensure_future(exchange_candidates(ws, pc, ice_servers))
+        try:
+            # ICE may also wait for remote candidates that never come
+            await asyncio.wait_for(connected.wait(), CONNECT_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass
+        if pc.connectionState != "connected":
+            print(f"[❌] Connection {pc.connectionState}, not connected after {time.monotonic() - started:.1f} s",
+                  file=sys.stderr)
+            sys.exit(1)
+        setup = time.monotonic() - started
+
+        print("✅ Client connected. Video streaming...", file=sys.stderr)
+
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        if args.duration:
+            await asyncio.sleep(args.duration)
+            print(json.dumps(await collect_stats(pc, video_track, started, setup, start, cpu_start)))
+        else:
+            while True:
+                await asyncio.sleep(1)
     except KeyboardInterrupt:
         pass
     finally:
+        if candidates is not None:
+            candidates.cancel()
+        await session.close()
         await pc.close()
 
 if __name__ == "__main__":
-    asyncio.run(run_webrtc_client())
+    asyncio.run(run_webrtc_client(parse_args()))
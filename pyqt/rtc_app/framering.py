@@ -0,0 +1,183 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+from PyQt5.QtGui import QImage
+
+# Fields of the ring, written by the receiver process except `visible` and the
+# target size, which the GUI writes for the receiver
+HEADER_DTYPE = np.dtype([
+    ("sequence", "<i8"),       # Last frame completely written, 0 before the first one
+    ("slots", "<i4"),
+    ("capacity", "<i4"),       # Bytes of pixels per slot
+    ("max_width", "<i4"),
+    ("max_height", "<i4"),
+    ("visible", "<i4"),
+    ("target_width", "<i4"),   # 0 for the source size
+    ("target_height", "<i4"),
+])
+
+# Fields of each slot; times are time.perf_counter() values, which share
+# CLOCK_MONOTONIC between processes on Linux
+SLOT_DTYPE = np.dtype([
+    ("sequence", "<i8"),       # Frame in the slot, -1 while it is written
+    ("width", "<i4"),
+    ("height", "<i4"),
+    ("stride", "<i4"),
+    ("padding", "<i4"),
+    ("timestamp", "<f8"),      # Media time of the frame in seconds, NaN if unknown
+    ("submitted", "<f8"),
+    ("waited", "<f8"),
+    ("converted", "<f8"),
+])
+
+# Pixel rows are padded to this many bytes by swscale
+ALIGNMENT = 64
+
+
+class FrameRing:
+    """
+    RGB frames of one stream in shared memory, written by the receiver process and
+    read by the GUI process without copying: images returned by read() point into
+    the ring. There is one writer and one reader.
+
+    The writer fills the slots in turn. A slot's sequence is set to -1 while it is
+    rewritten and to the new frame's number after, so the reader can tell whether an
+    image it holds is still intact (a sequence lock). Images are only valid until the
+    writer comes around to their slot again, `slots` frames later; the GUI copies them
+    into a pixmap when showing them and checks intact() afterwards.
+    """
+    def __init__(self, memory: shared_memory.SharedMemory):
+        self.memory = memory
+        self.header = np.ndarray((), HEADER_DTYPE, memory.buf)
+        slots = int(self.header["slots"])
+        self.slots = np.ndarray((slots,), SLOT_DTYPE, memory.buf, HEADER_DTYPE.itemsize)
+        self.pixels_offset = HEADER_DTYPE.itemsize + SLOT_DTYPE.itemsize * slots
+        self.pixels = np.ndarray((slots, int(self.header["capacity"])), np.uint8, memory.buf, self.pixels_offset)
+        self.last_read = 0
+
+    @property
+    def name(self) -> str:
+        return self.memory.name
+
+    @classmethod
+    def create(cls, slots=4, max_size=(1920, 1080)) -> "FrameRing":
+        """
+        Allocates a ring for frames up to `max_size`. Pages are only backed by memory
+        once written, frames scaled down to small tiles leave most of it untouched.
+        """
+        stride = -(-max_size[0] * 3 // ALIGNMENT) * ALIGNMENT
+        capacity = stride * max_size[1]
+        size = HEADER_DTYPE.itemsize + SLOT_DTYPE.itemsize * slots + capacity * slots
+        memory = shared_memory.SharedMemory(create=True, size=size)
+        header = np.ndarray((), HEADER_DTYPE, memory.buf)
+        header["slots"], header["capacity"] = slots, capacity
+        header["max_width"], header["max_height"] = max_size
+        header["visible"] = 1
+        del header
+        return cls(memory)
+
+    @classmethod
+    def attach(cls, name: str) -> "FrameRing":
+        return cls(shared_memory.SharedMemory(name=name))
+
+    @property
+    def visible(self) -> bool:
+        return bool(self.header["visible"])
+
+    @visible.setter
+    def visible(self, visible: bool):
+        self.header["visible"] = int(visible)
+
+    @property
+    def max_size(self):
+        return int(self.header["max_width"]), int(self.header["max_height"])
+
+    @property
+    def target_size(self):
+        """
+        Size the GUI shows the stream at, bounded by the ring's largest frame.
+        """
+        width, height = int(self.header["target_width"]), int(self.header["target_height"])
+        max_width, max_height = self.max_size
+        if not width:
+            return max_width, max_height
+        return min(width, max_width), min(height, max_height)
+
+    @target_size.setter
+    def target_size(self, size):
+        self.header["target_width"], self.header["target_height"] = size or (0, 0)
+
+    def write(self, image: QImage):
+        """
+        Copies an image made by FrameConverter into the next slot.
+        """
+        plane = image.frame.planes[0]
+        sequence = int(self.header["sequence"]) + 1
+        index = sequence % len(self.slots)
+        slot = self.slots[index]
+        slot["sequence"] = -1
+        self.pixels[index, :plane.buffer_size] = np.frombuffer(plane, np.uint8)
+        slot["width"], slot["height"], slot["stride"] = image.width(), image.height(), plane.line_size
+        frame = image.frame
+        slot["timestamp"] = float(frame.pts * frame.time_base) if frame.pts is not None and frame.time_base else np.nan
+        slot["submitted"] = getattr(image, "submitted", None) or np.nan
+        slot["waited"] = getattr(image, "waited", None) or 0
+        slot["converted"] = getattr(image, "converted", None) or np.nan
+        slot["sequence"] = sequence
+        self.header["sequence"] = sequence
+
+    def read(self):
+        """
+        Returns the latest frame as an image pointing into the ring, and how many
+        frames were overwritten before they could be read. The image is None if no
+        new frame was written or the writer is rewriting its slot already.
+        """
+        sequence = int(self.header["sequence"])
+        if sequence == self.last_read:
+            return None, 0
+        missed = sequence - self.last_read - 1 if self.last_read else 0
+        self.last_read = sequence
+        index = sequence % len(self.slots)
+        slot = self.slots[index].copy()
+        if slot["sequence"] != sequence:
+            return None, missed + 1
+
+        offset = self.pixels_offset + index * int(self.header["capacity"])
+        buffer = self.memory.buf[offset:offset + int(slot["stride"]) * int(slot["height"])]
+        image = QImage(buffer, int(slot["width"]), int(slot["height"]), int(slot["stride"]), QImage.Format_RGB888)
+        # QImage does not own the pixels, the view keeps the mapping alive as long as the image
+        image.buffer = buffer
+        image.ring = self
+        image.sequence = sequence
+        image.timestamp = None if np.isnan(slot["timestamp"]) else float(slot["timestamp"])
+        if not np.isnan(slot["submitted"]):
+            image.submitted = float(slot["submitted"])
+            image.waited = float(slot["waited"])
+            image.converted = float(slot["converted"])
+        return image, missed
+
+    def intact(self, sequence: int) -> bool:
+        """
+        Tells whether the frame `sequence` is still in its slot, untouched.
+        """
+        return self.slots[sequence % len(self.slots)]["sequence"] == sequence
+
+    def close(self):
+        """
+        Unmaps the ring. While images still point into it, the mapping is left
+        to be closed once the last of them is gone.
+        """
+        if self.header is None:
+            return
+        self.header = self.slots = self.pixels = None
+        try:
+            self.memory.close()
+        except BufferError:
+            pass
+
+    def __del__(self):
+        # Images keep the ring alive, so they are gone by now
+        self.close()
+
+    def unlink(self):
+        self.memory.unlink()
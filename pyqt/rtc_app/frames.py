@@ -0,0 +1,172 @@
+import time
+import threading
+
+from av import VideoFrame
+from av.video.reformatter import VideoReformatter
+from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtGui import QImage
+
+
+def fit_size(width, height, size=None):
+    """
+    Returns the largest size with the aspect ratio of width x height that fits
+    into `size`, frames are never scaled up.
+    """
+    if size is None:
+        return width, height
+    scale = min(size[0] / width, size[1] / height, 1)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+class FrameConverter:
+    """
+    Converts decoded video frames to QImages for display.
+    swscale converts the decoded frame straight into RGB, and the QImage
+    references the pixels of that RGB frame instead of copying them.
+    Each stream uses its own converter.
+    """
+    def __init__(self, interpolation="FAST_BILINEAR"):
+        self.reformatter = VideoReformatter()
+        self.interpolation = interpolation
+        self._size_key = None
+        self._output_size = None
+
+    def output_size(self, frame: VideoFrame, size=None):
+        """
+        Returns the converted size of the frame, recomputed only when the source or target size changes.
+        """
+        key = (frame.width, frame.height, size)
+        if key != self._size_key:
+            self._size_key = key
+            self._output_size = fit_size(frame.width, frame.height, size)
+        return self._output_size
+
+    def to_qimage(self, frame: VideoFrame, size=None) -> QImage:
+        """
+        Converts the frame, downscaled during the conversion to fit `size`
+        (width, height) if given, keeping the aspect ratio.
+        """
+        width, height = self.output_size(frame, size)
+        rgb = self.reformatter.reformat(frame, width, height, format="rgb24",
+                                        interpolation=self.interpolation)
+        plane = rgb.planes[0]
+        image = QImage(plane, rgb.width, rgb.height, plane.line_size, QImage.Format_RGB888)
+
+        # QImage does not own the pixels, the frame must live as long as the image
+        image.frame = rgb
+        return image
+
+
+class FrameMailbox(QObject):
+    """
+    Single-slot handoff of the latest frame of a stream to the GUI.
+    put() replaces a frame the GUI has not taken yet (counted as dropped) and
+    emits frame_ready only when the slot was empty, so the GUI wakes up once
+    per new frame and never while no video is flowing.
+    """
+    frame_ready = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._lock = threading.Lock()
+        self._frame = None
+        self.received = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def put(self, frame):
+        with self._lock:
+            was_empty = self._frame is None
+            self._frame = frame
+            self.received += 1
+            if not was_empty:
+                self.dropped += 1
+        if was_empty:
+            self.frame_ready.emit()
+
+    def take(self):
+        """
+        Returns the latest frame, or None if it was already taken.
+        """
+        with self._lock:
+            frame, self._frame = self._frame, None
+            if frame is not None:
+                self.delivered += 1
+        return frame
+
+    def counters(self):
+        with self._lock:
+            return {
+                "received": self.received,
+                "delivered": self.delivered,
+                "dropped": self.dropped,
+            }
+
+
+class ConversionStage:
+    """
+    Converts the frames of one stream and puts them into its mailbox.
+    With an executor the conversion runs on its worker threads (PyAV and Qt release
+    the GIL while converting), otherwise inline. At most one conversion per stream
+    is in flight; a frame received meanwhile waits in a single slot and replaces
+    the one already waiting (counted as dropped), so slow conversion never queues up.
+
+    With `metrics`, converted images carry `submitted` (perf_counter time the frame
+    was submitted), `waited` (seconds until its conversion started) and `converted`
+    (time it was put into the mailbox), for the GUI to time the rest of the handoff.
+    """
+    def __init__(self, mailbox: FrameMailbox, executor=None, converter=None, metrics=None):
+        self.mailbox = mailbox
+        self.executor = executor
+        self.converter = converter or FrameConverter()
+        self.metrics = metrics
+        self._lock = threading.Lock()
+        self._busy = False
+        self._pending = None
+        self.dropped = 0
+
+    def submit(self, frame: VideoFrame, size=None):
+        submitted = time.perf_counter() if self.metrics is not None else None
+        if self.executor is None:
+            self._put(frame, size, submitted)
+            return
+
+        with self._lock:
+            if self._busy:
+                if self._pending is not None:
+                    self.dropped += 1
+                    if self.metrics is not None:
+                        self.metrics.dropped += 1
+                self._pending = (frame, size, submitted)
+                return
+            self._busy = True
+        self.executor.submit(self._convert, frame, size, submitted)
+
+    def _put(self, frame, size, submitted):
+        if self.metrics is None:
+            self.mailbox.put(self.converter.to_qimage(frame, size))
+            return
+
+        start = time.perf_counter()
+        image = self.converter.to_qimage(frame, size)
+        image.submitted = submitted
+        image.waited = start - submitted
+        image.converted = time.perf_counter()
+        self.metrics.record("convert", image.converted - start)
+        self.mailbox.put(image)
+
+    def _convert(self, frame, size, submitted):
+        try:
+            self._put(frame, size, submitted)
+        except Exception as e:
+            if self.metrics is not None:
+                self.metrics.errors += 1
+            print(f"[❌] Frame conversion error: {e}")
+
+        with self._lock:
+            pending, self._pending = self._pending, None
+            if pending is None:
+                self._busy = False
+                return
+        # Resubmitted instead of looping, so a busy stream doesn't hold on to a worker
+        self.executor.submit(self._convert, *pending)
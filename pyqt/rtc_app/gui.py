@@ -1,28 +1,235 @@
 import sys
-import queue
+import math
+import time
 from PyQt5.QtWidgets import (
     QApplication,
     QWidget,
     QListWidget,
+    QListWidgetItem,
     QPushButton,
     QLabel,
+    QSizePolicy,
+    QGridLayout,
     QHBoxLayout,
     QVBoxLayout
 )
-from PyQt5.QtCore import QTimer
-from PyQt5.QtGui import QPixmap
+from PyQt5.QtCore import Qt, QTimer, QPointF, QRectF, QSizeF
+from PyQt5.QtGui import QColor, QImage, QPainter, QPen, QPixmap
+
+from metrics import format_snapshot
+from presentation import LOWEST_LATENCY, SMOOTH, PresentationScheduler
+from streams import Stream, StreamRegistry
+
+# Analysis events kept in the log panel
+MAX_LOG_EVENTS = 500
+
+
+class VideoTile(QLabel):
+    """
+    Shows the frames of one stream.
+    The tile tells the stream its size in device pixels, so frames are scaled
+    while they are converted and painted without scaling them again.
+
+    In the lowest latency mode each frame is shown as soon as it is taken from the
+    mailbox. In the smooth mode frames are queued and shown at display refreshes by
+    their timestamps (see PresentationScheduler); Qt widgets have no vsync callback,
+    refreshes are approximated by a precise timer at the screen's refresh rate.
+    """
+    def __init__(self, stream: Stream, parent=None, presentation=LOWEST_LATENCY, jitter_budget=0.05):
+        super().__init__(stream.name, parent)
+        self.stream = stream
+        # When the frame waiting to be drawn was shown, and when it was submitted for
+        # conversion, for the paint and display metrics
+        self._taken = None
+        self._submitted = None
+        self.scheduler = None
+        if presentation == SMOOTH:
+            self.scheduler = PresentationScheduler(jitter_budget)
+            self.present_timer = QTimer(self)
+            self.present_timer.setTimerType(Qt.PreciseTimer)
+            self.present_timer.timeout.connect(self.present)
+        self.setAlignment(Qt.AlignCenter)
+        self.setMinimumSize(160, 90)
+        # The pixmap must not drive the grid layout
+        self.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Ignored)
+
+        # Repaint once per new frame; queued, so frames arriving before the
+        # GUI gets to it replace each other instead of piling up
+        stream.mailbox.frame_ready.connect(self.update_frame, Qt.QueuedConnection)
+        if stream.analysis is not None:
+            stream.analysis.published.connect(self.show_analysis)
+
+    def update_target_size(self):
+        ratio = self.devicePixelRatioF()
+        self.stream.target_size = (max(1, round(self.width() * ratio)),
+                                   max(1, round(self.height() * ratio)))
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_target_size()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.update_target_size()
+
+    def refresh_interval(self) -> float:
+        screen = self.screen()
+        rate = screen.refreshRate() if screen is not None else 0
+        return 1 / (rate if rate > 0 else 60)
+
+    def update_frame(self):
+        """
+        Takes the latest frame from the mailbox and shows it, or queues it in the smooth mode.
+        """
+        image = self.stream.mailbox.take()
+        if image is None:
+            return
+
+        now = time.perf_counter()
+        metrics = self.stream.metrics
+        if metrics is not None:
+            metrics.record("queue_wait", image.waited + now - image.converted)
+
+        if self.scheduler is None:
+            self.show_image(image, now)
+            return
+        self.scheduler.push(image, now)
+        if not self.present_timer.isActive():
+            self.present_timer.start(round(self.refresh_interval() * 1000))
+
+    def present(self):
+        """
+        Shows the frame due at this display refresh, if any.
+        """
+        now = time.perf_counter()
+        image = self.scheduler.pop(now, self.refresh_interval())
+        if not self.scheduler.frames:
+            self.present_timer.stop()
+        if self.stream.metrics is not None:
+            self.stream.metrics.late = self.scheduler.late
+        if image is not None:
+            self.show_image(image, now)
+
+    def show_image(self, image: QImage, now: float):
+        pixmap = QPixmap.fromImage(image)
+        # Images from a receiver process point into its frame ring, which may have
+        # reused the slot while the image was waiting
+        ring = getattr(image, "ring", None)
+        if ring is not None and not ring.intact(image.sequence):
+            if self.stream.metrics is not None:
+                self.stream.metrics.dropped += 1
+            return
+
+        if self.stream.metrics is not None:
+            self._taken = now
+            self._submitted = image.submitted
+
+        target_width, target_height = self.stream.target_size or (image.width(), image.height())
+        if image.width() > target_width or image.height() > target_height:
+            # Converted before the tile shrank, only until the next frame
+            pixmap = pixmap.scaled(target_width, target_height, aspectRatioMode=1)
+        pixmap.setDevicePixelRatio(self.devicePixelRatioF())
+        self.setPixmap(pixmap)
+
+    def show_analysis(self, results):
+        # Overlays are drawn from the latest results on the next paint
+        self.update()
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.stream.analysis is not None and self.stream.analysis.latest:
+            self.paint_overlays()
+        if self._taken is not None:
+            now = time.perf_counter()
+            self.stream.metrics.record("paint", now - self._taken)
+            self.stream.metrics.record("display", now - self._submitted)
+            self.stream.metrics.frame_displayed(now)
+            self._taken = None
+
+    def paint_overlays(self):
+        """
+        Draws the boxes of the latest analysis results over the frame, with each processor's score.
+        """
+        pixmap = self.pixmap()
+        if pixmap is None or pixmap.isNull():
+            return
+        size = pixmap.size() / pixmap.devicePixelRatio()
+        frame = QRectF(QPointF(), QSizeF(size))
+        frame.moveCenter(QRectF(self.contentsRect()).center())
+
+        painter = QPainter(self)
+        painter.setPen(QPen(QColor(255, 64, 64), 2))
+        lines = []
+        for result in self.stream.analysis.latest.values():
+            for x, y, width, height in result.boxes:
+                painter.drawRect(QRectF(frame.x() + x * frame.width(), frame.y() + y * frame.height(),
+                                        width * frame.width(), height * frame.height()))
+            lines.append(f"{result.processor} {result.score:.1%}")
+        painter.drawText(frame.adjusted(4, 4, -4, -4), Qt.AlignLeft | Qt.AlignTop, "\n".join(lines))
+        painter.end()
+
+
+class MosaicView(QWidget):
+    """
+    Tiles the visible streams in a grid.
+    """
+    # Widget showing each stream
+    tile_class = VideoTile
+
+    def __init__(self, parent=None, presentation=LOWEST_LATENCY, jitter_budget=0.05):
+        super().__init__(parent)
+        self.presentation = presentation
+        self.jitter_budget = jitter_budget
+        self.tiles = {}
+        self.grid_layout = QGridLayout(self)
+        self.grid_layout.setContentsMargins(0, 0, 0, 0)
+        self.grid_layout.setSpacing(2)
+
+    def add_stream(self, stream: Stream):
+        self.tiles[stream.id] = self.tile_class(stream, self, self.presentation, self.jitter_budget)
+        self.relayout()
+
+    def remove_stream(self, stream: Stream):
+        tile = self.tiles.pop(stream.id, None)
+        if tile is not None:
+            self.grid_layout.removeWidget(tile)
+            tile.deleteLater()
+            self.relayout()
+
+    def set_stream_visible(self, stream: Stream, visible: bool):
+        stream.visible = visible
+        self.relayout()
+
+    def relayout(self):
+        for tile in self.tiles.values():
+            self.grid_layout.removeWidget(tile)
+
+        visible = [tile for tile in self.tiles.values() if tile.stream.visible]
+        columns = max(1, math.ceil(math.sqrt(len(visible))))
+        for index, tile in enumerate(visible):
+            self.grid_layout.addWidget(tile, index // columns, index % columns)
+
+        for tile in self.tiles.values():
+            tile.setVisible(tile.stream.visible)
 
 
 class MainWindow(QWidget):
-    def __init__(self, frame_queue: queue.Queue):
+    def __init__(self, streams: StreamRegistry, presentation=LOWEST_LATENCY, jitter_budget=0.05):
         super().__init__()
-        self.frame_queue = frame_queue
+        self.streams = streams
+        self.presentation = presentation
+        self.jitter_budget = jitter_budget
+        self.log_events_count = 0
         self.setup_ui()
 
-        # Timer updates the image_label with new frames
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update_frame)
-        self.timer.start(30)  # 30ms interval ≈ 30 FPS
+        self.streams.stream_added.connect(self.add_stream)
+        self.streams.stream_removed.connect(self.remove_stream)
+        self.connections_list.itemChanged.connect(self.toggle_stream)
+
+        if self.streams.metrics:
+            self.metrics_timer = QTimer(self)
+            self.metrics_timer.timeout.connect(self.refresh_metrics)
+            self.metrics_timer.start(1000)
 
     def setup_ui(self):
         self.setWindowTitle("Goyda")
@@ -35,8 +242,8 @@ class MainWindow(QWidget):
         # Widgets
         self.connections_list = QListWidget(self)
         self.logs_list = QListWidget(self)
-        self.image_label = QLabel("Image Placeholder", self)
-        self.image_label.setFixedSize(640, 480)
+        self.mosaic = MosaicView(self, self.presentation, self.jitter_budget)
+        self.mosaic.setMinimumSize(640, 480)
         self.accept_connection_button = QPushButton("Accept Connection", self)
 
         # Assemble vertical layout
@@ -45,40 +252,78 @@ class MainWindow(QWidget):
 
         # Assemble horizontal layout
         self.horizontal_layout.addLayout(self.vertical_layout)
-        self.horizontal_layout.addWidget(self.image_label)
+        self.horizontal_layout.addWidget(self.mosaic)
         self.horizontal_layout.addWidget(self.logs_list)
         self.horizontal_layout.setStretch(0, 2)
         self.horizontal_layout.setStretch(1, 4)
         self.horizontal_layout.setStretch(2, 2)
 
-        # For test/demo purposes only
-        self.add_test_connections()
+    def find_item(self, list_widget: QListWidget, stream: Stream):
+        for row in range(list_widget.count()):
+            item = list_widget.item(row)
+            if item.data(Qt.UserRole) == stream.id:
+                return item
+        return None
 
-    def add_test_connections(self):
+    def add_stream(self, stream: Stream):
         """
-        Adds placeholder connection entries for testing UI.
+        Lists the new peer stream, checked streams are shown in the mosaic.
         """
-        self.connections_list.addItem("New Connection")
-        self.connections_list.addItem("Another Connection")
-        self.connections_list.addItem("Yet Another Connection")
+        item = QListWidgetItem(stream.name)
+        item.setData(Qt.UserRole, stream.id)
+        item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+        item.setCheckState(Qt.Checked if stream.visible else Qt.Unchecked)
+        self.connections_list.addItem(item)
+        self.mosaic.add_stream(stream)
+        if stream.analysis is not None:
+            stream.analysis.published.connect(lambda results: self.log_events(stream, results))
 
-    def update_frame(self):
+    def log_events(self, stream: Stream, results):
         """
-        Pulls the latest frame from the queue and updates the image label.
+        Adds the events of the analysis results to the log panel, keeping the latest MAX_LOG_EVENTS.
         """
-        try:
-            pixmap = self.frame_queue.get_nowait()
-            self.image_label.setPixmap(pixmap.scaled(
-                self.image_label.size(),
-                aspectRatioMode=1  # Keep aspect ratio
-            ))
-        except queue.Empty:
-            pass
+        stamp = time.strftime("%H:%M:%S")
+        for result in results:
+            for event in result.events:
+                self.logs_list.addItem(f"{stamp} {stream.name} {result.processor}: {event}")
+                self.log_events_count += 1
+        while self.log_events_count > MAX_LOG_EVENTS:
+            # Metrics lines carry their stream's id, events nothing
+            row = next(row for row in range(self.logs_list.count())
+                       if self.logs_list.item(row).data(Qt.UserRole) is None)
+            self.logs_list.takeItem(row)
+            self.log_events_count -= 1
+
+    def remove_stream(self, stream: Stream):
+        for list_widget in (self.connections_list, self.logs_list):
+            item = self.find_item(list_widget, stream)
+            if item is not None:
+                list_widget.takeItem(list_widget.row(item))
+        self.mosaic.remove_stream(stream)
+
+    def refresh_metrics(self):
+        """
+        Shows a metrics line per stream in the log panel, updated in place.
+        """
+        for stream in list(self.streams.streams.values()):
+            text = format_snapshot(stream.name, stream.metrics_snapshot())
+            item = self.find_item(self.logs_list, stream)
+            if item is None:
+                item = QListWidgetItem(text)
+                item.setData(Qt.UserRole, stream.id)
+                self.logs_list.addItem(item)
+            else:
+                item.setText(text)
+
+    def toggle_stream(self, item: QListWidgetItem):
+        stream = self.streams.streams.get(item.data(Qt.UserRole))
+        if stream is not None:
+            self.mosaic.set_stream_visible(stream, item.checkState() == Qt.Checked)
 
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
-    frame_queue = queue.Queue()
-    window = MainWindow(frame_queue)
+    streams = StreamRegistry()
+    window = MainWindow(streams)
     window.show()
     sys.exit(app.exec_())
@@ -1,15 +1,22 @@
+import os
 import sys
 import asyncio
-import queue
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from PyQt5.QtWidgets import QApplication
 from qasync import QEventLoop
 from aiohttp import web
+from aiortc import RTCIceServer
 
+from analysis import PROCESSORS
 from gui import MainWindow
+from presentation import LOWEST_LATENCY, MODES
+from streams import StreamRegistry
 from server import app
-import server  # Needed to assign shared frame_queue
+from workers import ReceiverPool, create_app
+import server  # Needed to assign shared streams
 
-async def start_server():
+async def start_server(app):
     """
     Start the aiohttp WebRTC signaling server.
     """
@@ -19,23 +26,108 @@ async def start_server():
     site = web.TCPSite(runner, host="127.0.0.1", port=8080)
     await site.start()
     print("🌐 Aiohttp server started at http://127.0.0.1:8080")
+    return runner
+
+def parse_args():
+    """
+    Parses the app options, the remaining arguments are left to Qt.
+    """
+    parser = argparse.ArgumentParser(description="WebRTC receiver")
+    parser.add_argument("--conversion-workers", type=int, default=min(8, os.cpu_count() or 1),
+                        help="Threads converting frames off the event loop, in each receiver process with "
+                             "--receiver-processes; 0 converts them on it")
+    parser.add_argument("--no-metrics", dest="metrics", action="store_false",
+                        help="Don't collect per-stream latency, FPS and drop metrics")
+    parser.add_argument("--ice-server", action="append", dest="ice_servers", metavar="URL",
+                        help="STUN or TURN server URL, repeat for several; aiortc's default STUN server if none")
+    parser.add_argument("--record-dir",
+                        help="Record incoming video to this directory as received, without decoding it")
+    parser.add_argument("--segment-duration", type=float, default=server.SEGMENT_DURATION,
+                        help="Seconds of video per recording file")
+    parser.add_argument("--presentation", choices=MODES, default=LOWEST_LATENCY,
+                        help="Show frames as they arrive, or evenly paced by their timestamps")
+    parser.add_argument("--jitter-budget", type=float, default=50,
+                        help="Milliseconds the smooth presentation delays frames to absorb network jitter")
+    parser.add_argument("--analysis", action="append", default=[], choices=sorted(PROCESSORS), metavar="PROCESSOR",
+                        help=f"Analysis processor run on every stream, repeat for several: {', '.join(PROCESSORS)}")
+    parser.add_argument("--analysis-fps", type=float, default=server.ANALYSIS_FPS,
+                        help="Frames analyzed per second and stream, whatever the display rate")
+    parser.add_argument("--analysis-width", type=int, default=server.ANALYSIS_WIDTH,
+                        help="Width frames are downscaled to for the analysis processors")
+    parser.add_argument("--analysis-workers", type=int, default=min(4, os.cpu_count() or 1),
+                        help="Threads running the analysis processors, 0 uses the event loop's default executor")
+    parser.add_argument("--preview-fps", type=float, default=server.PREVIEW_FPS,
+                        help="Highest framerate of the MJPEG previews served at /streams/<id>/preview.mjpg")
+    parser.add_argument("--preview-workers", type=int, default=1,
+                        help="Threads encoding JPEG previews, 0 uses the event loop's default executor")
+    parser.add_argument("--receiver-processes", type=int, default=0,
+                        help="Processes receiving and decoding the peers' video, 0 receives it in the GUI process")
+    parser.add_argument("--ring-slots", type=int, default=4,
+                        help="Frames per stream in the shared memory between receiver processes and the GUI, "
+                             "the smooth presentation needs more than its jitter budget holds")
+    parser.add_argument("--ring-max-size", type=int, nargs=2, default=(1920, 1080), metavar=("WIDTH", "HEIGHT"),
+                        help="Largest frame passed from receiver processes to the GUI, larger ones are scaled down")
+    return parser.parse_known_args()
 
 if __name__ == "__main__":
+    args, qt_args = parse_args()
+
     # Initialize Qt application and asyncio event loop
-    app_qt = QApplication(sys.argv)
+    app_qt = QApplication(sys.argv[:1] + qt_args)
     loop = QEventLoop(app_qt)
     asyncio.set_event_loop(loop)
 
-    # Shared queue between WebRTC receiver and GUI
-    frame_queue = queue.Queue()
-    server.frame_queue = frame_queue  # Pass frame_queue to server module
+    # Per-peer streams shared between WebRTC receivers and GUI
+    streams = StreamRegistry(metrics=args.metrics, analysis=bool(args.analysis))
+    server.streams = streams  # Pass streams to server module
+    server.recording_dir = args.record_dir
+    if args.ice_servers:
+        server.ice_servers = [RTCIceServer(url) for url in args.ice_servers]
+    server.SEGMENT_DURATION = args.segment_duration
+    server.analysis_processors = args.analysis
+    server.ANALYSIS_FPS = args.analysis_fps
+    server.ANALYSIS_WIDTH = args.analysis_width
+    server.PREVIEW_FPS = args.preview_fps
+    # Receiver processes make their own thread pools
+    if args.receiver_processes == 0:
+        if args.conversion_workers > 0:
+            server.conversion_executor = ThreadPoolExecutor(args.conversion_workers, thread_name_prefix="convert")
+        if args.analysis and args.analysis_workers > 0:
+            server.analysis_executor = ThreadPoolExecutor(args.analysis_workers, thread_name_prefix="analyze")
+        if args.preview_workers > 0:
+            server.preview_executor = ThreadPoolExecutor(args.preview_workers, thread_name_prefix="preview")
+
+    # With receiver processes, the GUI process only answers offers through them and shows the frames
+    pool = None
+    web_app = app
+    if args.receiver_processes > 0:
+        pool = ReceiverPool(streams, args.receiver_processes, {
+            "metrics": args.metrics,
+            "recording_dir": args.record_dir,
+            "segment_duration": args.segment_duration,
+            "ice_servers": args.ice_servers,
+            "ring_slots": args.ring_slots,
+            "ring_max_size": tuple(args.ring_max_size),
+            "conversion_workers": args.conversion_workers,
+            "analysis": args.analysis,
+            "analysis_fps": args.analysis_fps,
+            "analysis_width": args.analysis_width,
+            "analysis_workers": args.analysis_workers,
+            "preview_fps": args.preview_fps,
+            "preview_workers": args.preview_workers,
+        })
+        web_app = create_app(pool)
 
     # Initialize and show main application window
-    window = MainWindow(frame_queue)
+    window = MainWindow(streams, args.presentation, args.jitter_budget / 1000)
     print("🖼️ GUI started")
     window.show()
 
     # Start aiohttp server and Qt event loop
     with loop:
-        loop.run_until_complete(start_server())
+        if pool is not None:
+            loop.run_until_complete(pool.start())
+        runner = loop.run_until_complete(start_server(web_app))
         loop.run_forever()
+        # Runs the app's shutdown hooks, closing all peer connections
+        loop.run_until_complete(runner.cleanup())
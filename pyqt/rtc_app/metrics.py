@@ -0,0 +1,120 @@
+import time
+import collections
+
+from av import VideoFrame
+
+# Pipeline stages timed per frame
+STAGES = ("receive", "convert", "queue_wait", "paint", "display")
+PERCENTILES = (0.5, 0.95, 0.99)
+
+
+class LatencyWindow:
+    """
+    Latencies of the latest frames through one stage, in seconds.
+    Adding a sample is a deque append, percentiles are only computed when read.
+    """
+    def __init__(self, size=600):
+        self.samples = collections.deque(maxlen=size)
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentiles(self):
+        values = sorted(self.samples)
+        if not values:
+            return {f"p{round(fraction * 100)}": None for fraction in PERCENTILES}
+        return {
+            f"p{round(fraction * 100)}": values[min(len(values) - 1, int(len(values) * fraction))]
+            for fraction in PERCENTILES
+        }
+
+
+class RateCounter:
+    """
+    Events per second over the last second.
+    """
+    def __init__(self, max_rate=1000):
+        self.times = collections.deque(maxlen=max_rate)
+        self.total = 0
+
+    def add(self, now: float):
+        self.times.append(now)
+        self.total += 1
+
+    def rate(self, now=None):
+        since = (now or time.perf_counter()) - 1
+        return sum(1 for moment in self.times if moment > since)
+
+
+class StreamMetrics:
+    """
+    Per-frame timings and counters of one stream, recorded by the receiver,
+    its conversion stage and the tile showing it, from whichever thread runs them.
+
+    receive: how late a frame arrives compared with its timestamp, relative to the
+             earliest frame. aiortc decodes on its own thread, so this covers network
+             jitter, the jitter buffer and decoding.
+    convert: conversion to a QImage.
+    queue_wait: waiting for a conversion worker and for the GUI to take the frame.
+    paint: from the GUI taking the frame until it is drawn.
+    display: from the decoded frame's submission for conversion until it is drawn,
+             everything the receiver adds after decoding, including the wait for its
+             time in the smooth presentation mode.
+
+    Frames the smooth mode drops because a newer one was due by the same refresh are
+    counted as late, apart from those dropped before reaching the GUI.
+    """
+    def __init__(self, window=600):
+        self.stages = {stage: LatencyWindow(window) for stage in STAGES}
+        self.received = RateCounter()
+        self.displayed = RateCounter()
+        self.dropped = 0
+        self.errors = 0
+        self.late = 0
+        self._min_offset = None
+
+    def record(self, stage: str, seconds: float):
+        self.stages[stage].add(seconds)
+
+    def frame_received(self, frame: VideoFrame, now: float):
+        self.received.add(now)
+        if frame.time is None:
+            return
+        offset = now - frame.time
+        if self._min_offset is None or offset < self._min_offset:
+            self._min_offset = offset
+        self.record("receive", offset - self._min_offset)
+
+    def frame_displayed(self, now: float):
+        self.displayed.add(now)
+
+    def snapshot(self, mailbox_dropped=0) -> dict:
+        now = time.perf_counter()
+        return {
+            "received": self.received.total,
+            "displayed": self.displayed.total,
+            "dropped": self.dropped + mailbox_dropped,
+            "errors": self.errors,
+            "late": self.late,
+            "receive_fps": self.received.rate(now),
+            "display_fps": self.displayed.rate(now),
+            "latency_ms": {
+                stage: {
+                    name: None if value is None else round(value * 1000, 2)
+                    for name, value in window.percentiles().items()
+                }
+                for stage, window in self.stages.items()
+            },
+        }
+
+
+def format_snapshot(name: str, snapshot: dict) -> str:
+    """
+    One line summary of a stream's metrics for the log panel.
+    """
+    stages = " ".join(
+        f"{stage} {latency['p50'] or 0:.1f}/{latency['p95'] or 0:.1f}/{latency['p99'] or 0:.1f}"
+        for stage, latency in snapshot["latency_ms"].items()
+    )
+    return (f"{name}: {snapshot['receive_fps']} fps in, {snapshot['display_fps']} fps shown, "
+            f"{snapshot['dropped']} dropped, {snapshot['late']} late, {snapshot['errors']} errors | ms p50/p95/p99 {stages}")
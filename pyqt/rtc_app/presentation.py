@@ -0,0 +1,65 @@
+import collections
+
+from PyQt5.QtGui import QImage
+
+# Presentation modes: show each frame as soon as it arrives, or pace frames by their timestamps
+LOWEST_LATENCY = "latency"
+SMOOTH = "smooth"
+MODES = (LOWEST_LATENCY, SMOOTH)
+
+
+def media_time(image: QImage, default: float) -> float:
+    """
+    Returns the timestamp of the frame the image was converted from in seconds,
+    or `default` for images without one.
+    """
+    # Images from receiver processes carry the time, images converted here their frame
+    timestamp = getattr(image, "timestamp", None)
+    if timestamp is not None:
+        return timestamp
+    frame = getattr(image, "frame", None)
+    if frame is None or frame.pts is None or frame.time_base is None:
+        return default
+    return float(frame.pts * frame.time_base)
+
+
+class PresentationScheduler:
+    """
+    Paces the frames of one stream by their timestamps, for the smooth mode.
+
+    The media clock is mapped to the local clock by the smallest arrival delay
+    over the last `window` frames, i.e. the frame that went through network and
+    decoding fastest. Each frame is due at its timestamp mapped this way plus the
+    jitter budget, so frames delayed by up to the budget are still shown evenly
+    spaced. At each display refresh the latest due frame is shown and older ones,
+    already late, are dropped.
+    """
+    def __init__(self, jitter_budget=0.05, window=120):
+        self.jitter_budget = jitter_budget
+        self.frames = collections.deque()
+        self.offsets = collections.deque(maxlen=window)
+        self.shown = 0
+        self.late = 0
+
+    def push(self, image: QImage, now: float):
+        timestamp = media_time(image, now)
+        self.offsets.append(now - timestamp)
+        self.frames.append((timestamp, image))
+
+    def pop(self, now: float, refresh_interval: float):
+        """
+        Returns the frame to show at the refresh happening at `now`, None if none is due yet.
+        """
+        # Due before the middle of the refresh interval
+        horizon = now + refresh_interval / 2 - min(self.offsets) - self.jitter_budget
+        image = None
+        while self.frames and self.frames[0][0] <= horizon:
+            if image is not None:
+                self.late += 1
+            image = self.frames.popleft()[1]
+        if image is not None:
+            self.shown += 1
+        return image
+
+    def counters(self):
+        return {"shown": self.shown, "late": self.late, "queued": len(self.frames)}
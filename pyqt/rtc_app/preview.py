@@ -0,0 +1,115 @@
+import asyncio
+from fractions import Fraction
+
+import av
+from av import VideoFrame
+from av.video.reformatter import VideoReformatter
+
+from frames import fit_size
+
+
+class JpegEncoder:
+    """
+    Encodes decoded frames as JPEG with FFmpeg's MJPEG encoder, straight from
+    YUV, downscaled to fit `max_size`. `quality` is the JPEG quantizer, 2 (best)
+    to 31. Not thread-safe, one encoding at a time.
+    """
+    def __init__(self, quality=5, max_size=(1280, 720)):
+        self.quality = quality
+        self.max_size = max_size
+        self.reformatter = VideoReformatter()
+        self.codec = None
+        self.encoded = 0
+
+    def encode(self, frame: VideoFrame) -> bytes:
+        width, height = fit_size(frame.width, frame.height, self.max_size)
+        # 4:2:0 chroma needs even sizes
+        width, height = max(2, width // 2 * 2), max(2, height // 2 * 2)
+        if self.codec is None or (self.codec.width, self.codec.height) != (width, height):
+            self.codec = av.CodecContext.create("mjpeg", "w")
+            self.codec.width, self.codec.height = width, height
+            self.codec.pix_fmt = "yuvj420p"
+            self.codec.time_base = Fraction(1, 1)
+            self.codec.options = {"qmin": str(self.quality), "qmax": str(self.quality)}
+            self.codec.open()
+
+        yuv = self.reformatter.reformat(frame, width, height, format="yuvj420p")
+        # The encoder wants increasing timestamps, whatever the stream's
+        yuv.pts, yuv.time_base = self.encoded, self.codec.time_base
+        self.encoded += 1
+        return bytes(self.codec.encode(yuv)[0])
+
+
+class JpegPreview:
+    """
+    Latest frame of a stream as JPEG, for HTTP snapshots and MJPEG previews.
+
+    The receiver only keeps a reference to each new frame. Frames are encoded
+    when a viewer asks for one, on `executor` (the loop's default executor if None),
+    and at most once: viewers asking while the latest frame is encoded wait for
+    that encoding, viewers asking later get the cached JPEG until a new frame arrives.
+    `watchers` counts the viewers waiting, the stream is decoded while there are any.
+    """
+    def __init__(self, executor=None, encoder: JpegEncoder = None):
+        self.executor = executor
+        self.encoder = encoder or JpegEncoder()
+        self.frame = None
+        self.sequence = 0
+        self.watchers = 0
+        self.encoded = 0
+        self.closed = False
+        self._jpeg = None
+        self._jpeg_sequence = 0
+        self._encoding = None
+        self._next_frame = None
+
+    def put(self, frame: VideoFrame):
+        self.frame = frame
+        self.sequence += 1
+        if self._next_frame is not None:
+            self._next_frame.set_result(None)
+            self._next_frame = None
+
+    def close(self):
+        """
+        Ends the waits of the viewers, once the stream is gone.
+        """
+        self.closed = True
+        if self._next_frame is not None:
+            self._next_frame.set_result(None)
+            self._next_frame = None
+
+    async def jpeg(self, after=0):
+        """
+        Returns the sequence number and JPEG of the latest frame, waiting for a frame
+        newer than the sequence number `after` if there is none yet.
+        """
+        self.watchers += 1
+        try:
+            while True:
+                if self.sequence <= after:
+                    if self.closed:
+                        raise ConnectionResetError("Stream closed")
+                    if self._next_frame is None:
+                        self._next_frame = asyncio.get_running_loop().create_future()
+                    await asyncio.shield(self._next_frame)
+                    continue
+                if self._jpeg_sequence == self.sequence:
+                    return self._jpeg_sequence, self._jpeg
+                if self._encoding is None:
+                    self._encoding = asyncio.ensure_future(self._encode())
+                # Shielded, a viewer going away doesn't cancel the others' encoding
+                await asyncio.shield(self._encoding)
+                if self._jpeg_sequence > after:
+                    return self._jpeg_sequence, self._jpeg
+        finally:
+            self.watchers -= 1
+
+    async def _encode(self):
+        sequence, frame = self.sequence, self.frame
+        try:
+            jpeg = await asyncio.get_running_loop().run_in_executor(self.executor, self.encoder.encode, frame)
+            self._jpeg_sequence, self._jpeg = sequence, jpeg
+            self.encoded += 1
+        finally:
+            self._encoding = None
@@ -0,0 +1,233 @@
+import os
+import time
+import queue
+import asyncio
+import threading
+from datetime import datetime
+from fractions import Fraction
+
+import av
+from aiortc import RTCRtpReceiver
+
+# Clock of RTP video timestamps
+VIDEO_CLOCK_RATE = 90000
+
+# Container format and file extension of each passthrough codec
+CONTAINERS = {
+    "video/H264": ("mpegts", "ts", "h264"),
+    "video/VP8": ("webm", "webm", "vp8"),
+}
+
+
+class TimestampUnwrapper:
+    """
+    Extends 32-bit RTP timestamps, which start at a random value and wrap around,
+    to a counter that keeps increasing. A timestamp less than half the range behind
+    the previous one counts as an earlier frame rather than a wrap.
+    """
+    def __init__(self):
+        self.last = None
+        self.value = None
+
+    def unwrap(self, timestamp: int) -> int:
+        if self.last is None:
+            self.value = timestamp
+        else:
+            delta = (timestamp - self.last) & 0xffffffff
+            if delta >= 0x80000000:
+                delta -= 0x100000000
+            self.value += delta
+        self.last = timestamp
+        return self.value
+
+
+def is_keyframe(mime_type: str, data: bytes) -> bool:
+    """
+    Tells whether an encoded frame can be decoded on its own.
+    """
+    if not data:
+        return False
+    if mime_type == "video/VP8":
+        # Inverse key frame flag in the first bit of the frame tag
+        return not data[0] & 0x01
+    if mime_type == "video/H264":
+        # Annex B byte stream, looking for an IDR slice or a sequence parameter set
+        start = data.find(b"\x00\x00\x01")
+        while start != -1 and start + 3 < len(data):
+            if data[start + 3] & 0x1f in (5, 7):
+                return True
+            start = data.find(b"\x00\x00\x01", start + 3)
+    return False
+
+
+class SegmentedRecorder:
+    """
+    Writes the encoded frames of one stream to rolling container files without
+    decoding them. A segment starts at a keyframe once the previous one lasted
+    `segment_duration` seconds. Files are written by a thread of their own, like
+    aiortc decodes on one, so the event loop only hands the frames over.
+
+    While `max_queued` frames wait for the thread, frames are dropped up to the
+    next keyframe. After a write error the recorder stops and drops all frames.
+    """
+    def __init__(self, directory: str, name: str, segment_duration=60, max_queued=300):
+        self.directory = directory
+        self.name = name
+        self.segment_duration = segment_duration * VIDEO_CLOCK_RATE
+        self.max_queued = max_queued
+        self.segments = 0
+        self.dropped = 0
+        self.failed = False
+        self._segment_start = None
+        self._resync = False
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._write_segments, name=f"record-{name}", daemon=True)
+        self._thread.start()
+
+    def wants_keyframe(self, mime_type: str, timestamp: int) -> bool:
+        """
+        Tells whether the next segment is due, the first one is still waiting to start,
+        or frames were dropped since the last keyframe.
+        """
+        return mime_type in CONTAINERS and not self.failed and (
+            self._segment_start is None or self._resync
+            or timestamp - self._segment_start >= self.segment_duration
+        )
+
+    def write(self, mime_type: str, data: bytes, timestamp: int, keyframe: bool):
+        """
+        Queues an encoded frame, `timestamp` on the 90 kHz RTP clock, unwrapped
+        (see TimestampUnwrapper). Frames before the first keyframe are dropped.
+        """
+        if mime_type not in CONTAINERS or self.failed:
+            return
+        if self._queue.qsize() >= self.max_queued:
+            # The writer is behind, later frames would not decode without the dropped one
+            self.dropped += 1
+            self._resync = True
+            return
+        if keyframe:
+            self._resync = False
+            if self.wants_keyframe(mime_type, timestamp):
+                self._segment_start = timestamp
+                self.segments += 1
+                self._queue.put(("segment", mime_type, timestamp, self.segments))
+        elif self._segment_start is None or self._resync:
+            self.dropped += 1
+            return
+        self._queue.put(("frame", data, timestamp, keyframe))
+
+    def close(self):
+        self._queue.put(None)
+
+    def segment_path(self, extension: str, segment: int) -> str:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        return os.path.join(self.directory, f"{self.name}-{stamp}-{segment:04d}.{extension}")
+
+    def _write_segments(self):
+        container = stream = None
+        start = 0
+        try:
+            while True:
+                task = self._queue.get()
+                if task is None:
+                    break
+
+                if task[0] == "segment":
+                    _, mime_type, start, segment = task
+                    if container is not None:
+                        container.close()
+                        container = None
+                    container_format, extension, codec = CONTAINERS[mime_type]
+                    os.makedirs(self.directory, exist_ok=True)
+                    container = av.open(self.segment_path(extension, segment), "w", format=container_format)
+                    stream = container.add_stream(codec)
+                    stream.time_base = Fraction(1, VIDEO_CLOCK_RATE)
+                    continue
+
+                _, data, timestamp, keyframe = task
+                packet = av.Packet(data)
+                packet.stream = stream
+                # The muxer may change the stream's time base once it writes the header
+                packet.time_base = Fraction(1, VIDEO_CLOCK_RATE)
+                # WebRTC video has no B-frames, decode and presentation order are the same
+                packet.pts = packet.dts = timestamp - start
+                packet.is_keyframe = keyframe
+                container.mux(packet)
+        except Exception as e:
+            print(f"[❌] Recording error: {e}")
+            # Nothing reads the queue anymore
+            self.failed = True
+            while not self._queue.empty():
+                self._queue.get_nowait()
+        finally:
+            if container is not None:
+                container.close()
+
+
+class PassthroughTap:
+    """
+    Takes the place of the decoder queue of an aiortc RTCRtpReceiver, which gets
+    every reassembled encoded frame before its decoder thread does. Frames are
+    recorded as they are, and only passed on to the decoder while the stream is
+    shown, analyzed or previewed. When it is shown again decoding resumes at a
+    keyframe, requested from the sender with a PLI.
+
+    aiortc has no public hook for encoded frames, install() swaps the receiver's
+    private queue. Its decoder thread reads the original queue, through the tap
+    when it is started after install().
+    """
+    # Seconds between keyframe requests
+    KEYFRAME_REQUEST_INTERVAL = 1
+
+    def __init__(self, receiver: RTCRtpReceiver, stream, recorder: SegmentedRecorder = None):
+        self.receiver = receiver
+        self.stream = stream
+        self.recorder = recorder
+        self.clock = TimestampUnwrapper()
+        self.decoder_queue = None
+        self.decoding = False
+        self.last_frame = time.monotonic()
+        self._keyframe_requested = 0
+
+    def install(self):
+        self.decoder_queue = self.receiver._RTCRtpReceiver__decoder_queue
+        self.receiver._RTCRtpReceiver__decoder_queue = self
+
+    def get(self, *args, **kwargs):
+        return self.decoder_queue.get(*args, **kwargs)
+
+    def put(self, task):
+        if task is None:
+            # Receiver stopped
+            if self.recorder is not None:
+                self.recorder.close()
+            self.decoder_queue.put(None)
+            return
+
+        codec, encoded_frame = task
+        self.last_frame = time.monotonic()
+        keyframe = is_keyframe(codec.mimeType, encoded_frame.data)
+
+        if self.recorder is not None:
+            timestamp = self.clock.unwrap(encoded_frame.timestamp)
+            self.recorder.write(codec.mimeType, encoded_frame.data, timestamp, keyframe)
+            # Segments start at keyframes, which senders may otherwise send rarely
+            if self.recorder.wants_keyframe(codec.mimeType, timestamp):
+                self.request_keyframe()
+
+        if not self.stream.decoded:
+            self.decoding = False
+        elif self.decoding or keyframe:
+            self.decoding = True
+            self.decoder_queue.put(task)
+        else:
+            self.request_keyframe()
+
+    def request_keyframe(self):
+        now = time.monotonic()
+        if now - self._keyframe_requested < self.KEYFRAME_REQUEST_INTERVAL:
+            return
+        self._keyframe_requested = now
+        for source in self.receiver.getSynchronizationSources():
+            asyncio.ensure_future(self.receiver._send_rtcp_pli(source.source))
@@ -1,89 +1,293 @@
 import os
-import cv2
+import time
 import asyncio
-import queue
 from aiohttp import web
-from aiortc import RTCPeerConnection, MediaStreamTrack, RTCSessionDescription
+from aiortc import RTCConfiguration, RTCPeerConnection, MediaStreamTrack, RTCSessionDescription
+from aiortc.mediastreams import MediaStreamError
 from av import VideoFrame
-from PyQt5.QtGui import QImage, QPixmap
+
+from analysis import PROCESSORS, AnalysisStage
+from frames import ConversionStage
+from preview import JpegPreview
+from recording import PassthroughTap, SegmentedRecorder
+from streams import Stream, StreamRegistry
+from trickle import exchange_candidates, trickle_configuration
 
 # Set of all active peer connections
 pcs = set()
 
+# Receiver tasks of each peer connection, cancelled when it is closed
+receiver_tasks = {}
+
+# Seconds without a frame after which a peer connection is closed
+IDLE_TIMEOUT = 30
+
+# Directory incoming video is recorded to without decoding, None disables recording (set by main.py)
+recording_dir = None
+
+# Seconds of video per recording file
+SEGMENT_DURATION = 60
+
+# RTCIceServer list for gathering, None for aiortc's default STUN server (set by main.py)
+ice_servers = None
+
 # Path to static HTML file (optional frontend)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 HTML_PATH = os.path.join(BASE_DIR, 'client.html')
 
-# Global queue passed from main.py
-frame_queue = None
+# Global stream registry passed from main.py
+streams: StreamRegistry = None
+
+# Executor converting frames off the event loop, None converts them inline (set by main.py)
+conversion_executor = None
+
+# Names of the analysis processors run on each stream (see analysis.PROCESSORS, set by main.py)
+analysis_processors = []
+
+# Frames analyzed per second and stream, and the width they are downscaled to for the processors
+ANALYSIS_FPS = 5
+ANALYSIS_WIDTH = 160
+
+# Executor running the analysis processors, None for the event loop's default executor (set by main.py)
+analysis_executor = None
+
+# Executor encoding JPEG previews, None for the event loop's default executor (set by main.py)
+preview_executor = None
+
+# Highest framerate of the MJPEG previews
+PREVIEW_FPS = 10
+
+# Separates the JPEG frames of MJPEG previews
+MJPEG_BOUNDARY = "frame"
 
 
 class VideoReceiver:
     """
     Custom video receiver that reads frames from WebRTC track
-    and pushes them into a GUI-compatible queue as QPixmap.
+    and hands them to the GUI through the stream's mailbox as QImage.
+    Each peer has its own receiver task and stream, so streams don't wait on each other.
+    When the track ends, fails or stays idle, the receiver closes its peer connection.
+    With a passthrough tap, frames of hidden streams are not even decoded, so the
+    track stays quiet while the tap still sees encoded frames.
+    Streams with analysis have a sample of their frames analyzed, shown or not.
+    The latest frame is kept for JPEG previews, hidden streams are decoded while viewed.
     """
-    def __init__(self, track: MediaStreamTrack, frame_queue: queue.Queue):
+    def __init__(self, track: MediaStreamTrack, stream: Stream, pc: RTCPeerConnection = None,
+                 tap: PassthroughTap = None):
         self.track = track
-        self.frame_queue = frame_queue
+        self.stream = stream
+        self.pc = pc
+        self.tap = tap
+        self.conversion = ConversionStage(stream.mailbox, conversion_executor, metrics=stream.metrics)
+        self.analysis = None
+        if stream.analysis is not None:
+            self.analysis = AnalysisStage(stream.analysis, [PROCESSORS[name]() for name in analysis_processors],
+                                          analysis_executor, ANALYSIS_FPS, ANALYSIS_WIDTH)
         self.running = True
 
     async def run(self):
+        try:
+            await self.receive()
+        finally:
+            streams.remove(self.stream)
+            if self.stream.preview is not None:
+                self.stream.preview.close()
+            if self.pc is not None:
+                # Not awaited: closing cancels this task
+                asyncio.ensure_future(close_peer(self.pc))
+
+    async def receive(self):
+        metrics = self.stream.metrics
         while self.running:
             try:
-                frame: VideoFrame = await self.track.recv()
-                img = frame.to_ndarray(format="bgr24")
-                img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-
-                # Convert frame to Qt format
-                h, w, ch = img.shape
-                bytes_per_line = ch * w
-                qt_image = QImage(img.data, w, h, bytes_per_line, QImage.Format_RGB888)
-                pixmap = QPixmap.fromImage(qt_image)
+                # Without a tap frames of hidden streams are still decoded,
+                # but never converted
+                frame: VideoFrame = await asyncio.wait_for(self.track.recv(), IDLE_TIMEOUT)
+                now = time.perf_counter()
+                if metrics is not None:
+                    metrics.frame_received(frame, now)
+                if self.analysis is not None:
+                    self.analysis.submit(frame, now)
+                if self.stream.preview is not None:
+                    # Only a reference, JPEGs are encoded when a viewer asks
+                    self.stream.preview.put(frame)
+                if not self.stream.visible:
+                    continue
 
-                # Replace the latest frame
-                while not self.frame_queue.empty():
-                    self.frame_queue.get_nowait()
-                self.frame_queue.put_nowait(pixmap)
+                # Convert frame to Qt format at display size and replace the latest frame,
+                # the pixmap is made by the GUI when painting
+                self.conversion.submit(frame, self.stream.target_size)
 
+            except MediaStreamError:
+                print("🔌 Video track ended")
+                self.running = False
+            except asyncio.TimeoutError:
+                if self.tap is not None and time.monotonic() - self.tap.last_frame < IDLE_TIMEOUT:
+                    continue
+                print(f"[⌛] No frame for {IDLE_TIMEOUT} s, closing the connection")
+                self.running = False
             except Exception as e:
+                if metrics is not None:
+                    metrics.errors += 1
                 print(f"[❌] VideoReceiver error: {e}")
                 self.running = False
 
 
-async def offer(request):
+async def close_peer(pc: RTCPeerConnection):
     """
-    Handle incoming SDP offer and return SDP answer.
-    Also attaches a video track handler.
+    Closes the peer connection and cancels its receivers, once.
     """
-    params = await request.json()
-    pc = RTCPeerConnection()
+    if pc not in pcs:
+        return
+    pcs.discard(pc)
+    for task in receiver_tasks.pop(pc, ()):
+        task.cancel()
+    await pc.close()
+
+
+def create_peer_connection(remote: str, params, configuration: RTCConfiguration) -> RTCPeerConnection:
+    """
+    Creates a tracked peer connection with a video track handler, for the peer at address `remote`.
+    """
+    # Recorded streams start hidden, they are decoded once the operator shows them
+    record = recording_dir is not None and params.get("record", True)
+    pc = RTCPeerConnection(configuration)
     pcs.add(pc)
+    receiver_tasks[pc] = set()
 
-    offer = RTCSessionDescription(
-        sdp=params["sdp"]["sdp"],
-        type=params["sdp"]["type"]
-    )
+    @pc.on("connectionstatechange")
+    async def on_connectionstatechange():
+        if pc.connectionState in ("failed", "closed"):
+            await close_peer(pc)
 
     @pc.on("track")
     def on_track(track):
         if track.kind == "video":
             print("🎥 Incoming video track received")
-            receiver = VideoReceiver(track, frame_queue)
-            asyncio.create_task(receiver.run())
+            stream = streams.add(remote, visible=not record)
+            stream.preview = JpegPreview(preview_executor)
+            recorder = SegmentedRecorder(recording_dir, f"peer-{stream.id}", SEGMENT_DURATION) if record else None
+            rtp_receiver = next(receiver for receiver in pc.getReceivers() if receiver.track is track)
+            tap = PassthroughTap(rtp_receiver, stream, recorder)
+            tap.install()
+            receiver = VideoReceiver(track, stream, pc, tap)
+            task = asyncio.create_task(receiver.run())
+            tasks = receiver_tasks.get(pc)
+            if tasks is None:
+                task.cancel()  # Closed before the track arrived
+            else:
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+    return pc
+
+
+async def answer_offer(pc: RTCPeerConnection, params) -> dict:
+    offer = RTCSessionDescription(
+        sdp=params["sdp"]["sdp"],
+        type=params["sdp"]["type"]
+    )
+    try:
+        await pc.setRemoteDescription(offer)
+        answer = await pc.createAnswer()
+        await pc.setLocalDescription(answer)
+    except Exception:
+        await close_peer(pc)
+        raise
+
+    return {
+        "type": pc.localDescription.type,
+        "sdp": pc.localDescription.sdp
+    }
 
-    await pc.setRemoteDescription(offer)
-    answer = await pc.createAnswer()
-    await pc.setLocalDescription(answer)
 
+async def offer(request):
+    """
+    Handle incoming SDP offer and return SDP answer.
+    The answer is sent once ICE gathering completed, including STUN queries.
+    """
+    params = await request.json()
+    pc = create_peer_connection(request.remote, params, RTCConfiguration(iceServers=ice_servers))
+    return web.json_response({"sdp": await answer_offer(pc, params)})
+
+
+async def trickle(request):
+    """
+    Offer/answer over a WebSocket with trickle ICE: the client sends {"sdp": offer}
+    and gets {"sdp": answer} with host candidates at once, then both sides send
+    {"candidates": [...], "done": bool} messages as their STUN queries complete.
+    """
+    ws = web.WebSocketResponse()
+    await ws.prepare(request)
+
+    params = await ws.receive_json()
+    pc = create_peer_connection(request.remote, params, trickle_configuration(ice_servers))
+    await ws.send_json({"sdp": await answer_offer(pc, params)})
+    await exchange_candidates(ws, pc, ice_servers)
+    return ws
+
+
+async def metrics(request):
+    """
+    Per-stream pipeline metrics as JSON, latencies in milliseconds.
+    """
     return web.json_response({
-        "sdp": {
-            "type": pc.localDescription.type,
-            "sdp": pc.localDescription.sdp
-        }
+        "enabled": streams.metrics,
+        "streams": [
+            {"id": stream.id, "name": stream.name, **(stream.metrics_snapshot() or {})}
+            for stream in list(streams.streams.values())
+        ]
     })
 
 
+def previewed_stream(request) -> Stream:
+    stream = streams.streams.get(int(request.match_info["id"]))
+    if stream is None or stream.preview is None:
+        raise web.HTTPNotFound(text="No such stream")
+    return stream
+
+
+async def snapshot(request):
+    """
+    Latest frame of a stream as JPEG.
+    """
+    stream = previewed_stream(request)
+    try:
+        _, jpeg = await asyncio.wait_for(stream.preview.jpeg(), IDLE_TIMEOUT)
+    except (ConnectionResetError, asyncio.TimeoutError):
+        raise web.HTTPNotFound(text="Stream ended")
+    return web.Response(body=jpeg, content_type="image/jpeg", headers={"Cache-Control": "no-store"})
+
+
+async def preview(request):
+    """
+    MJPEG preview of a stream, new frames as multipart/x-mixed-replace parts at up
+    to PREVIEW_FPS. Each viewer waits for its own socket only, the JPEGs are shared.
+    """
+    stream = previewed_stream(request)
+    response = web.StreamResponse(headers={
+        "Content-Type": f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}",
+        "Cache-Control": "no-store",
+    })
+    await response.prepare(request)
+
+    loop = asyncio.get_running_loop()
+    sequence = 0
+    try:
+        while True:
+            started = loop.time()
+            sequence, jpeg = await asyncio.wait_for(stream.preview.jpeg(sequence), IDLE_TIMEOUT)
+            await response.write(f"--{MJPEG_BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                                 f"Content-Length: {len(jpeg)}\r\n\r\n".encode())
+            await response.write(jpeg)
+            await response.write(b"\r\n")
+            await asyncio.sleep(started + 1 / PREVIEW_FPS - loop.time())
+    except (ConnectionResetError, asyncio.TimeoutError):
+        # Viewer gone, or stream ended or stalled
+        pass
+    return response
+
+
 async def index(request):
     """
     Serve a static test HTML file if it exists.
@@ -94,10 +298,22 @@ async def index(request):
         return web.Response(status=404, text="client.html not found")
 
 
+async def on_shutdown(app):
+    """
+    Closes all peer connections concurrently.
+    """
+    await asyncio.gather(*(close_peer(pc) for pc in list(pcs)))
+
+
 # Web server configuration
 app = web.Application()
+app.on_shutdown.append(on_shutdown)
 app.router.add_get('/', index)
 app.router.add_post('/offer', offer)
+app.router.add_get('/trickle', trickle)
+app.router.add_get('/metrics', metrics)
+app.router.add_get(r'/streams/{id:\d+}/snapshot.jpg', snapshot)
+app.router.add_get(r'/streams/{id:\d+}/preview.mjpg', preview)
 
 # For standalone testing (not used in production)
 if __name__ == "__main__":
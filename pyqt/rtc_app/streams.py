@@ -0,0 +1,75 @@
+import itertools
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from analysis import AnalysisResults
+from frames import FrameMailbox
+from metrics import StreamMetrics
+
+
+class Stream:
+    """
+    Video of one peer connection: its frame mailbox and how the GUI shows it.
+    The receiver converts frames only while the stream is visible, scaled
+    down to `target_size` in device pixels, set by the tile showing the stream
+    (None for the source size).
+    `peer` is the address of the peer the video comes from.
+    `metrics` is None when metrics collection is switched off. `analysis` holds
+    the latest AnalysisResults, None when no analysis processors are configured.
+    `preview` serves the stream's frames as JPEG, set by its receiver.
+    """
+    def __init__(self, stream_id: int, name: str, metrics: StreamMetrics = None, peer: str = None):
+        self.id = stream_id
+        self.name = name
+        self.peer = peer
+        self.mailbox = FrameMailbox()
+        self.visible = True
+        self.target_size = None
+        self.metrics = metrics
+        self.analysis = None
+        self.preview = None
+
+    @property
+    def decoded(self) -> bool:
+        """
+        Whether frames need to be decoded, to be shown, analyzed or previewed.
+        """
+        return self.visible or self.analysis is not None or (self.preview is not None and self.preview.watchers > 0)
+
+    def metrics_snapshot(self):
+        if self.metrics is None:
+            return None
+        return self.metrics.snapshot(mailbox_dropped=self.mailbox.counters()["dropped"])
+
+
+class StreamRegistry(QObject):
+    """
+    Streams of the connected peers, shared between the server and the GUI.
+    """
+    stream_added = pyqtSignal(object)
+    stream_removed = pyqtSignal(object)
+
+    def __init__(self, metrics=True, analysis=False, parent=None):
+        super().__init__(parent)
+        self._ids = itertools.count(1)
+        self.streams = {}
+        self.metrics = metrics
+        self.analysis = analysis
+
+    def add(self, name: str, visible=True, stream_class=Stream, **kwargs) -> Stream:
+        """
+        Adds the stream of the peer `name`, an instance of `stream_class` taking `kwargs`.
+        """
+        stream_id = next(self._ids)
+        metrics = StreamMetrics() if self.metrics else None
+        stream = stream_class(stream_id, f"Peer {stream_id} ({name})", metrics, name, **kwargs)
+        self.streams[stream_id] = stream
+        stream.visible = visible
+        if self.analysis:
+            stream.analysis = AnalysisResults()
+        self.stream_added.emit(stream)
+        return stream
+
+    def remove(self, stream: Stream):
+        if self.streams.pop(stream.id, None) is not None:
+            self.stream_removed.emit(stream)
@@ -0,0 +1,111 @@
+import types
+import unittest
+
+import numpy as np
+
+from analysis import AnalysisFrame, MotionDetector, label_cells
+
+
+def analysis_frame(gray):
+    return AnalysisFrame(types.SimpleNamespace(time=None), gray)
+
+
+class LabelCellsTests(unittest.TestCase):
+    def test_empty_grid(self):
+        np.testing.assert_array_equal(label_cells(np.zeros((2, 3), bool)), np.full((2, 3), -1))
+
+    def test_regions_labelled_by_smallest_index(self):
+        mask = np.array([
+            [1, 1, 0, 0],
+            [0, 1, 0, 1],
+            [0, 0, 0, 1],
+        ], bool)
+        np.testing.assert_array_equal(label_cells(mask), [
+            [0, 0, -1, -1],
+            [-1, 0, -1, 7],
+            [-1, -1, -1, 7],
+        ])
+
+    def test_diagonal_cells_not_connected(self):
+        mask = np.array([
+            [1, 0],
+            [0, 1],
+        ], bool)
+        np.testing.assert_array_equal(label_cells(mask), [[0, -1], [-1, 3]])
+
+    def test_region_winding_back(self):
+        # The smallest index has to travel down, across and back up
+        mask = np.array([
+            [0, 0, 1],
+            [1, 0, 1],
+            [1, 1, 1],
+        ], bool)
+        np.testing.assert_array_equal(label_cells(mask), [
+            [-1, -1, 2],
+            [2, -1, 2],
+            [2, 2, 2],
+        ])
+
+
+class MotionDetectorTests(unittest.TestCase):
+    def setUp(self):
+        self.detector = MotionDetector(threshold=25, cell=4, cell_fraction=0.2, min_score=0.01, hold=2)
+        self.still = np.zeros((16, 32), np.uint8)
+
+    def moved(self, *regions):
+        gray = self.still.copy()
+        for y, x, height, width in regions:
+            gray[y:y + height, x:x + width] = 255
+        return gray
+
+    def process(self, gray):
+        return self.detector.process(analysis_frame(gray))
+
+    def test_first_frame_has_no_motion(self):
+        result = self.process(self.still)
+        self.assertEqual((result.processor, result.score, result.boxes, result.events), ("motion", 0.0, [], []))
+
+    def test_no_motion(self):
+        self.process(self.still)
+        result = self.process(self.still.copy())
+        self.assertEqual((result.score, result.boxes, result.events), (0.0, [], []))
+
+    def test_small_changes_below_threshold(self):
+        self.process(self.still)
+        result = self.process(self.still + 25)
+        self.assertEqual(result.score, 0.0)
+
+    def test_darker_pixels_move_too(self):
+        self.process(self.moved((0, 0, 4, 4)))
+        result = self.process(self.still)
+        self.assertEqual(result.boxes, [(0.0, 0.0, 0.125, 0.25)])
+
+    def test_boxes_of_separate_regions(self):
+        self.process(self.still)
+        result = self.process(self.moved((0, 0, 8, 4), (0, 4, 4, 4), (12, 24, 4, 8)))
+        self.assertEqual(result.score, 80 / 512)
+        self.assertEqual(sorted(result.boxes), [(0.0, 0.0, 0.25, 0.5), (0.75, 0.75, 0.25, 0.25)])
+
+    def test_cells_with_few_moving_pixels_ignored(self):
+        self.process(self.still)
+        result = self.process(self.moved((0, 0, 1, 3)))
+        self.assertGreater(result.score, 0)
+        self.assertEqual(result.boxes, [])
+
+    def test_motion_events(self):
+        self.process(self.still)
+        self.assertEqual(self.process(self.moved((0, 0, 8, 8))).events, ["motion started (12.5% of the frame)"])
+        self.assertEqual(self.process(self.moved((0, 8, 8, 8))).events, [])
+        # Stops after `hold` quiet frames
+        self.process(self.moved((0, 8, 8, 8)))
+        self.assertEqual(self.process(self.moved((0, 8, 8, 8))).events, ["motion stopped"])
+        self.assertTrue(self.process(self.moved((8, 8, 8, 8))).events[0].startswith("motion started"))
+
+    def test_resized_frame_restarts(self):
+        self.process(self.still)
+        result = self.process(np.full((8, 8), 255, np.uint8))
+        self.assertEqual((result.score, result.boxes), (0.0, []))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+from fractions import Fraction
+
+import numpy as np
+from av import VideoFrame
+
+from framering import FrameRing
+from frames import FrameConverter
+
+
+def image(value, width=32, height=16, pts=None):
+    frame = VideoFrame.from_ndarray(np.full((height, width, 3), value, np.uint8), format="rgb24")
+    if pts is not None:
+        frame.pts, frame.time_base = pts, Fraction(1, 90000)
+    return FrameConverter().to_qimage(frame)
+
+
+class FrameRingTests(unittest.TestCase):
+    def setUp(self):
+        self.ring = FrameRing.create(slots=3, max_size=(64, 32))
+        self.reader = FrameRing.attach(self.ring.name)
+
+    def tearDown(self):
+        self.reader.close()
+        self.ring.close()
+        self.ring.unlink()
+
+    def test_nothing_to_read_before_the_first_frame(self):
+        self.assertEqual(self.reader.read(), (None, 0))
+
+    def test_reads_the_written_frame(self):
+        self.ring.write(image(200, pts=180000))
+        read, missed = self.reader.read()
+        self.assertEqual(missed, 0)
+        self.assertEqual((read.width(), read.height()), (32, 16))
+        self.assertEqual(read.pixelColor(5, 5).red(), 200)
+        self.assertEqual(read.sequence, 1)
+        self.assertEqual(read.timestamp, 2)
+        self.assertEqual(self.reader.read(), (None, 0))
+        del read
+
+    def test_frame_without_timestamp(self):
+        self.ring.write(image(1))
+        read, _ = self.reader.read()
+        self.assertIsNone(read.timestamp)
+        self.assertFalse(hasattr(read, "submitted"))
+        del read
+
+    def test_counts_overwritten_frames(self):
+        self.ring.write(image(1))
+        self.reader.read()
+        for value in (2, 3, 4):
+            self.ring.write(image(value))
+        read, missed = self.reader.read()
+        self.assertEqual((read.sequence, missed), (4, 2))
+        self.assertEqual(read.pixelColor(0, 0).red(), 4)
+        del read
+
+    def test_overwritten_image_no_longer_intact(self):
+        self.ring.write(image(1))
+        read, _ = self.reader.read()
+        for value in (2, 3):
+            self.ring.write(image(value))
+        self.assertTrue(self.reader.intact(read.sequence))
+        self.ring.write(image(4))
+        self.assertFalse(self.reader.intact(read.sequence))
+        del read
+
+    def test_slot_being_rewritten(self):
+        self.ring.write(image(1))
+        self.ring.slots[1]["sequence"] = -1
+        self.assertEqual(self.reader.read(), (None, 1))
+
+    def test_visible_and_target_size_shared(self):
+        self.assertTrue(self.ring.visible)
+        self.assertEqual(self.ring.target_size, (64, 32))
+        self.reader.visible = False
+        self.reader.target_size = (48, 64)
+        self.assertFalse(self.ring.visible)
+        self.assertEqual(self.ring.target_size, (48, 32))
+        self.reader.target_size = None
+        self.assertEqual(self.ring.target_size, (64, 32))
+
+    def test_close_with_images_left(self):
+        self.ring.write(image(1))
+        read, _ = self.reader.read()
+        self.reader.close()
+        # The mapping outlives the ring while the image points into it
+        self.assertEqual(read.pixelColor(0, 0).red(), 1)
+        del read
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+import types
+import unittest
+
+import numpy as np
+from av import VideoFrame
+
+from frames import ConversionStage, FrameConverter, FrameMailbox, fit_size
+
+
+class ManualExecutor:
+    """
+    Keeps the submitted calls until the test runs them.
+    """
+    def __init__(self):
+        self.calls = []
+
+    def submit(self, function, *args):
+        self.calls.append((function, args))
+
+    def run_next(self):
+        function, args = self.calls.pop(0)
+        function(*args)
+
+
+class FakeConverter:
+    """
+    Stands for each frame's image with a namespace naming the frame.
+    """
+    def __init__(self):
+        self.converted = []
+
+    def to_qimage(self, frame, size=None):
+        if frame == "broken":
+            raise ValueError("broken frame")
+        self.converted.append(frame)
+        return types.SimpleNamespace(frame=frame, size=size)
+
+
+class FrameMailboxTests(unittest.TestCase):
+    def setUp(self):
+        self.mailbox = FrameMailbox()
+        self.ready = []
+        self.mailbox.frame_ready.connect(lambda: self.ready.append(True))
+
+    def test_take_returns_the_frame_once(self):
+        self.mailbox.put("frame")
+        self.assertEqual(self.mailbox.take(), "frame")
+        self.assertIsNone(self.mailbox.take())
+
+    def test_ready_emitted_only_when_the_slot_was_empty(self):
+        self.mailbox.put("first")
+        self.mailbox.put("second")
+        self.assertEqual(len(self.ready), 1)
+        self.assertEqual(self.mailbox.take(), "second")
+        self.mailbox.put("third")
+        self.assertEqual(len(self.ready), 2)
+
+    def test_nothing_emitted_without_frames(self):
+        self.assertIsNone(self.mailbox.take())
+        self.assertEqual(self.ready, [])
+
+    def test_counters(self):
+        for frame in ("first", "second", "third"):
+            self.mailbox.put(frame)
+        self.mailbox.take()
+        self.mailbox.put("fourth")
+        self.mailbox.take()
+        self.mailbox.take()
+        self.assertEqual(self.mailbox.counters(), {"received": 4, "delivered": 2, "dropped": 2})
+
+
+class ConversionStageTests(unittest.TestCase):
+    def setUp(self):
+        self.mailbox = FrameMailbox()
+        self.executor = ManualExecutor()
+        self.converter = FakeConverter()
+        self.stage = ConversionStage(self.mailbox, self.executor, self.converter)
+
+    def test_inline_without_executor(self):
+        stage = ConversionStage(self.mailbox, converter=self.converter)
+        stage.submit("frame", (320, 240))
+        image = self.mailbox.take()
+        self.assertEqual((image.frame, image.size), ("frame", (320, 240)))
+
+    def test_one_conversion_in_flight(self):
+        self.stage.submit("first")
+        self.stage.submit("second")
+        self.assertEqual(len(self.executor.calls), 1)
+        self.executor.run_next()
+        self.assertEqual(self.mailbox.take().frame, "first")
+
+    def test_waiting_frame_replaced_and_dropped(self):
+        for frame in ("first", "second", "third"):
+            self.stage.submit(frame)
+        self.assertEqual(self.stage.dropped, 1)
+        self.executor.run_next()
+        self.executor.run_next()
+        self.assertEqual(self.converter.converted, ["first", "third"])
+        self.assertEqual(self.executor.calls, [])
+
+    def test_finished_conversion_resubmits_the_waiting_frame(self):
+        self.stage.submit("first")
+        self.stage.submit("second")
+        self.executor.run_next()
+        # Resubmitted to the executor rather than converted on the same call
+        self.assertEqual(self.converter.converted, ["first"])
+        self.assertEqual(len(self.executor.calls), 1)
+        self.executor.run_next()
+        self.assertEqual(self.mailbox.take().frame, "second")
+
+    def test_idle_after_the_last_conversion(self):
+        self.stage.submit("first")
+        self.executor.run_next()
+        self.stage.submit("second")
+        self.assertEqual(len(self.executor.calls), 1)
+        self.assertEqual(self.stage.dropped, 0)
+
+    def test_conversion_error_keeps_the_stage_running(self):
+        self.stage.submit("broken")
+        self.stage.submit("next")
+        self.executor.run_next()
+        self.executor.run_next()
+        self.assertEqual(self.mailbox.take().frame, "next")
+
+
+
+class FitSizeTests(unittest.TestCase):
+    def test_source_size_without_target(self):
+        self.assertEqual(fit_size(640, 480), (640, 480))
+
+    def test_keeps_the_aspect_ratio(self):
+        self.assertEqual(fit_size(1920, 1080, (960, 960)), (960, 540))
+        self.assertEqual(fit_size(1920, 1080, (1920, 540)), (960, 540))
+
+    def test_never_scales_up(self):
+        self.assertEqual(fit_size(320, 240, (1280, 720)), (320, 240))
+
+    def test_at_least_one_pixel(self):
+        self.assertEqual(fit_size(1000, 10, (10, 10)), (10, 1))
+
+
+class FrameConverterTests(unittest.TestCase):
+    def setUp(self):
+        self.converter = FrameConverter()
+
+    def frame(self, width=64, height=48):
+        return VideoFrame.from_ndarray(np.zeros((height, width, 3), np.uint8), format="rgb24")
+
+    def test_output_size_follows_source_and_target(self):
+        frame = self.frame()
+        self.assertEqual(self.converter.output_size(frame), (64, 48))
+        self.assertEqual(self.converter.output_size(frame, (32, 32)), (32, 24))
+        self.assertEqual(self.converter.output_size(self.frame(48, 64), (32, 32)), (24, 32))
+
+    def test_output_size_cached_while_sizes_stay(self):
+        frame = self.frame()
+        first = self.converter.output_size(frame, (32, 32))
+        self.assertIs(self.converter.output_size(self.frame(), (32, 32)), first)
+
+    def test_image_downscaled_during_conversion(self):
+        image = self.converter.to_qimage(self.frame(), (32, 32))
+        self.assertEqual((image.width(), image.height()), (32, 24))
+        self.assertEqual((image.frame.width, image.frame.height), (32, 24))
+
+
+if __name__ == "__main__":
+    unittest.main()
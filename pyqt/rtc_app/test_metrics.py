@@ -0,0 +1,82 @@
+import time
+import types
+import unittest
+
+from metrics import STAGES, LatencyWindow, RateCounter, StreamMetrics, format_snapshot
+
+
+def frame(media_time):
+    return types.SimpleNamespace(time=media_time)
+
+
+class LatencyWindowTests(unittest.TestCase):
+    def test_no_samples(self):
+        self.assertEqual(LatencyWindow().percentiles(), {"p50": None, "p95": None, "p99": None})
+
+    def test_percentiles(self):
+        window = LatencyWindow()
+        for sample in reversed(range(100)):
+            window.add(sample / 1000)
+        self.assertEqual(window.percentiles(), {"p50": 0.05, "p95": 0.095, "p99": 0.099})
+
+    def test_single_sample(self):
+        window = LatencyWindow()
+        window.add(0.02)
+        self.assertEqual(window.percentiles(), {"p50": 0.02, "p95": 0.02, "p99": 0.02})
+
+    def test_keeps_the_latest_samples(self):
+        window = LatencyWindow(size=2)
+        for sample in (1.0, 0.1, 0.2):
+            window.add(sample)
+        self.assertEqual(window.percentiles()["p99"], 0.2)
+
+
+class RateCounterTests(unittest.TestCase):
+    def test_rate_over_the_last_second(self):
+        counter = RateCounter()
+        for now in (10.0, 10.5, 10.9, 11.2):
+            counter.add(now)
+        self.assertEqual(counter.rate(11.3), 3)
+        self.assertEqual(counter.rate(12.5), 0)
+        self.assertEqual(counter.total, 4)
+
+
+class StreamMetricsTests(unittest.TestCase):
+    def setUp(self):
+        self.metrics = StreamMetrics()
+
+    def test_receive_latency_relative_to_the_earliest_frame(self):
+        self.metrics.frame_received(frame(0.0), now=100.05)
+        self.metrics.frame_received(frame(0.1), now=100.12)
+        self.metrics.frame_received(frame(0.2), now=100.28)
+        samples = [round(sample, 3) for sample in self.metrics.stages["receive"].samples]
+        self.assertEqual(samples, [0.0, 0.0, 0.06])
+
+    def test_frames_without_time_not_timed(self):
+        self.metrics.frame_received(frame(None), now=100)
+        self.assertEqual(len(self.metrics.stages["receive"].samples), 0)
+        self.assertEqual(self.metrics.received.total, 1)
+
+    def test_snapshot(self):
+        now = time.perf_counter()
+        self.metrics.frame_received(frame(None), now)
+        self.metrics.frame_displayed(now)
+        self.metrics.record("convert", 0.0041234)
+        self.metrics.dropped = 2
+        snapshot = self.metrics.snapshot(mailbox_dropped=3)
+        self.assertEqual((snapshot["received"], snapshot["displayed"], snapshot["dropped"]), (1, 1, 5))
+        self.assertEqual((snapshot["receive_fps"], snapshot["display_fps"]), (1, 1))
+        self.assertEqual(set(snapshot["latency_ms"]), set(STAGES))
+        self.assertEqual(snapshot["latency_ms"]["convert"]["p50"], 4.12)
+        self.assertIsNone(snapshot["latency_ms"]["paint"]["p50"])
+
+    def test_format_snapshot(self):
+        self.metrics.record("paint", 0.002)
+        line = format_snapshot("peer-1", self.metrics.snapshot())
+        self.assertTrue(line.startswith("peer-1: 0 fps in, 0 fps shown, 0 dropped, 0 late, 0 errors"))
+        self.assertIn("paint 2.0/2.0/2.0", line)
+        self.assertIn("convert 0.0/0.0/0.0", line)
+
+
+if __name__ == "__main__":
+    unittest.main()
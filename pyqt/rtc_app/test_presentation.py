@@ -0,0 +1,78 @@
+import types
+import unittest
+from fractions import Fraction
+
+from presentation import PresentationScheduler, media_time
+
+REFRESH = 1 / 60
+
+
+def image(timestamp):
+    return types.SimpleNamespace(timestamp=timestamp)
+
+
+class MediaTimeTests(unittest.TestCase):
+    def test_timestamp_of_remote_image(self):
+        self.assertEqual(media_time(image(1.5), 9), 1.5)
+
+    def test_timestamp_of_converted_frame(self):
+        frame = types.SimpleNamespace(pts=180000, time_base=Fraction(1, 90000))
+        self.assertEqual(media_time(types.SimpleNamespace(frame=frame), 9), 2)
+
+    def test_default_without_timestamp(self):
+        self.assertEqual(media_time(object(), 9), 9)
+        frame = types.SimpleNamespace(pts=None, time_base=None)
+        self.assertEqual(media_time(types.SimpleNamespace(frame=frame), 9), 9)
+
+
+class PresentationSchedulerTests(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = PresentationScheduler(jitter_budget=0.05)
+
+    def test_frame_due_after_the_jitter_budget(self):
+        first = image(0)
+        self.scheduler.push(first, now=100)
+        self.assertIsNone(self.scheduler.pop(100.02, REFRESH))
+        self.assertIs(self.scheduler.pop(100.05, REFRESH), first)
+        self.assertEqual(self.scheduler.counters(), {"shown": 1, "late": 0, "queued": 0})
+
+    def test_delayed_frames_are_spaced_by_their_timestamps(self):
+        # The second frame arrives 40 ms late, within the budget, with the third
+        frames = [image(0), image(0.1), image(0.2)]
+        self.scheduler.push(frames[0], now=100)
+        self.scheduler.push(frames[1], now=100.14)
+        self.scheduler.push(frames[2], now=100.2)
+        self.assertIs(self.scheduler.pop(100.05, REFRESH), frames[0])
+        self.assertIsNone(self.scheduler.pop(100.1, REFRESH))
+        self.assertIs(self.scheduler.pop(100.15, REFRESH), frames[1])
+        self.assertIsNone(self.scheduler.pop(100.2, REFRESH))
+        self.assertIs(self.scheduler.pop(100.25, REFRESH), frames[2])
+
+    def test_latest_due_frame_shown_older_ones_late(self):
+        frames = [image(0), image(0.01), image(0.02)]
+        for offset, frame in enumerate(frames):
+            self.scheduler.push(frame, now=100 + offset * 0.01)
+        self.assertIs(self.scheduler.pop(100.1, REFRESH), frames[2])
+        self.assertEqual(self.scheduler.counters(), {"shown": 1, "late": 2, "queued": 0})
+
+    def test_clock_mapped_by_the_fastest_frame(self):
+        # The first frame arrived 30 ms later than the second, which sets the offset
+        first, second = image(0), image(0.1)
+        self.scheduler.push(first, now=100.03)
+        self.scheduler.push(second, now=100.1)
+        self.assertIs(self.scheduler.pop(100.05, REFRESH), first)
+        self.assertIsNone(self.scheduler.pop(100.14, REFRESH))
+        self.assertIs(self.scheduler.pop(100.15, REFRESH), second)
+
+    def test_offsets_window(self):
+        scheduler = PresentationScheduler(jitter_budget=0, window=2)
+        scheduler.push(image(0), now=100)
+        scheduler.push(image(0.1), now=100.3)
+        scheduler.push(image(0.2), now=100.4)
+        # The first frame's offset fell out of the window, the others are 200 ms behind
+        self.assertAlmostEqual(min(scheduler.offsets), 100.2)
+        self.assertEqual(scheduler.counters()["queued"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
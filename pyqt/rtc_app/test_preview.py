@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import unittest
+
+import numpy as np
+from av import VideoFrame
+
+from preview import JpegEncoder, JpegPreview
+
+
+class FakeEncoder:
+    """
+    Stands for the JPEG of a frame with the frame itself, blocking until released.
+    """
+    def __init__(self):
+        self.frames = []
+        self.released = None
+
+    def encode(self, frame):
+        self.frames.append(frame)
+        if self.released is not None:
+            self.released.wait()
+        return frame
+
+
+def frame(width=64, height=48):
+    return VideoFrame.from_ndarray(np.zeros((height, width, 3), np.uint8), format="rgb24")
+
+
+class JpegEncoderTests(unittest.TestCase):
+    def test_encodes_jpeg(self):
+        jpeg = JpegEncoder().encode(frame())
+        self.assertTrue(jpeg.startswith(b"\xff\xd8"))
+        self.assertTrue(jpeg.endswith(b"\xff\xd9"))
+
+    def test_fits_max_size_with_even_sizes(self):
+        encoder = JpegEncoder(max_size=(33, 33))
+        encoder.encode(frame(64, 48))
+        self.assertEqual((encoder.codec.width, encoder.codec.height), (32, 24))
+        encoder.encode(frame(64, 64))
+        self.assertEqual((encoder.codec.width, encoder.codec.height), (32, 32))
+
+
+class JpegPreviewTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.encoder = FakeEncoder()
+        self.preview = JpegPreview(encoder=self.encoder)
+
+    async def test_latest_frame(self):
+        first, second = object(), object()
+        self.preview.put(first)
+        self.preview.put(second)
+        self.assertEqual(await self.preview.jpeg(), (2, second))
+        self.assertEqual(self.encoder.frames, [second])
+
+    async def test_frame_encoded_once(self):
+        self.preview.put(object())
+        await self.preview.jpeg()
+        await self.preview.jpeg()
+        self.assertEqual(self.preview.encoded, 1)
+
+    async def test_viewers_share_an_encoding(self):
+        self.encoder.released = threading.Event()
+        self.preview.put(object())
+        viewers = [asyncio.ensure_future(self.preview.jpeg()) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        self.assertEqual(self.preview.watchers, 3)
+        self.encoder.released.set()
+        results = await asyncio.gather(*viewers)
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual(len(self.encoder.frames), 1)
+        self.assertEqual(self.preview.watchers, 0)
+
+    async def test_waits_for_a_newer_frame(self):
+        first, second = object(), object()
+        self.preview.put(first)
+        waiting = asyncio.ensure_future(self.preview.jpeg(after=1))
+        await asyncio.sleep(0)
+        self.assertFalse(waiting.done())
+        self.preview.put(second)
+        self.assertEqual(await waiting, (2, second))
+
+    async def test_close_ends_waits(self):
+        waiting = asyncio.ensure_future(self.preview.jpeg())
+        await asyncio.sleep(0)
+        self.preview.close()
+        with self.assertRaises(ConnectionResetError):
+            await waiting
+        with self.assertRaises(ConnectionResetError):
+            await self.preview.jpeg()
+
+    async def test_closed_preview_serves_its_last_frame(self):
+        self.preview.put(object())
+        self.preview.close()
+        sequence, _ = await self.preview.jpeg()
+        self.assertEqual(sequence, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
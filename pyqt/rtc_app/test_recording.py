@@ -0,0 +1,127 @@
+import os
+import queue
+import tempfile
+import unittest
+
+from recording import SegmentedRecorder, TimestampUnwrapper, VIDEO_CLOCK_RATE, is_keyframe
+
+VP8 = "video/VP8"
+# 30 fps on the RTP clock
+FRAME = VIDEO_CLOCK_RATE // 30
+
+
+def vp8_frame(keyframe):
+    return bytes([0x10 if keyframe else 0x11]) + bytes(32)
+
+
+class IsKeyframeTests(unittest.TestCase):
+    def test_empty_frame(self):
+        self.assertFalse(is_keyframe("video/VP8", b""))
+        self.assertFalse(is_keyframe("video/H264", b""))
+
+    def test_vp8_key_frame_flag(self):
+        # Bit 0 of the frame tag is set on interframes
+        self.assertTrue(is_keyframe("video/VP8", bytes([0x10, 0x02, 0x00])))
+        self.assertFalse(is_keyframe("video/VP8", bytes([0x11, 0x02, 0x00])))
+
+    def test_h264_idr_slice(self):
+        self.assertTrue(is_keyframe("video/H264", b"\x00\x00\x00\x01\x65\x88\x84"))
+
+    def test_h264_sequence_parameter_set(self):
+        self.assertTrue(is_keyframe("video/H264", b"\x00\x00\x00\x01\x67\x42\x00\x1f\x00\x00\x01\x68\xce"))
+
+    def test_h264_key_unit_after_other_units(self):
+        # Access unit delimiter, SEI, then the IDR slice
+        data = b"\x00\x00\x00\x01\x09\xf0\x00\x00\x01\x06\x05\x00\x00\x00\x01\x65\x88"
+        self.assertTrue(is_keyframe("video/H264", data))
+
+    def test_h264_non_idr_slice(self):
+        self.assertFalse(is_keyframe("video/H264", b"\x00\x00\x00\x01\x41\x9a\x02"))
+
+    def test_h264_start_code_at_the_end(self):
+        self.assertFalse(is_keyframe("video/H264", b"\x41\x9a\x00\x00\x01"))
+
+    def test_unknown_codec(self):
+        self.assertFalse(is_keyframe("video/AV1", b"\x00\x00\x01\x65"))
+
+
+
+class TimestampUnwrapperTests(unittest.TestCase):
+    def test_increasing(self):
+        clock = TimestampUnwrapper()
+        self.assertEqual([clock.unwrap(t) for t in (1000, 4000, 7000)], [1000, 4000, 7000])
+
+    def test_wrap(self):
+        clock = TimestampUnwrapper()
+        start = 2 ** 32 - FRAME
+        self.assertEqual([clock.unwrap(t) for t in (start, 0, FRAME)], [start, 2 ** 32, 2 ** 32 + FRAME])
+
+    def test_earlier_frame_across_the_wrap(self):
+        clock = TimestampUnwrapper()
+        clock.unwrap(100)
+        self.assertEqual(clock.unwrap(2 ** 32 - 100), -100)
+        self.assertEqual(clock.unwrap(200), 200)
+
+
+class SegmentedRecorderTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def record(self, recorder, timestamps, keyframe_interval=30):
+        clock = TimestampUnwrapper()
+        for index, timestamp in enumerate(timestamps):
+            keyframe = index % keyframe_interval == 0
+            recorder.write(VP8, vp8_frame(keyframe), clock.unwrap(timestamp), keyframe)
+        recorder.close()
+        recorder._thread.join(10)
+        self.assertFalse(recorder._thread.is_alive())
+
+    def test_frames_before_the_first_keyframe_dropped(self):
+        recorder = SegmentedRecorder(self.directory.name, "test")
+        recorder.write(VP8, vp8_frame(False), 0, False)
+        self.assertEqual((recorder.segments, recorder.dropped), (0, 1))
+        self.assertFalse(recorder.wants_keyframe("video/H265", 0))
+        self.assertTrue(recorder.wants_keyframe(VP8, 0))
+        self.record(recorder, [])
+
+    def test_segments_across_a_timestamp_wrap(self):
+        recorder = SegmentedRecorder(self.directory.name, "test", segment_duration=1)
+        start = 2 ** 32 - 45 * FRAME
+        self.record(recorder, [(start + index * FRAME) % 2 ** 32 for index in range(120)])
+        self.assertFalse(recorder.failed)
+        self.assertEqual(recorder.segments, 4)
+        self.assertEqual(len(os.listdir(self.directory.name)), 4)
+
+    def test_write_error_stops_the_recorder(self):
+        # The directory cannot be created below a file
+        with tempfile.NamedTemporaryFile(dir=self.directory.name) as file:
+            recorder = SegmentedRecorder(os.path.join(file.name, "recordings"), "test")
+            recorder.write(VP8, vp8_frame(True), 0, True)
+            recorder._thread.join(10)
+            self.assertTrue(recorder.failed)
+            for index in range(1, 10):
+                recorder.write(VP8, vp8_frame(False), index * FRAME, False)
+            self.assertTrue(recorder._queue.empty())
+            self.assertFalse(recorder.wants_keyframe(VP8, 10 * FRAME))
+
+    def test_frames_dropped_up_to_a_keyframe_while_the_writer_is_behind(self):
+        recorder = SegmentedRecorder(self.directory.name, "test", max_queued=3)
+        # Stands for a writer that does not keep up, the keyframe queues its segment too
+        recorder._queue, writer_queue = queue.Queue(), recorder._queue
+        for index in range(5):
+            recorder.write(VP8, vp8_frame(index == 0), index * FRAME, index == 0)
+        self.assertEqual((recorder._queue.qsize(), recorder.dropped), (3, 3))
+        self.assertTrue(recorder.wants_keyframe(VP8, 5 * FRAME))
+
+        recorder._queue.queue.clear()
+        recorder.write(VP8, vp8_frame(False), 6 * FRAME, False)
+        self.assertEqual((recorder._queue.qsize(), recorder.dropped), (0, 4))
+        recorder.write(VP8, vp8_frame(True), 7 * FRAME, True)
+        self.assertEqual(recorder._queue.get_nowait(), ("frame", vp8_frame(True), 7 * FRAME, True))
+        self.assertFalse(recorder.wants_keyframe(VP8, 8 * FRAME))
+        writer_queue.put(None)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from aiortc import RTCConfiguration
+from aiortc.mediastreams import MediaStreamError
+
+import server
+from preview import JpegPreview
+from streams import StreamRegistry
+
+
+class EndedTrack:
+    kind = "video"
+
+    async def recv(self):
+        raise MediaStreamError
+
+
+class SilentTrack:
+    kind = "video"
+
+    async def recv(self):
+        await asyncio.Event().wait()
+
+
+class TeardownTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        patcher = mock.patch.multiple(server, streams=StreamRegistry(metrics=False), pcs=set(), receiver_tasks={})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def peer_connection(self):
+        return server.create_peer_connection("127.0.0.1", {}, RTCConfiguration(iceServers=[]))
+
+    async def test_close_peer_cancels_its_receivers_once(self):
+        pc = self.peer_connection()
+        task = asyncio.ensure_future(asyncio.Event().wait())
+        server.receiver_tasks[pc].add(task)
+
+        await server.close_peer(pc)
+        self.assertNotIn(pc, server.pcs)
+        self.assertNotIn(pc, server.receiver_tasks)
+        self.assertEqual(pc.connectionState, "closed")
+        await asyncio.sleep(0)
+        self.assertTrue(task.cancelled())
+        # Closing again, as the state change handler does, is a no-op
+        await server.close_peer(pc)
+
+    async def test_ended_track_closes_the_peer(self):
+        pc = self.peer_connection()
+        stream = server.streams.add("peer")
+        stream.preview = JpegPreview()
+        await server.VideoReceiver(EndedTrack(), stream, pc).run()
+
+        self.assertEqual(server.streams.streams, {})
+        self.assertTrue(stream.preview.closed)
+        await asyncio.sleep(0.1)
+        self.assertNotIn(pc, server.pcs)
+        self.assertEqual(pc.connectionState, "closed")
+
+    async def test_idle_track_closes_the_peer(self):
+        pc = self.peer_connection()
+        stream = server.streams.add("peer")
+        with mock.patch.object(server, "IDLE_TIMEOUT", 0.01):
+            await server.VideoReceiver(SilentTrack(), stream, pc).run()
+        await asyncio.sleep(0.1)
+        self.assertEqual(server.streams.streams, {})
+        self.assertNotIn(pc, server.pcs)
+
+    async def test_closing_the_peer_stops_its_receiver(self):
+        pc = self.peer_connection()
+        stream = server.streams.add("peer")
+        task = asyncio.ensure_future(server.VideoReceiver(SilentTrack(), stream, pc).run())
+        server.receiver_tasks[pc].add(task)
+        await asyncio.sleep(0)
+
+        await server.close_peer(pc)
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertEqual(server.streams.streams, {})
+
+    async def test_shutdown_closes_all_peers(self):
+        connections = [self.peer_connection() for _ in range(3)]
+        await server.on_shutdown(server.app)
+        self.assertEqual(server.pcs, set())
+        self.assertEqual({pc.connectionState for pc in connections}, {"closed"})
+
+
+if __name__ == "__main__":
+    unittest.main()
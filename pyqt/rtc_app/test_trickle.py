@@ -0,0 +1,80 @@
+import json
+import unittest
+from unittest import mock
+
+from aiortc import RTCIceCandidate, RTCIceServer, RTCPeerConnection
+
+import trickle
+from trickle import (
+    candidate_from_json, candidate_to_json, gather_reflexive_candidates, trickle_configuration, uses_turn,
+)
+
+STUN = RTCIceServer("stun:stun.example.org:3478")
+TURN = RTCIceServer(["turn:turn.example.org:3478?transport=udp", "turns:turn.example.org:5349"],
+                    username="user", credential="secret")
+
+
+class CandidateJsonTests(unittest.TestCase):
+    def test_round_trip(self):
+        candidate = RTCIceCandidate(component=1, foundation="4cb1a4e8", ip="203.0.113.7", port=50123,
+                                    priority=1694498815, protocol="udp", type="srflx",
+                                    relatedAddress="192.168.1.20", relatedPort=50123,
+                                    sdpMid="0", sdpMLineIndex=0)
+        data = json.loads(json.dumps(candidate_to_json(candidate)))
+        self.assertTrue(data["candidate"].startswith("candidate:4cb1a4e8 1 udp 1694498815 203.0.113.7 50123 typ srflx"))
+        self.assertEqual((data["sdpMid"], data["sdpMLineIndex"]), ("0", 0))
+        self.assertEqual(candidate_from_json(data), candidate)
+
+    def test_browser_candidate(self):
+        candidate = candidate_from_json({
+            "candidate": "candidate:842163049 1 udp 1677729535 198.51.100.4 61200 typ srflx "
+                         "raddr 10.0.0.5 rport 61200 generation 0",
+            "sdpMid": "video",
+            "sdpMLineIndex": 1,
+        })
+        self.assertEqual((candidate.ip, candidate.port, candidate.type), ("198.51.100.4", 61200, "srflx"))
+        self.assertEqual((candidate.sdpMid, candidate.sdpMLineIndex), ("video", 1))
+
+    def test_missing_media_fields(self):
+        candidate = candidate_from_json({"candidate": "candidate:1 1 udp 2130706431 10.0.0.5 5000 typ host"})
+        self.assertIsNone(candidate.sdpMid)
+        self.assertIsNone(candidate.sdpMLineIndex)
+
+
+class IceServerTests(unittest.TestCase):
+    def test_uses_turn(self):
+        self.assertFalse(uses_turn(None))
+        self.assertFalse(uses_turn([STUN]))
+        self.assertTrue(uses_turn([STUN, RTCIceServer("turn:turn.example.org")]))
+        self.assertTrue(uses_turn([TURN]))
+        self.assertFalse(uses_turn([RTCIceServer(["stun:a.example.org", "stun:b.example.org"])]))
+
+    def test_trickle_configuration_drops_stun_servers(self):
+        self.assertEqual(trickle_configuration(None).iceServers, [])
+        self.assertEqual(trickle_configuration([STUN]).iceServers, [])
+
+    def test_trickle_configuration_keeps_turn(self):
+        self.assertEqual(trickle_configuration([STUN, TURN]).iceServers, [STUN, TURN])
+
+
+class GatherReflexiveCandidatesTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.pc = RTCPeerConnection(trickle_configuration(None))
+        self.addAsyncCleanup(self.pc.close)
+        self.pc.addTransceiver("video", direction="recvonly")
+        await self.pc.setLocalDescription(await self.pc.createOffer())
+
+    async def test_default_stun_server(self):
+        with mock.patch.object(trickle, "server_reflexive_candidate", side_effect=OSError) as query:
+            self.assertEqual(await gather_reflexive_candidates(self.pc, None), [])
+        self.assertTrue(query.called)
+        self.assertEqual({call.args[1] for call in query.call_args_list}, {("stun.l.google.com", 19302)})
+
+    async def test_none_with_turn(self):
+        with mock.patch.object(trickle, "server_reflexive_candidate") as query:
+            self.assertEqual(await gather_reflexive_candidates(self.pc, [TURN]), [])
+        query.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import asyncio
+import ipaddress
+
+import aiohttp
+from aioice.ice import server_reflexive_candidate
+from aiortc import RTCConfiguration, RTCIceCandidate, RTCPeerConnection
+from aiortc.rtcicetransport import RTCIceGatherer, candidate_from_aioice, connection_kwargs
+from aiortc.sdp import candidate_from_sdp, candidate_to_sdp
+
+# Seconds to wait for a STUN server's answer, as aioice does when gathering
+STUN_TIMEOUT = 5
+
+
+def uses_turn(ice_servers) -> bool:
+    for server in ice_servers or ():
+        urls = [server.urls] if isinstance(server.urls, str) else server.urls
+        if any(url.startswith(("turn:", "turns:")) for url in urls):
+            return True
+    return False
+
+
+def trickle_configuration(ice_servers) -> RTCConfiguration:
+    """
+    Configuration gathering only host candidates, which takes no network round trip,
+    so setLocalDescription() returns at once. Server-reflexive candidates are trickled.
+
+    aiortc only allocates TURN relays while gathering, so with a TURN server among
+    `ice_servers` all candidates are gathered up front instead, and none are trickled.
+    """
+    if uses_turn(ice_servers):
+        return RTCConfiguration(iceServers=ice_servers)
+    return RTCConfiguration(iceServers=[])
+
+
+def candidate_to_json(candidate: RTCIceCandidate) -> dict:
+    return {
+        "candidate": "candidate:" + candidate_to_sdp(candidate),
+        "sdpMid": candidate.sdpMid,
+        "sdpMLineIndex": candidate.sdpMLineIndex,
+    }
+
+
+def candidate_from_json(data: dict) -> RTCIceCandidate:
+    candidate = candidate_from_sdp(data["candidate"].split(":", 1)[1])
+    candidate.sdpMid = data.get("sdpMid")
+    candidate.sdpMLineIndex = data.get("sdpMLineIndex")
+    return candidate
+
+
+async def gather_reflexive_candidates(pc: RTCPeerConnection, ice_servers) -> list:
+    """
+    Asks the STUN server of `ice_servers` (aiortc's default STUN server if none) for the
+    public address of each host candidate socket of the connection, after its host-only
+    description was set. Returns none with TURN, see trickle_configuration().
+
+    Connectivity checks are sent from the host sockets either way, so the local ICE
+    agent doesn't need these candidates, only the remote one. aiortc has no way of
+    gathering them later, this uses the sockets of aioice's connection directly.
+    """
+    if uses_turn(ice_servers):
+        return []  # Already in the description
+    # Same default as aiortc's own gathering
+    stun_server = connection_kwargs(ice_servers or RTCIceGatherer.getDefaultIceServers()).get("stun_server")
+    if stun_server is None:
+        return []
+
+    queries = []
+    seen = set()
+    for index, transceiver in enumerate(pc.getTransceivers()):
+        gatherer = transceiver.receiver.transport.transport.iceGatherer
+        if id(gatherer) in seen:
+            continue  # Bundled on an earlier transceiver's transport
+        seen.add(id(gatherer))
+        for protocol in gatherer._connection._protocols:
+            if ipaddress.ip_address(protocol.local_candidate.host).version == 4:
+                queries.append((transceiver.mid, index, protocol))
+
+    results = await asyncio.gather(*(
+        asyncio.wait_for(server_reflexive_candidate(protocol, stun_server), STUN_TIMEOUT)
+        for _, _, protocol in queries
+    ), return_exceptions=True)
+
+    candidates = []
+    for (mid, index, _), result in zip(queries, results):
+        if isinstance(result, BaseException):
+            continue  # Unreachable STUN server, host candidates only
+        candidate = candidate_from_aioice(result[0])
+        candidate.sdpMid, candidate.sdpMLineIndex = mid, index
+        candidates.append(candidate)
+    return candidates
+
+
+async def exchange_candidates(ws, pc: RTCPeerConnection, ice_servers):
+    """
+    Trickles the connection's reflexive candidates over the WebSocket once gathered,
+    and adds the remote peer's candidates as they arrive, until both sides sent
+    {"done": true}. Both peers run this after the offer and answer were exchanged.
+    """
+    async def send():
+        candidates = await gather_reflexive_candidates(pc, ice_servers)
+        await ws.send_json({"candidates": [candidate_to_json(c) for c in candidates], "done": True})
+
+    sending = asyncio.ensure_future(send())
+    try:
+        async for message in ws:
+            if message.type != aiohttp.WSMsgType.TEXT:
+                break
+            data = message.json()
+            for candidate in data.get("candidates", ()):
+                await pc.addIceCandidate(candidate_from_json(candidate))
+            if data.get("done"):
+                await pc.addIceCandidate(None)
+                break
+        await sending
+    finally:
+        sending.cancel()
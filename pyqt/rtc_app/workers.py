@@ -0,0 +1,577 @@
+import json
+import signal
+import asyncio
+import itertools
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+from aiohttp import web
+from aiortc import RTCConfiguration, RTCIceServer
+
+import server
+from framering import FrameRing
+from streams import Stream, StreamRegistry
+from trickle import exchange_candidates, trickle_configuration
+
+# Seconds between metrics snapshots sent by receiver processes
+METRICS_INTERVAL = 1
+
+# Seconds receiver processes get to close their peer connections on shutdown
+STOP_TIMEOUT = 5
+
+
+class RingMailbox:
+    """
+    Stands in for the mailbox of a stream in a receiver process: converted frames
+    are written to the stream's ring, and the GUI process is told about each one.
+    """
+    def __init__(self, ring: FrameRing, notify):
+        self.ring = ring
+        self.notify = notify
+        self.received = 0
+
+    def put(self, image):
+        self.ring.write(image)
+        self.received += 1
+        self.notify()
+
+    def counters(self):
+        # Frames the GUI missed are counted on its side
+        return {"received": self.received, "delivered": self.received, "dropped": 0}
+
+
+class RingStream(Stream):
+    """
+    Stream of a peer in a receiver process. Frames go to a FrameRing shared with
+    the GUI process, which sets the stream's visibility and target size in it.
+    """
+    def __init__(self, stream_id: int, name: str, metrics=None, peer: str = None,
+                 slots=4, max_size=(1920, 1080), notify=None):
+        self.ring = FrameRing.create(slots, max_size)
+        super().__init__(stream_id, name, metrics, peer)
+        self.mailbox = RingMailbox(self.ring, lambda: notify(self))
+
+    @property
+    def visible(self) -> bool:
+        return self.ring.visible
+
+    @visible.setter
+    def visible(self, visible: bool):
+        self.ring.visible = visible
+
+    @property
+    def target_size(self):
+        return self.ring.target_size
+
+    @target_size.setter
+    def target_size(self, size):
+        self.ring.target_size = size
+
+
+class RingStreamRegistry(StreamRegistry):
+    """
+    Streams of a receiver process, each with a ring of `slots` frames up to `max_size`.
+    """
+    def __init__(self, notify, slots=4, max_size=(1920, 1080), metrics=True, analysis=False, parent=None):
+        super().__init__(metrics, analysis, parent)
+        self.notify = notify
+        self.slots = slots
+        self.max_size = max_size
+
+    def add(self, name: str, visible=True) -> RingStream:
+        return super().add(name, visible, RingStream, slots=self.slots, max_size=self.max_size,
+                           notify=self.notify)
+
+
+class RelayedSocket:
+    """
+    A client's trickle WebSocket as seen from a receiver process, with messages
+    relayed by the GUI process. Enough of aiohttp's WebSocketResponse for
+    exchange_candidates().
+    """
+    def __init__(self, send):
+        self._send = send
+        self._messages = asyncio.Queue()
+
+    async def send_json(self, data):
+        self._send(data)
+
+    def feed(self, data):
+        """
+        Queues a message from the client, None once the socket closed.
+        """
+        self._messages.put_nowait(data)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        data = await self._messages.get()
+        if data is None:
+            raise StopAsyncIteration
+        return aiohttp.WSMessage(aiohttp.WSMsgType.TEXT, json.dumps(data), None)
+
+
+class RemotePreview:
+    """
+    Stands in for the JpegPreview of a stream received by a receiver process:
+    JPEGs are encoded there and sent over the pipe. Viewers waiting for the same
+    frame share one request, so each JPEG crosses the pipe once.
+    """
+    def __init__(self, request):
+        self.request = request
+        self.watchers = 0
+        self._requests = {}
+
+    async def jpeg(self, after=0):
+        self.watchers += 1
+        try:
+            future = self._requests.get(after)
+            if future is None:
+                future = self._requests[after] = asyncio.ensure_future(self.request(after))
+                future.add_done_callback(lambda _: self._requests.pop(after, None))
+            # Shielded, a viewer going away doesn't cancel the others' request
+            return await asyncio.shield(future)
+        finally:
+            self.watchers -= 1
+
+
+class ReceiverWorker:
+    """
+    Runs server.py's WebRTC stack in a receiver process, for the peers the GUI
+    process assigns to it over `connection`.
+
+    Requests from the GUI process:
+        ("offer" | "trickle", request id, peer address, offer params)
+        ("ws", request id, message) and ("ws_closed", request id) for trickle sockets
+        ("preview", request id, stream id, sequence), for a JPEG of a frame newer than the sequence
+        ("stop",)
+    Events sent back:
+        ("answer", request id, answer or None, error or None)
+        ("ws", request id, message) and ("ws_closed", request id)
+        ("preview", request id, sequence, JPEG), both None if the stream is gone
+        ("stream_added", stream id, peer address, visible, ring name)
+        ("stream_removed", stream id)
+        ("frame", stream id), after each frame written to the stream's ring
+        ("analysis", stream id, analysis results)
+        ("metrics", stream id, snapshot)
+    """
+    def __init__(self, connection, options: dict):
+        self.connection = connection
+        self.sockets = {}
+        self.stopped = None
+
+        server.streams = RingStreamRegistry(self.frame_written, options["ring_slots"], options["ring_max_size"],
+                                            options["metrics"], bool(options["analysis"]))
+        server.streams.stream_added.connect(self.stream_added)
+        server.streams.stream_removed.connect(self.stream_removed)
+        if options["conversion_workers"] > 0:
+            server.conversion_executor = ThreadPoolExecutor(options["conversion_workers"], thread_name_prefix="convert")
+        server.analysis_processors = options["analysis"]
+        server.ANALYSIS_FPS = options["analysis_fps"]
+        server.ANALYSIS_WIDTH = options["analysis_width"]
+        if options["analysis"] and options["analysis_workers"] > 0:
+            server.analysis_executor = ThreadPoolExecutor(options["analysis_workers"], thread_name_prefix="analyze")
+        server.PREVIEW_FPS = options["preview_fps"]
+        if options["preview_workers"] > 0:
+            server.preview_executor = ThreadPoolExecutor(options["preview_workers"], thread_name_prefix="preview")
+        server.recording_dir = options["recording_dir"]
+        server.SEGMENT_DURATION = options["segment_duration"]
+        if options["ice_servers"]:
+            server.ice_servers = [RTCIceServer(url) for url in options["ice_servers"]]
+
+    def send(self, *message):
+        try:
+            self.connection.send(message)
+        except OSError:
+            # GUI process gone
+            self.stopped.set()
+
+    def stream_added(self, stream: RingStream):
+        self.send("stream_added", stream.id, stream.peer, stream.visible, stream.ring.name)
+        if stream.analysis is not None:
+            stream.analysis.published.connect(lambda results: self.send("analysis", stream.id, results))
+
+    def stream_removed(self, stream: RingStream):
+        self.send("stream_removed", stream.id)
+        stream.ring.close()
+
+    def frame_written(self, stream: RingStream):
+        self.send("frame", stream.id)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self.stopped = asyncio.Event()
+        loop.add_reader(self.connection.fileno(), self.receive)
+        metrics = asyncio.ensure_future(self.send_metrics()) if server.streams.metrics else None
+        try:
+            await self.stopped.wait()
+        finally:
+            loop.remove_reader(self.connection.fileno())
+            if metrics is not None:
+                metrics.cancel()
+            await server.on_shutdown(None)
+
+    def receive(self):
+        while not self.stopped.is_set() and self.connection.poll():
+            try:
+                message = self.connection.recv()
+            except (EOFError, OSError):
+                self.stopped.set()
+                return
+
+            kind = message[0]
+            if kind in ("offer", "trickle"):
+                asyncio.ensure_future(self.answer(*message))
+            elif kind == "ws":
+                socket = self.sockets.get(message[1])
+                if socket is not None:
+                    socket.feed(message[2])
+            elif kind == "ws_closed":
+                socket = self.sockets.get(message[1])
+                if socket is not None:
+                    socket.feed(None)
+            elif kind == "preview":
+                asyncio.ensure_future(self.preview(*message[1:]))
+            elif kind == "stop":
+                self.stopped.set()
+
+    async def answer(self, kind, request_id, remote, params):
+        if kind == "trickle":
+            configuration = trickle_configuration(server.ice_servers)
+        else:
+            configuration = RTCConfiguration(iceServers=server.ice_servers)
+        try:
+            pc = server.create_peer_connection(remote, params, configuration)
+            answer = await server.answer_offer(pc, params)
+        except Exception as e:
+            self.send("answer", request_id, None, str(e))
+            return
+
+        if kind == "offer":
+            self.send("answer", request_id, answer, None)
+            return
+
+        # Registered before the answer is sent, the client's candidates follow it
+        socket = self.sockets[request_id] = RelayedSocket(lambda data: self.send("ws", request_id, data))
+        self.send("answer", request_id, answer, None)
+        try:
+            await exchange_candidates(socket, pc, server.ice_servers)
+        finally:
+            del self.sockets[request_id]
+            self.send("ws_closed", request_id)
+
+    async def preview(self, request_id, stream_id, after):
+        stream = server.streams.streams.get(stream_id)
+        try:
+            if stream is None or stream.preview is None:
+                raise ConnectionResetError("No such stream")
+            sequence, jpeg = await asyncio.wait_for(stream.preview.jpeg(after), server.IDLE_TIMEOUT)
+        except (ConnectionResetError, asyncio.TimeoutError):
+            sequence = jpeg = None
+        self.send("preview", request_id, sequence, jpeg)
+
+    async def send_metrics(self):
+        while True:
+            await asyncio.sleep(METRICS_INTERVAL)
+            for stream in list(server.streams.streams.values()):
+                self.send("metrics", stream.id, stream.metrics_snapshot())
+
+
+def run_worker(connection, options: dict):
+    """
+    Entry point of a receiver process.
+    """
+    # Interrupts reach the whole process group, the GUI process stops its receivers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(ReceiverWorker(connection, options).run())
+
+
+class SharedStream(Stream):
+    """
+    Stream of a peer received by a receiver process, read from the FrameRing the
+    process writes. Images put into the mailbox point into the ring.
+    Metrics combine the GUI's own stages with the snapshots of the receiver process.
+    """
+    def __init__(self, stream_id: int, name: str, metrics=None, peer: str = None, ring: FrameRing = None):
+        self.ring = ring
+        super().__init__(stream_id, name, metrics, peer)
+        self.remote_snapshot = None
+
+    @property
+    def visible(self) -> bool:
+        return self.ring.visible
+
+    @visible.setter
+    def visible(self, visible: bool):
+        self.ring.visible = visible
+
+    @property
+    def target_size(self):
+        return self.ring.target_size
+
+    @target_size.setter
+    def target_size(self, size):
+        self.ring.target_size = size
+
+    def read_frame(self):
+        image, missed = self.ring.read()
+        if missed and self.metrics is not None:
+            self.metrics.dropped += missed
+        if image is not None:
+            self.mailbox.put(image)
+
+    def metrics_snapshot(self):
+        snapshot = super().metrics_snapshot()
+        remote = self.remote_snapshot
+        if snapshot is None or remote is None:
+            return snapshot
+        snapshot["received"] = remote["received"]
+        snapshot["receive_fps"] = remote["receive_fps"]
+        snapshot["dropped"] += remote["dropped"]
+        snapshot["errors"] += remote["errors"]
+        for stage in ("receive", "convert"):
+            snapshot["latency_ms"][stage] = remote["latency_ms"][stage]
+        return snapshot
+
+
+class ReceiverProcess:
+    """
+    A receiver process as seen from the GUI process.
+    """
+    def __init__(self, index: int, process, connection):
+        self.index = index
+        self.process = process
+        self.connection = connection
+        self.streams = {}
+        self.pending = 0
+        # Futures of unanswered requests and queues of relayed WebSockets, by request id
+        self.answers = {}
+        self.relays = {}
+
+    @property
+    def load(self) -> int:
+        return len(self.streams) + self.pending
+
+
+class ReceiverPool:
+    """
+    Runs the WebRTC stack in `processes` receiver processes, so decoding and
+    conversion of many streams spread over cores, while the GUI process keeps the
+    signaling endpoints and the window. Each peer is given to the process with the
+    fewest peers, frames come back through shared memory (see FrameRing).
+    """
+    def __init__(self, streams: StreamRegistry, processes=2, options: dict = None):
+        self.streams = streams
+        self.options = options
+        self.processes = []
+        self._ids = itertools.count(1)
+
+        # Spawned, forking a process running Qt and threads is not safe
+        context = multiprocessing.get_context("spawn")
+        for index in range(processes):
+            connection, child_connection = context.Pipe()
+            process = context.Process(target=run_worker, args=(child_connection, options),
+                                      name=f"receiver-{index}", daemon=True)
+            process.start()
+            child_connection.close()
+            self.processes.append(ReceiverProcess(index, process, connection))
+
+    async def start(self):
+        """
+        Starts reading events from the receiver processes on the running loop.
+        """
+        loop = asyncio.get_running_loop()
+        for receiver in self.processes:
+            loop.add_reader(receiver.connection.fileno(), self.receive, receiver)
+
+    def receive(self, receiver: ReceiverProcess):
+        while receiver in self.processes and receiver.connection.poll():
+            try:
+                message = receiver.connection.recv()
+            except (EOFError, OSError):
+                self.process_exited(receiver)
+                return
+
+            kind = message[0]
+            if kind == "frame":
+                stream = receiver.streams.get(message[1])
+                if stream is not None:
+                    stream.read_frame()
+            elif kind == "analysis":
+                stream = receiver.streams.get(message[1])
+                if stream is not None and stream.analysis is not None:
+                    stream.analysis.publish(message[2])
+            elif kind == "metrics":
+                stream = receiver.streams.get(message[1])
+                if stream is not None:
+                    stream.remote_snapshot = message[2]
+            elif kind == "stream_added":
+                _, stream_id, peer, visible, ring_name = message
+                stream = receiver.streams[stream_id] = self.streams.add(peer, visible, SharedStream,
+                                                                        ring=FrameRing.attach(ring_name))
+                stream.preview = RemotePreview(
+                    lambda after, receiver=receiver, stream_id=stream_id: self.preview(receiver, stream_id, after)
+                )
+            elif kind == "stream_removed":
+                stream = receiver.streams.pop(message[1], None)
+                if stream is not None:
+                    self.remove_stream(stream)
+            elif kind in ("answer", "preview"):
+                future = receiver.answers.pop(message[1], None)
+                if future is not None and not future.done():
+                    future.set_result(message[2:])
+            elif kind in ("ws", "ws_closed"):
+                relay = receiver.relays.get(message[1])
+                if relay is not None:
+                    relay.put_nowait(message[2] if kind == "ws" else None)
+
+    def remove_stream(self, stream: SharedStream):
+        self.streams.remove(stream)
+        # The mapping stays until the last image pointing into it is gone,
+        # the one left in the mailbox is let go at once
+        stream.mailbox.take()
+        stream.ring.unlink()
+
+    def process_exited(self, receiver: ReceiverProcess):
+        print(f"[❌] Receiver process {receiver.index} exited")
+        asyncio.get_running_loop().remove_reader(receiver.connection.fileno())
+        self.processes.remove(receiver)
+        for stream in receiver.streams.values():
+            self.remove_stream(stream)
+        receiver.streams.clear()
+        self.end_requests(receiver)
+
+    def end_requests(self, receiver: ReceiverProcess):
+        """
+        Fails the requests left unanswered by the receiver process and ends its relayed WebSockets.
+        """
+        for future in receiver.answers.values():
+            if not future.done():
+                future.set_exception(ConnectionResetError("Receiver process stopped"))
+        for relay in receiver.relays.values():
+            relay.put_nowait(None)
+
+    async def request(self, receiver: ReceiverProcess, kind: str, request_id: int, remote: str, params) -> dict:
+        """
+        Has the receiver process answer an offer, returns the answer's session description.
+        """
+        future = receiver.answers[request_id] = asyncio.get_running_loop().create_future()
+        receiver.pending += 1
+        try:
+            receiver.connection.send((kind, request_id, remote, params))
+            answer, error = await future
+        finally:
+            receiver.pending -= 1
+            receiver.answers.pop(request_id, None)
+        if error is not None:
+            raise web.HTTPInternalServerError(text=error)
+        return answer
+
+    async def preview(self, receiver: ReceiverProcess, stream_id: int, after: int):
+        """
+        Has the receiver process encode a JPEG of a frame newer than `after`, for RemotePreview.
+        """
+        request_id = next(self._ids)
+        future = receiver.answers[request_id] = asyncio.get_running_loop().create_future()
+        try:
+            receiver.connection.send(("preview", request_id, stream_id, after))
+            sequence, jpeg = await future
+        finally:
+            receiver.answers.pop(request_id, None)
+        if jpeg is None:
+            raise ConnectionResetError("Stream closed")
+        return sequence, jpeg
+
+    def choose(self) -> ReceiverProcess:
+        if not self.processes:
+            raise web.HTTPServiceUnavailable(text="No receiver process running")
+        return min(self.processes, key=lambda receiver: receiver.load)
+
+    async def offer(self, request):
+        """
+        Same as server.offer(), answered by a receiver process.
+        """
+        params = await request.json()
+        answer = await self.request(self.choose(), "offer", next(self._ids), request.remote, params)
+        return web.json_response({"sdp": answer})
+
+    async def trickle(self, request):
+        """
+        Same as server.trickle(), answered by a receiver process; candidate messages
+        are relayed between the client and the process.
+        """
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+
+        params = await ws.receive_json()
+        receiver = self.choose()
+        request_id = next(self._ids)
+        relay = receiver.relays[request_id] = asyncio.Queue()
+        forwarding = None
+        try:
+            answer = await self.request(receiver, "trickle", request_id, request.remote, params)
+            await ws.send_json({"sdp": answer})
+            forwarding = asyncio.ensure_future(self.forward(ws, receiver, request_id))
+            while (data := await relay.get()) is not None:
+                await ws.send_json(data)
+        finally:
+            if forwarding is not None:
+                forwarding.cancel()
+            del receiver.relays[request_id]
+        return ws
+
+    async def forward(self, ws, receiver: ReceiverProcess, request_id: int):
+        try:
+            async for message in ws:
+                if message.type != aiohttp.WSMsgType.TEXT:
+                    break
+                receiver.connection.send(("ws", request_id, message.json()))
+        except OSError:
+            pass  # The process exited, process_exited() ends the relay
+        finally:
+            if receiver in self.processes:
+                try:
+                    receiver.connection.send(("ws_closed", request_id))
+                except OSError:
+                    pass
+
+    async def close(self):
+        """
+        Stops the receiver processes, giving them time to close their peer connections.
+        """
+        processes, self.processes = self.processes, []
+        loop = asyncio.get_running_loop()
+        for receiver in processes:
+            self.end_requests(receiver)
+            loop.remove_reader(receiver.connection.fileno())
+            try:
+                receiver.connection.send(("stop",))
+            except OSError:
+                pass
+        for receiver in processes:
+            await loop.run_in_executor(None, receiver.process.join, STOP_TIMEOUT)
+            if receiver.process.is_alive():
+                receiver.process.terminate()
+            for stream in receiver.streams.values():
+                self.remove_stream(stream)
+            receiver.connection.close()
+
+    async def on_shutdown(self, app):
+        await self.close()
+
+
+def create_app(pool: ReceiverPool) -> web.Application:
+    """
+    Signaling server of the GUI process, with offers answered by the receiver processes.
+    """
+    app = web.Application()
+    app.on_shutdown.append(pool.on_shutdown)
+    app.router.add_get('/', server.index)
+    app.router.add_post('/offer', pool.offer)
+    app.router.add_get('/trickle', pool.trickle)
+    app.router.add_get('/metrics', server.metrics)
+    app.router.add_get(r'/streams/{id:\d+}/snapshot.jpg', server.snapshot)
+    app.router.add_get(r'/streams/{id:\d+}/preview.mjpg', server.preview)
+    return app
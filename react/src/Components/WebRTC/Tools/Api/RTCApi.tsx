@@ -20,6 +20,7 @@ interface Props {
   onLocalStream: (stream: MediaStream) => void;
   onRemoteStream: (stream: MediaStream) => void;
   onIceCandidate: (candidate: RTCIceCandidate) => void;
+  onIceGatheringComplete?: () => void;
   onSessionDescription: (session: RTCSessionDescriptionInit) => void;
   onDataMessage: (data: string) => void;
   onError?: (error: string) => void;
@@ -34,6 +35,7 @@ function RTCApi({
   onLocalStream,
   onRemoteStream,
   onIceCandidate,
+  onIceGatheringComplete,
   onSessionDescription,
   onDataMessage,
   onError,
@@ -74,6 +76,8 @@ function RTCApi({
     pc.onicecandidate = (event) => {
       if (event.candidate) {
         onIceCandidate(event.candidate);
+      } else {
+        onIceGatheringComplete?.();
       }
     };
 
@@ -83,6 +83,9 @@ function RTCManager({
       //console.log("===Need to send local ICE candidate===", candidate);
       signalIceCadidate(candidate);
     },
+    onIceGatheringComplete: () => {
+      signalingManager.endIceCandidates();
+    },
     onSessionDescription: (session) => {
       //console.log("===Need to send local SDP===", session);
       signalSessionDescription(session);
@@ -94,6 +97,7 @@ function RTCManager({
 
   let getIceCadidates = () => {};
   let getSessionDescription = () => {};
+  let subscribe = () => {};
 
   if (signalingManager != null) {
     if (isOffering) {
@@ -109,6 +113,18 @@ function RTCManager({
           addSessionDescription(session);
         });
       };
+      subscribe = () => {
+        signalingManager.subscribeAnswer(
+          (session: any) => {
+            addSessionDescription(session);
+          },
+          (candidates: any[]) => {
+            candidates.forEach((candidate) => {
+              addIceCandidate(candidate);
+            });
+          }
+        );
+      };
     } else {
       getIceCadidates = () => {
         signalingManager.getOfferIceCandidates((candidates: any[]) => {
@@ -122,14 +138,30 @@ function RTCManager({
           addSessionDescription(session);
         });
       };
+      subscribe = () => {
+        signalingManager.subscribeOffer(
+          (session: any) => {
+            addSessionDescription(session);
+          },
+          (candidates: any[]) => {
+            candidates.forEach((candidate) => {
+              addIceCandidate(candidate);
+            });
+          }
+        );
+      };
     }
   }
 
   return {
     startCall,
-    endCall,
+    endCall: () => {
+      signalingManager.unsubscribe();
+      endCall();
+    },
     getIceCadidates,
     getSessionDescription,
+    subscribe,
     sendData,
   };
 }
@@ -73,10 +73,12 @@ function SignalingApi({ endpoint }: Props) {
   // @ts-ignore
   const getAnswerSessionDescription = (
     pass: string,
+    sessionId: number | null,
     callback: (resonse: any) => void
   ) => {
     const options = getRequestOptions("POST", {
       pass: pass,
+      session_id: sessionId,
     });
 
     fetcher(endpoint + "get-answer-sd/", options, (data) => {
@@ -102,13 +104,39 @@ function SignalingApi({ endpoint }: Props) {
     });
   };
 
+  // @ts-ignore
+  const addIceCandidates = (
+    clientId: number,
+    pass: string,
+    sessionId: number | null,
+    candidates: any[],
+    done: boolean,
+    callback: (resonse: any) => void
+  ) => {
+    const options = getRequestOptions("POST", {
+      client_id: clientId,
+      pass: pass,
+      session_id: sessionId,
+      candidates: candidates,
+      done: done,
+    });
+
+    fetcher(endpoint + "add-ice-candidates/", options, (data) => {
+      callback(data);
+    });
+  };
+
   // @ts-ignore
   const getOfferIceCandidates = (
     pass: string,
+    sessionId: number | null,
+    cursor: number,
     callback: (resonse: any) => void
   ) => {
     const options = getRequestOptions("POST", {
       pass: pass,
+      session_id: sessionId,
+      cursor: cursor,
     });
 
     fetcher(endpoint + "get-offer-ice-candidates/", options, (data) => {
@@ -119,10 +147,14 @@ function SignalingApi({ endpoint }: Props) {
   // @ts-ignore
   const getAnswerIceCandidates = (
     pass: string,
+    sessionId: number | null,
+    cursor: number,
     callback: (resonse: any) => void
   ) => {
     const options = getRequestOptions("POST", {
       pass: pass,
+      session_id: sessionId,
+      cursor: cursor,
     });
 
     fetcher(endpoint + "get-answer-ice-candidates/", options, (data) => {
@@ -130,14 +162,39 @@ function SignalingApi({ endpoint }: Props) {
     });
   };
 
+  // @ts-ignore
+  const subscribe = (
+    pass: string,
+    sessionId: number | null,
+    onEvent: (event: string, data: any) => void
+  ) => {
+    let url = endpoint + "subscribe/?pass=" + encodeURIComponent(pass);
+    if (sessionId != null) {
+      url += "&session_id=" + sessionId;
+    }
+    const source = new EventSource(url);
+
+    ["offer", "answer", "offer-candidate", "answer-candidate"].forEach(
+      (event) => {
+        source.addEventListener(event, (message: MessageEvent) => {
+          onEvent(event, JSON.parse(message.data));
+        });
+      }
+    );
+
+    return source;
+  };
+
   return {
     addOfferSessionDescription,
     addAnswerSessionDescription,
     getOfferSessionDescription,
     getAnswerSessionDescription,
     addIceCandidate,
+    addIceCandidates,
     getOfferIceCandidates,
     getAnswerIceCandidates,
+    subscribe,
   };
 }
 
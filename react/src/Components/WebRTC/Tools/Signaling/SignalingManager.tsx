@@ -14,7 +14,19 @@ function SignalingManager({ isOffering, pass, onPass }: Props) {
   const passRef = useRef("");
   const hashPassRef = useRef("");
   const clientIdRef = useRef(0);
+  // Session id issued by add-offer-sd and add-answer-sd, sessions are looked up
+  // by it instead of the pass hash
+  const sessionIdRef = useRef<number | null>(null);
+  // Local ICE candidates are coalesced and sent in batches
   const iceCandidatesRef = useRef<any[]>([]);
+  const iceCandidatesDoneRef = useRef(false);
+  const iceCandidatesTimerRef = useRef<ReturnType<typeof setTimeout> | null>(
+    null
+  );
+  const iceCandidatesBatchWindow = 50; // ms
+  // Id of the last remote ICE candidate received, only newer ones are fetched
+  const iceCandidatesCursorRef = useRef(0);
+  const eventSourceRef = useRef<EventSource | null>(null);
 
   const signalingApi = SignalingApi({ endpoint: endpoint });
 
@@ -45,8 +57,10 @@ function SignalingManager({ isOffering, pass, onPass }: Props) {
       session,
       (response) => {
         clientIdRef.current = response.client_id;
+        sessionIdRef.current = response.session_id ?? null;
         // Log
         console.log("addOfferSessionDescription", response);
+        flushIceCandidates();
       }
     );
   };
@@ -56,8 +70,10 @@ function SignalingManager({ isOffering, pass, onPass }: Props) {
       session,
       (response) => {
         clientIdRef.current = response.client_id;
+        sessionIdRef.current = response.session_id ?? null;
         // Log
         console.log("addAnswerSessionDescription", response);
+        flushIceCandidates();
       }
     );
   };
@@ -76,35 +92,66 @@ function SignalingManager({ isOffering, pass, onPass }: Props) {
     });
   };
   const getAnswerSessionDescription = (onSession: (session: any) => void) => {
-    signalingApi.getAnswerSessionDescription(passRef.current, (response) => {
-      // Log
-      console.log("getAnswerSessionDescription", response);
+    signalingApi.getAnswerSessionDescription(
+      passRef.current,
+      sessionIdRef.current,
+      (response) => {
+        // Log
+        console.log("getAnswerSessionDescription", response);
 
-      if (response) {
-        if (response.status && response.status == "success") {
-          console.log(response.answer);
-          onSession(response.answer);
+        if (response) {
+          if (response.status && response.status == "success") {
+            console.log(response.answer);
+            onSession(response.answer);
+          }
         }
       }
-    });
+    );
+  };
+
+  // Sends the queued candidates (and the end-of-candidates marker) in one request,
+  // they stay queued until the client id is known
+  const flushIceCandidates = () => {
+    if (iceCandidatesTimerRef.current != null) {
+      clearTimeout(iceCandidatesTimerRef.current);
+      iceCandidatesTimerRef.current = null;
+    }
+    const candidates = iceCandidatesRef.current;
+    const done = iceCandidatesDoneRef.current;
+    if (clientIdRef.current == 0 || (candidates.length == 0 && !done)) {
+      return;
+    }
+    iceCandidatesRef.current = [];
+    iceCandidatesDoneRef.current = false;
+
+    signalingApi.addIceCandidates(
+      clientIdRef.current,
+      passRef.current,
+      sessionIdRef.current,
+      candidates,
+      done,
+      (response) => {
+        // Log
+        console.log("addIceCandidates", response);
+      }
+    );
+  };
+  const scheduleIceCandidates = () => {
+    if (iceCandidatesTimerRef.current == null) {
+      iceCandidatesTimerRef.current = setTimeout(
+        flushIceCandidates,
+        iceCandidatesBatchWindow
+      );
+    }
   };
 
   const addIceCandidate = (iceCandidate: any) => {
     iceCandidatesRef.current.push(iceCandidate);
-    if (clientIdRef.current != 0 && iceCandidatesRef.current) {
-      iceCandidatesRef.current.forEach((candidate: any) => {
-        signalingApi.addIceCandidate(
-          clientIdRef.current,
-          passRef.current,
-          candidate,
-          (response) => {
-            // Log
-            console.log("addIceCandidate", response);
-          }
-        );
-      });
-      iceCandidatesRef.current = [];
-    }
+    scheduleIceCandidates();
+  };
+  const endIceCandidates = () => {
+    iceCandidatesDoneRef.current = true;
+    scheduleIceCandidates();
   };
   const addOfferIceCandidate = (candidate: any) => {
     addIceCandidate(candidate);
@@ -114,30 +161,87 @@ function SignalingManager({ isOffering, pass, onPass }: Props) {
   };
 
   const getOfferIceCandidates = (onCandidates: (candidates: any[]) => void) => {
-    signalingApi.getOfferIceCandidates(passRef.current, (response) => {
-      // Log
-      console.log("getOfferIceCandidates", response);
+    signalingApi.getOfferIceCandidates(
+      passRef.current,
+      sessionIdRef.current,
+      iceCandidatesCursorRef.current,
+      (response) => {
+        // Log
+        console.log("getOfferIceCandidates", response);
 
-      if (response) {
-        if (response.status && response.status == "success") {
-          onCandidates(response.candidates);
+        if (response) {
+          if (response.status && response.status == "success") {
+            iceCandidatesCursorRef.current = response.cursor;
+            onCandidates(response.candidates);
+          }
         }
       }
-    });
+    );
   };
   const getAnswerIceCandidates = (
     onCandidates: (candidates: any[]) => void
   ) => {
-    signalingApi.getAnswerIceCandidates(passRef.current, (response) => {
-      // Log
-      console.log("getAnswerIceCandidates", response);
+    signalingApi.getAnswerIceCandidates(
+      passRef.current,
+      sessionIdRef.current,
+      iceCandidatesCursorRef.current,
+      (response) => {
+        // Log
+        console.log("getAnswerIceCandidates", response);
 
-      if (response) {
-        if (response.status && response.status == "success") {
-          onCandidates(response.candidates);
+        if (response) {
+          if (response.status && response.status == "success") {
+            iceCandidatesCursorRef.current = response.cursor;
+            onCandidates(response.candidates);
+          }
         }
       }
-    });
+    );
+  };
+
+  // Receives the remote session description and ICE candidates as soon as
+  // they are stored, instead of polling the get-* endpoints
+  const subscribe = (
+    remote: "offer" | "answer",
+    onSession: (session: any) => void,
+    onCandidates: (candidates: any[]) => void
+  ) => {
+    eventSourceRef.current?.close();
+    eventSourceRef.current = signalingApi.subscribe(
+      passRef.current,
+      sessionIdRef.current,
+      (event, data) => {
+        // Log
+        console.log("subscribe", event, data);
+
+        if (event == remote) {
+          onSession(data);
+        } else if (event == remote + "-candidate") {
+          onCandidates([data]);
+          // End of the remote candidates, nothing else is coming: closed, so the
+          // EventSource doesn't reconnect when the server ends the stream
+          if (data.candidate === "") {
+            unsubscribe();
+          }
+        }
+      }
+    );
+  };
+  const subscribeOffer = (
+    onSession: (session: any) => void,
+    onCandidates: (candidates: any[]) => void
+  ) => {
+    subscribe("offer", onSession, onCandidates);
+  };
+  const subscribeAnswer = (
+    onSession: (session: any) => void,
+    onCandidates: (candidates: any[]) => void
+  ) => {
+    subscribe("answer", onSession, onCandidates);
+  };
+  const unsubscribe = () => {
+    eventSourceRef.current?.close();
+    eventSourceRef.current = null;
   };
 
   return {
@@ -145,10 +249,14 @@ function SignalingManager({ isOffering, pass, onPass }: Props) {
     addOfferSessionDescription,
     addAnswerIceCandidate,
     addAnswerSessionDescription,
+    endIceCandidates,
     getOfferIceCandidates,
     getOfferSessionDescription,
     getAnswerIceCandidates,
     getAnswerSessionDescription,
+    subscribeOffer,
+    subscribeAnswer,
+    unsubscribe,
   };
 }
 
@@ -17,6 +17,7 @@ function RTCView() {
     endCall,
     getIceCadidates,
     getSessionDescription,
+    subscribe,
     sendData,
   } = RTCManager({
     isOffering: isOffering,
@@ -71,6 +72,9 @@ function RTCView() {
       >
         Get IceCadidates
       </button>
+      <button type="button" className="btn btn-primary" onClick={subscribe}>
+        Subscribe
+      </button>
       <div>Pass: {password}</div>
       <div className="input-group mb-3">
         <span className="input-group-text" id="basic-addon1">
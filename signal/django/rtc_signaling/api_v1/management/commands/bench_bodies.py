@@ -0,0 +1,46 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+from django.http import JsonResponse
+
+from api_v1.views import RawJSON, encode_body, json_response, parse_python_dict_string, render_json_list
+
+from .bench_signaling import ANSWER, make_candidate
+
+
+class Command(BaseCommand):
+    help = ("Microbenchmarks rendering the getter responses from bodies stored as Python literals "
+            "(parsed on every read) and from canonical JSON bodies (inserted as is).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--candidates', type=int, nargs='+', default=[1, 8, 32],
+                            help="Number of ICE candidates returned per response.")
+        parser.add_argument('--number', type=int, default=2000,
+                            help="Responses rendered per measurement.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'response':<20} {'literal us':>11} {'json us':>9} {'speedup':>8}")
+
+        self.report('answer', options['number'],
+                    lambda: JsonResponse({"status": "success", "answer": parse_python_dict_string(str(ANSWER))}),
+                    lambda body=encode_body(ANSWER): json_response({"status": "success", "answer": RawJSON(body)}, 200))
+
+        for count in options['candidates']:
+            literal = [str(make_candidate(index)) for index in range(count)]
+            canonical = [encode_body(make_candidate(index)) for index in range(count)]
+            self.report(f'{count} candidate(s)', options['number'],
+                        lambda: JsonResponse({
+                            "status": "success",
+                            "candidates": [parse_python_dict_string(body) for body in literal],
+                            "cursor": count,
+                        }),
+                        lambda: json_response({
+                            "status": "success",
+                            "candidates": render_json_list(canonical),
+                            "cursor": count,
+                        }, 200))
+
+    def report(self, name, number, before, after):
+        before_us = min(timeit.repeat(before, number=number, repeat=3)) / number * 1e6
+        after_us = min(timeit.repeat(after, number=number, repeat=3)) / number * 1e6
+        self.stdout.write(f"{name:<20} {before_us:>11.1f} {after_us:>9.1f} {before_us / after_us:>7.1f}x")
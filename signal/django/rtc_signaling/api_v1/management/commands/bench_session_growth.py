@@ -0,0 +1,131 @@
+import hashlib
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client as TestClient
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from api_v1.models import Session, Client, SessionDescription, IceCandidate
+from api_v1.stores import get_store
+from api_v1.views import encode_body
+
+from .bench_signaling import API, OFFER, ANSWER, make_candidate
+
+DATABASE_STORE = {'BACKEND': 'api_v1.stores.database.DatabaseStore'}
+
+
+class Command(BaseCommand):
+    help = ("Benchmarks the signaling getters while the number of historical sessions grows, "
+            "then the time needed to reap them.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--steps', type=int, nargs='+', default=[1000, 10000, 100000],
+                            help="Total historical sessions at which the getters are measured.")
+        parser.add_argument('--candidates', type=int, default=4,
+                            help="ICE candidates stored for each historical session.")
+        parser.add_argument('--requests', type=int, default=200,
+                            help="Requests sent to each getter per step.")
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help="Sessions inserted per transaction and deleted per reaper batch.")
+        parser.add_argument('--skip-reap', action='store_true',
+                            help="Do not measure reaping the historical sessions.")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(SIGNALING_STORE=DATABASE_STORE):
+                self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def run(self, options):
+        client = TestClient()
+        raw_pass, session_id = self.add_live_session(client, options['candidates'])
+        by_pass = {'pass': raw_pass}
+        by_id = {'pass': raw_pass, 'session_id': session_id}
+
+        self.stdout.write(f"{'sessions':>10} {'insert s':>9} {'get-answer-sd ms':>17} "
+                          f"{'get-answer-ice ms':>18} {'by session id ms':>17}")
+        total = 0
+        for step in sorted(options['steps']):
+            start = time.perf_counter()
+            while total < step:
+                count = min(options['batch_size'], step - total)
+                self.add_expired_sessions(total, count, options['candidates'])
+                total += count
+            inserted = time.perf_counter() - start
+
+            answer = self.measure(client, 'get-answer-sd/', by_pass, options['requests'])
+            candidates = self.measure(client, 'get-answer-ice-candidates/', by_pass, options['requests'])
+            candidates_by_id = self.measure(client, 'get-answer-ice-candidates/', by_id, options['requests'])
+            self.stdout.write(f"{total:>10} {inserted:>9.1f} {answer:>17.3f} {candidates:>18.3f} "
+                              f"{candidates_by_id:>17.3f}")
+
+        if not options['skip_reap']:
+            start = time.perf_counter()
+            deleted = get_store().reap(batch_size=options['batch_size'])
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f"Reaped {deleted} session(s) in {elapsed:.1f} s "
+                              f"({deleted / elapsed:.0f} sessions/s).")
+
+    def add_live_session(self, client, candidates):
+        raw_pass = 'bench-live-session'
+        session_id = client.post(API + 'add-offer-sd/', {
+            'offer': OFFER,
+            'hash_pass': hashlib.sha256(raw_pass.encode('utf-8')).hexdigest(),
+        }, content_type='application/json').json()['session_id']
+        client_id = client.post(API + 'add-answer-sd/', {'answer': ANSWER, 'pass': raw_pass},
+                                content_type='application/json').json()['client_id']
+        for index in range(candidates):
+            client.post(API + 'add-ice-candidate/', {
+                'client_id': client_id,
+                'pass': raw_pass,
+                'candidate': make_candidate(index),
+            }, content_type='application/json')
+        return raw_pass, session_id
+
+    def add_expired_sessions(self, offset, count, candidates):
+        """
+        Inserts complete offer/answer sessions whose last activity is a day old.
+        """
+        last_activity = timezone.now() - timedelta(days=1)
+        offer, answer = encode_body(OFFER), encode_body(ANSWER)
+        candidate_bodies = [encode_body(make_candidate(index)) for index in range(candidates)]
+
+        with transaction.atomic():
+            sessions = Session.objects.bulk_create(
+                Session(hashpass=f'bench-{offset + index}', last_activity=last_activity)
+                for index in range(count)
+            )
+            clients = Client.objects.bulk_create(
+                Client(session=session, role=role)
+                for session in sessions
+                for role in (Client.Role.OFFERER, Client.Role.ANSWERER)
+            )
+            SessionDescription.objects.bulk_create(
+                SessionDescription(client=client, body=offer if client.role == Client.Role.OFFERER else answer)
+                for client in clients
+            )
+            IceCandidate.objects.bulk_create(
+                IceCandidate(client=client, body=body)
+                for client in clients
+                for body in candidate_bodies
+            )
+
+    def measure(self, client, endpoint, data, requests):
+        """
+        Returns the median latency of the endpoint in ms.
+        """
+        timings = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            response = client.post(API + endpoint, data, content_type='application/json')
+            timings.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.content
+        return statistics.median(timings) * 1000
@@ -0,0 +1,244 @@
+import asyncio
+import hashlib
+import logging
+import secrets
+import statistics
+import time
+from contextlib import aclosing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+API = '/api/v1/'
+
+OFFER = {'type': 'offer', 'sdp': 'v=0\r\no=- 4611731400430051336 2 IN IP4 127.0.0.1\r\ns=-\r\nt=0 0\r\n'}
+ANSWER = {'type': 'answer', 'sdp': 'v=0\r\no=- 1805185924350131104 2 IN IP4 127.0.0.1\r\ns=-\r\nt=0 0\r\n'}
+
+
+def make_candidate(index):
+    return {
+        'candidate': f'candidate:{index} 1 udp 2122260223 192.168.0.{index % 250 + 1} {50000 + index} typ host',
+        'sdpMid': '0',
+        'sdpMLineIndex': 0,
+        'usernameFragment': 'bench',
+    }
+
+
+class QueryCounter:
+    """
+    Counts queries executed on every database connection, whatever thread opened it.
+    """
+    def __init__(self):
+        self.count = 0
+
+    def reset(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    def install(self, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+    def __enter__(self):
+        for conn in connections.all():
+            self.install(conn)
+        connection_created.connect(self.install)
+        return self
+
+    def __exit__(self, *exc_info):
+        connection_created.disconnect(self.install)
+        for conn in connections.all():
+            if self in conn.execute_wrappers:
+                conn.execute_wrappers.remove(self)
+
+
+class Command(BaseCommand):
+    help = "Benchmarks signaling delivery to the offerer: polling, long polling and server-sent events."
+
+    MODES = ('poll', 'longpoll', 'push')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', nargs='+', choices=self.MODES, default=self.MODES,
+                            help="Delivery modes to benchmark.")
+        parser.add_argument('--store',
+                            help="Dotted path of the signaling store backend, defaults to SIGNALING_STORE.")
+        parser.add_argument('--sessions', type=int, default=50,
+                            help="Number of concurrent sessions per mode.")
+        parser.add_argument('--candidates', type=int, default=8,
+                            help="ICE candidates trickled by each answerer.")
+        parser.add_argument('--poll-interval', type=float, default=250,
+                            help="Polling interval of the polling client, in ms.")
+        parser.add_argument('--wait', type=float, default=10,
+                            help="Wait sent by the long-polling client, in seconds.")
+        parser.add_argument('--answer-delay', type=float, default=100,
+                            help="Delay before the answerer posts its answer, in ms.")
+        parser.add_argument('--candidate-interval', type=float, default=20,
+                            help="Delay between trickled ICE candidates, in ms.")
+        parser.add_argument('--batch-window', type=float, default=None,
+                            help="Coalesce the answerer's candidates over this window (ms) and send them "
+                                 "through add-ice-candidates, by default each one is sent on its own.")
+
+    def handle(self, *args, **options):
+        # Pending polls are answered with 404, keep them out of the output
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.stdout.write(f"{'mode':<9} {'sessions':>8} {'setup ms':>10} {'p95 ms':>10} "
+                              f"{'delay ms':>10} {'requests/session':>17} {'sent/session':>13} {'queries/session':>16}")
+            store = {'BACKEND': options['store']} if options['store'] else settings.SIGNALING_STORE
+            with override_settings(SIGNALING_STORE=store), QueryCounter() as counter:
+                for mode in options['modes']:
+                    self.report(mode, counter, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def report(self, mode, counter, options):
+        counter.reset()
+        results = asyncio.run(self.run_sessions(mode, options))
+
+        setup = sorted(result[0] * 1000 for result in results)
+        delay = [result[1] * 1000 for result in results]
+        requests = sum(result[2] for result in results)
+        sent = sum(result[3] for result in results)
+        p95 = setup[min(len(setup) - 1, int(len(setup) * 0.95))]
+        self.stdout.write(f"{mode:<9} {len(results):>8} {statistics.mean(setup):>10.1f} {p95:>10.1f} "
+                          f"{statistics.mean(delay):>10.1f} {requests / len(results):>17.1f} "
+                          f"{sent / len(results):>13.1f} {counter.count / len(results):>16.1f}")
+
+    async def run_sessions(self, mode, options):
+        offerer = {
+            'poll': self.poll_offerer,
+            'longpoll': self.long_poll_offerer,
+            'push': self.push_offerer,
+        }[mode]
+        return await asyncio.gather(*(
+            self.run_session(offerer, options) for _ in range(options['sessions'])
+        ))
+
+    async def run_session(self, offerer, options):
+        """
+        Runs one offer/answer exchange and returns the setup time measured from
+        the stored offer, the delivery delay after the last candidate was sent,
+        the number of requests sent by the offerer to receive the answer and
+        the number of requests sent by both clients to store the session.
+        """
+        client = AsyncClient()
+        raw_pass = secrets.token_hex(8)
+        await client.post(API + 'add-offer-sd/', {
+            'offer': OFFER,
+            'hash_pass': hashlib.sha256(raw_pass.encode('utf-8')).hexdigest(),
+        }, content_type='application/json')
+
+        start = time.perf_counter()
+        (stored, sent), (completed, requests) = await asyncio.gather(
+            self.run_answerer(client, raw_pass, options),
+            offerer(client, raw_pass, options),
+        )
+        return completed - start, completed - stored, requests, sent + 1
+
+    async def run_answerer(self, client, raw_pass, options):
+        await asyncio.sleep(options['answer_delay'] / 1000)
+        response = await client.post(API + 'add-answer-sd/', {'answer': ANSWER, 'pass': raw_pass},
+                                     content_type='application/json')
+        client_id = response.json()['client_id']
+        requests = 1
+
+        if options['batch_window'] is not None:
+            return await self.send_candidate_batches(client, raw_pass, client_id, options, requests)
+
+        for index in range(options['candidates']):
+            await asyncio.sleep(options['candidate_interval'] / 1000)
+            sent = time.perf_counter()
+            await client.post(API + 'add-ice-candidate/', {
+                'client_id': client_id,
+                'pass': raw_pass,
+                'candidate': make_candidate(index),
+            }, content_type='application/json')
+            requests += 1
+        return sent, requests
+
+    async def send_candidate_batches(self, client, raw_pass, client_id, options, requests):
+        """
+        Gathers candidates at the same pace and sends those gathered within each
+        batch window together, the end-of-candidates marker with the last batch.
+        """
+        loop = asyncio.get_running_loop()
+        pending = []
+        window_end = None
+
+        for index in range(options['candidates']):
+            await asyncio.sleep(options['candidate_interval'] / 1000)
+            pending.append(make_candidate(index))
+            window_end = window_end or loop.time() + options['batch_window'] / 1000
+            last = index == options['candidates'] - 1
+            if not last and loop.time() < window_end:
+                continue
+
+            sent = time.perf_counter()
+            await client.post(API + 'add-ice-candidates/', {
+                'client_id': client_id,
+                'pass': raw_pass,
+                'candidates': pending,
+                'done': last,
+            }, content_type='application/json')
+            requests += 1
+            pending = []
+            window_end = None
+        return sent, requests
+
+    async def poll_offerer(self, client, raw_pass, options, wait=0):
+        interval = options['poll_interval'] / 1000 if not wait else 0
+        requests = 0
+
+        while True:
+            response = await client.post(API + 'get-answer-sd/', {'pass': raw_pass, 'wait': wait},
+                                         content_type='application/json')
+            requests += 1
+            if response.status_code == 200:
+                break
+            await asyncio.sleep(interval)
+
+        cursor = 0
+        candidates = 0
+        while True:
+            response = await client.post(API + 'get-answer-ice-candidates/', {
+                'pass': raw_pass,
+                'cursor': cursor,
+                'wait': wait,
+            }, content_type='application/json')
+            requests += 1
+            data = response.json()
+            cursor = data['cursor']
+            candidates += sum(1 for candidate in data['candidates'] if candidate['candidate'])
+            if candidates >= options['candidates']:
+                return time.perf_counter(), requests
+            await asyncio.sleep(interval)
+
+    async def long_poll_offerer(self, client, raw_pass, options):
+        return await self.poll_offerer(client, raw_pass, options, wait=options['wait'])
+
+    async def push_offerer(self, client, raw_pass, options):
+        response = await client.get(API + 'subscribe/', {'pass': raw_pass})
+        answered = False
+        candidates = 0
+
+        async with aclosing(response.streaming_content) as stream:
+            async for chunk in stream:
+                event = chunk.split(b'\n', 1)[0]
+                if event == b'event: answer':
+                    answered = True
+                elif event == b'event: answer-candidate':
+                    candidates += 1
+
+                if answered and candidates >= options['candidates']:
+                    return time.perf_counter(), 1
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api_v1.models import SessionDescription, IceCandidate
+from api_v1.views import encode_body
+
+
+class Command(BaseCommand):
+    help = ("Rewrites stored session descriptions and ICE candidates as canonical JSON. "
+            "Run once after upgrading, bodies stored before were saved as Python literals.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Number of rows updated per transaction.")
+
+    def handle(self, *args, **options):
+        for model in (SessionDescription, IceCandidate):
+            updated, malformed = self.normalize(model, options['batch_size'])
+            self.stdout.write(f"{model.__name__}: {updated} row(s) rewritten, {malformed} malformed row(s) deleted.")
+
+    def normalize(self, model, batch_size):
+        updated = 0
+        malformed = 0
+        last_id = 0
+
+        while True:
+            rows = list(model.objects.filter(id__gt=last_id).order_by('id').only('id', 'body')[:batch_size])
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            changed = []
+            broken = []
+            for row in rows:
+                try:
+                    body = encode_body(row.body)
+                except ValueError:
+                    broken.append(row.id)
+                    continue
+                if body != row.body:
+                    row.body = body
+                    changed.append(row)
+
+            # Malformed bodies could never be returned to clients, so they are dropped
+            with transaction.atomic():
+                model.objects.bulk_update(changed, ['body'])
+                model.objects.filter(id__in=broken).delete()
+            updated += len(changed)
+            malformed += len(broken)
+
+        return updated, malformed
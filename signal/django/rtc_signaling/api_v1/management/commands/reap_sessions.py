@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api_v1.stores import get_store
+
+
+class Command(BaseCommand):
+    help = "Deletes expired signaling sessions with their clients, descriptions and ICE candidates."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Number of sessions deleted per batch.")
+        parser.add_argument('--max-batches', type=int, default=None,
+                            help="Stop after this many batches, by default all expired sessions are deleted.")
+
+    def handle(self, *args, **options):
+        deleted = get_store().reap(batch_size=options['batch_size'], max_batches=options['max_batches'])
+        self.stdout.write(f"Deleted {deleted} expired session(s).")
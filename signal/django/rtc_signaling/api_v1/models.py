@@ -1,16 +1,33 @@
 from django.db import models
+from django.utils import timezone
 
 class Session(models.Model):
     hashpass = models.CharField(max_length=255, unique=True,
                                 help_text="Hashed password for the session.")
+    created_at = models.DateTimeField(auto_now_add=True,
+                                      help_text="When the offerer created the session.")
+    last_activity = models.DateTimeField(default=timezone.now, db_index=True,
+                                         help_text="When signaling data was last written to the session.")
 
     def __str__(self):
         return f"Session {self.id}"
 
 class Client(models.Model):
+    class Role(models.TextChoices):
+        OFFERER = 'offerer', 'Offerer'
+        ANSWERER = 'answerer', 'Answerer'
+
     session = models.ForeignKey(Session, on_delete=models.CASCADE,
                                 related_name='clients',
                                 help_text="The session this client belongs to.")
+    role = models.CharField(max_length=8, choices=Role.choices,
+                            help_text="Whether the client made the offer or the answer.")
+
+    class Meta:
+        constraints = [
+            # One offerer and one answerer per session, also indexes role lookups
+            models.UniqueConstraint(fields=['session', 'role'], name='unique_client_role_per_session'),
+        ]
 
     def __str__(self):
         return f"Client {self.id} (Session: {self.session.id})"
@@ -30,5 +47,11 @@ class IceCandidate(models.Model):
                                help_text="The client this ICE candidate belongs to.")
     body = models.TextField(help_text="The ICE candidate body.")
 
+    class Meta:
+        indexes = [
+            # Cursor reads fetch candidates of one client with id > cursor
+            models.Index(fields=['client', 'id'], name='ice_candidate_cursor_idx'),
+        ]
+
     def __str__(self):
         return f"IceCandidate for Client {self.client.id}"
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+
+class Subscription:
+    """
+    A single waiter registered on a session.
+    It is bound to the event loop it was created on and can be woken up from any thread.
+    """
+    def __init__(self, notifier, hashpass):
+        self.notifier = notifier
+        self.hashpass = hashpass
+        self.loop = asyncio.get_running_loop()
+        self.event = asyncio.Event()
+
+    def wake(self):
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.event.set)
+
+    def clear(self):
+        self.event.clear()
+
+    async def wait(self, timeout):
+        """
+        Waits until the session is notified or the timeout expires.
+        Returns True if it was woken up by a notification.
+        """
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def close(self):
+        self.notifier.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SessionNotifier:
+    """
+    In-process notifier keyed by session hashpass.
+    Views that store signaling data call notify(), subscribers waiting on the
+    same session are woken up instead of polling the database.
+    Only subscribers of the same process are woken up, which is why the server runs
+    a single worker process; others see the write at their next store re-check.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, hashpass):
+        subscription = Subscription(self, hashpass)
+        with self._lock:
+            self._subscriptions[hashpass].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.hashpass)
+            if subscriptions is None:
+                return
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.hashpass]
+
+    def notify(self, hashpass):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(hashpass, ()))
+        for subscription in subscriptions:
+            subscription.wake()
+
+
+# Shared notifier for the whole process
+notifier = SessionNotifier()
@@ -0,0 +1,44 @@
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .stores import get_store
+
+
+class SessionReaper(threading.Thread):
+    """
+    Daemon thread that deletes expired sessions of the signaling store every `interval` seconds.
+    """
+    def __init__(self, interval, batch_size):
+        super().__init__(name='signaling-session-reaper', daemon=True)
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                get_store().reap(batch_size=self.batch_size)
+            except Exception as e:
+                print(f"Warning: Reaping expired sessions failed: {e}")
+            finally:
+                close_old_connections()
+
+    def stop(self):
+        self._stopped.set()
+
+
+_reaper = None
+
+def start_reaper():
+    """
+    Starts the in-process reaper if SIGNALING_REAPER_INTERVAL is set.
+    Called by the server entry points, so management commands never start it.
+    """
+    global _reaper
+
+    if settings.SIGNALING_REAPER_INTERVAL and _reaper is None:
+        _reaper = SessionReaper(settings.SIGNALING_REAPER_INTERVAL, settings.SIGNALING_REAPER_BATCH_SIZE)
+        _reaper.start()
+    return _reaper
@@ -0,0 +1,55 @@
+import hashlib
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .stores import OFFERER, ANSWERER, get_store
+
+
+class RenderedResponse(namedtuple('RenderedResponse', ['content', 'etag'])):
+    """
+    JSON content of a successful response, with the ETag derived from it.
+    """
+
+    @classmethod
+    def from_content(cls, content):
+        content = content.encode('utf-8')
+        return cls(content, f'"{hashlib.blake2b(content, digest_size=16).hexdigest()}"')
+
+
+def get_cache():
+    return caches[settings.SIGNALING_RESPONSE_CACHE]
+
+def cache_key(session_hashpass, role):
+    return f'signaling:sd:{role}:{session_hashpass}'
+
+def get_description_response(session_hashpass, role):
+    """
+    Returns the cached RenderedResponse of the session description of the role, None on a miss.
+    """
+    return get_cache().get(cache_key(session_hashpass, role))
+
+def set_description_response(session_hashpass, role, content):
+    """
+    Caches the rendered response of a stored session description and returns it.
+    Descriptions never change once stored, so entries are only dropped with their session,
+    and kept no longer than the store keeps sessions.
+    """
+    response = RenderedResponse.from_content(content)
+    timeout = settings.SIGNALING_RESPONSE_CACHE_TIMEOUT
+    ttl = get_store().ttl
+    if ttl is not None:
+        timeout = min(timeout, ttl)
+    get_cache().set(cache_key(session_hashpass, role), response, timeout)
+    return response
+
+def invalidate_sessions(session_hashpasses):
+    """
+    Drops the cached responses of deleted (or re-created) sessions.
+    """
+    get_cache().delete_many([
+        cache_key(session_hashpass, role)
+        for session_hashpass in session_hashpasses
+        for role in (OFFERER, ANSWERER)
+    ])
@@ -0,0 +1,33 @@
+from functools import cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .base import (
+    OFFERER,
+    ANSWERER,
+    StoreError,
+    SessionNotFound,
+    SessionExists,
+    ClientNotFound,
+    AnswerExists,
+    BaseStore,
+)
+
+
+@cache
+def get_store():
+    """
+    Returns the signaling store configured by the SIGNALING_STORE setting.
+    """
+    config = settings.SIGNALING_STORE
+    backend = import_string(config['BACKEND'])
+    return backend(**config.get('OPTIONS', {}))
+
+
+@receiver(setting_changed)
+def reset_store(setting, **kwargs):
+    if setting == 'SIGNALING_STORE':
+        get_store.cache_clear()
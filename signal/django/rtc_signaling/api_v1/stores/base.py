@@ -0,0 +1,99 @@
+import hmac
+
+OFFERER = 'offerer'
+ANSWERER = 'answerer'
+
+
+class StoreError(Exception):
+    """
+    Base class of errors raised by signaling stores.
+    """
+
+class SessionNotFound(StoreError):
+    pass
+
+class SessionExists(StoreError):
+    pass
+
+class ClientNotFound(StoreError):
+    """
+    Raised when the session has no client with the given id or role (yet).
+    """
+
+class AnswerExists(StoreError):
+    pass
+
+
+class BaseStore:
+    """
+    Storage of the ephemeral signaling data of sessions: the offerer and answerer
+    clients, their session descriptions and ICE candidates.
+    Sessions are addressed by the hash of their pass, clients by role or id.
+    Bodies are canonical JSON text, they are stored and returned as is.
+
+    Every lookup optionally takes the `session_id` issued by create_session(). Stores
+    that index sessions by id look them up by it and verify the pass hash in constant
+    time, the others check that it belongs to the session found by the hash.
+    A session id that does not match the pass is reported as SessionNotFound.
+    """
+    # Seconds a session is kept after its last write, None if sessions don't expire
+    ttl = None
+
+    @staticmethod
+    def verify_hashpass(stored_hashpass, hashpass):
+        return hmac.compare_digest(stored_hashpass.encode('utf-8'), hashpass.encode('utf-8'))
+
+    def create_session(self, hashpass, offer_body):
+        """
+        Creates the session with the offer of its offerer client and returns
+        the session id and the client id.
+        Raises SessionExists if the pass is already used.
+        """
+        raise NotImplementedError
+
+    def add_answer(self, hashpass, answer_body, session_id=None):
+        """
+        Stores the answer of the session answerer client and returns the session id
+        and the client id, as create_session() does. Raises SessionNotFound or AnswerExists.
+        """
+        raise NotImplementedError
+
+    def get_description(self, hashpass, role, session_id=None):
+        """
+        Returns the session description body of the client with the given role.
+        Raises SessionNotFound, or ClientNotFound if the role has no description yet.
+        """
+        raise NotImplementedError
+
+    def add_candidate(self, hashpass, client_id, candidate_body, session_id=None):
+        """
+        Stores an ICE candidate of the session client.
+        Raises SessionNotFound or ClientNotFound.
+        """
+        self.add_candidates(hashpass, client_id, [candidate_body], session_id)
+
+    def add_candidates(self, hashpass, client_id, candidate_bodies, session_id=None):
+        """
+        Stores a non-empty batch of ICE candidates of the session client at once, in order.
+        Raises SessionNotFound or ClientNotFound.
+        """
+        raise NotImplementedError
+
+    def get_candidates(self, hashpass, role, cursor, session_id=None):
+        """
+        Returns ICE candidate bodies of the client with the given role stored after
+        the cursor, together with the cursor to pass on the next call.
+        Raises SessionNotFound, or ClientNotFound if the session has no such client yet.
+        """
+        raise NotImplementedError
+
+    def session_exists(self, hashpass, session_id=None):
+        raise NotImplementedError
+
+    def reap(self, batch_size=1000, max_batches=None):
+        """
+        Deletes expired sessions with all their data, at most `batch_size` sessions
+        at a time, and returns how many were deleted.
+        Stores that expire sessions by themselves have nothing to do.
+        """
+        return 0
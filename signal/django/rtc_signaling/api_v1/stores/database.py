@@ -0,0 +1,178 @@
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from ..models import Session, Client, SessionDescription, IceCandidate
+from ..response_cache import invalidate_sessions
+from .base import BaseStore, SessionNotFound, SessionExists, ClientNotFound, AnswerExists
+
+
+class DatabaseStore(BaseStore):
+    """
+    Keeps signaling data in the database through the api_v1 models.
+    Lookups join session, role client and its data in a single query, a second
+    one is only run to explain an empty result. With the session id they use the
+    primary key instead of the unique index on the pass hash.
+
+    Sessions expire `ttl` seconds after their last activity: lookups no longer find
+    them, and reap() deletes them.
+    Activity is written at most once per `activity_resolution` seconds, so trickled
+    candidates don't rewrite the session row each time.
+    """
+
+    def __init__(self, ttl=600, activity_resolution=30):
+        self.ttl = ttl
+        self.activity_resolution = timedelta(seconds=activity_resolution)
+
+    def expiry(self, now=None):
+        """
+        Sessions last active before this time have expired.
+        """
+        return (now or timezone.now()) - timedelta(seconds=self.ttl)
+
+    def expired_sessions(self, now=None):
+        return Session.objects.filter(last_activity__lt=self.expiry(now))
+
+    def create_session(self, hashpass, offer_body):
+        try:
+            return self._create_session(hashpass, offer_body)
+        except IntegrityError:
+            pass
+
+        # The pass may still be taken by an expired session that was not reaped yet
+        if not self.expired_sessions().filter(hashpass=hashpass).delete()[0]:
+            raise SessionExists(hashpass)
+        try:
+            return self._create_session(hashpass, offer_body)
+        except IntegrityError:
+            raise SessionExists(hashpass)
+
+    def _create_session(self, hashpass, offer_body):
+        with transaction.atomic():
+            session = Session.objects.create(hashpass=hashpass)
+            client = Client.objects.create(session=session, role=Client.Role.OFFERER)
+            SessionDescription.objects.create(client=client, body=offer_body)
+        return session.id, client.id
+
+    def touch(self, session, now=None):
+        """
+        Records activity on the session unless it was recorded recently.
+        """
+        now = now or timezone.now()
+        if now - session.last_activity >= self.activity_resolution:
+            Session.objects.filter(id=session.id).update(last_activity=now)
+
+    def session_filter(self, hashpass, session_id, prefix=''):
+        """
+        Selects the session by its id (the primary key) when the client sent it,
+        otherwise by the hash of its pass, unless it has expired.
+        """
+        filters = {f'{prefix}last_activity__gte': self.expiry()}
+        if session_id is None:
+            filters[f'{prefix}hashpass'] = hashpass
+        else:
+            filters[f'{prefix}id'] = session_id
+        return filters
+
+    def add_answer(self, hashpass, answer_body, session_id=None):
+        try:
+            session = Session.objects.get(**self.session_filter(hashpass, session_id))
+        except Session.DoesNotExist:
+            raise SessionNotFound(hashpass)
+        if not self.verify_hashpass(session.hashpass, hashpass):
+            raise SessionNotFound(hashpass)
+
+        try:
+            with transaction.atomic():
+                client = Client.objects.create(session=session, role=Client.Role.ANSWERER)
+                SessionDescription.objects.create(client=client, body=answer_body)
+                self.touch(session)
+        except IntegrityError:
+            raise AnswerExists(hashpass)
+        return session.id, client.id
+
+    def get_description(self, hashpass, role, session_id=None):
+        try:
+            body, stored_hashpass = SessionDescription.objects.values_list('body', 'client__session__hashpass') \
+                .get(client__role=role, **self.session_filter(hashpass, session_id, 'client__session__'))
+        except SessionDescription.DoesNotExist:
+            if not self.session_exists(hashpass, session_id):
+                raise SessionNotFound(hashpass)
+            raise ClientNotFound(role)
+
+        if not self.verify_hashpass(stored_hashpass, hashpass):
+            raise SessionNotFound(hashpass)
+        return body
+
+    def add_candidates(self, hashpass, client_id, candidate_bodies, session_id=None):
+        try:
+            client = Client.objects.select_related('session') \
+                                   .only('id', 'session__id', 'session__hashpass', 'session__last_activity') \
+                                   .get(id=client_id, **self.session_filter(hashpass, session_id, 'session__'))
+        except Client.DoesNotExist:
+            if not self.session_exists(hashpass, session_id):
+                raise SessionNotFound(hashpass)
+            raise ClientNotFound(client_id)
+        if not self.verify_hashpass(client.session.hashpass, hashpass):
+            raise SessionNotFound(hashpass)
+
+        # A single INSERT for the whole batch, ids keep the order used by the cursor
+        IceCandidate.objects.bulk_create(IceCandidate(client=client, body=body) for body in candidate_bodies)
+        self.touch(client.session)
+
+    def get_candidates(self, hashpass, role, cursor, session_id=None):
+        raw_candidates = IceCandidate.objects.filter(
+            client__role=role, id__gt=cursor, **self.session_filter(hashpass, session_id, 'client__session__')
+        ).order_by('id').values_list('id', 'body', 'client__session__hashpass')
+
+        bodies = []
+        for candidate_id, body, stored_hashpass in raw_candidates:
+            cursor = candidate_id
+            bodies.append(body)
+
+        if not bodies:
+            stored_hashpass, has_role = self.session_has_role(hashpass, role, session_id) or (None, None)
+            if stored_hashpass is None:
+                raise SessionNotFound(hashpass)
+        if not self.verify_hashpass(stored_hashpass, hashpass):
+            raise SessionNotFound(hashpass)
+        if not bodies and not has_role:
+            raise ClientNotFound(role)
+
+        return bodies, cursor
+
+    def session_exists(self, hashpass, session_id=None):
+        stored_hashpass = Session.objects.filter(**self.session_filter(hashpass, session_id)) \
+                                         .values_list('hashpass', flat=True).first()
+        return stored_hashpass is not None and self.verify_hashpass(stored_hashpass, hashpass)
+
+    def session_has_role(self, hashpass, role, session_id=None):
+        """
+        Returns the pass hash of the session and whether it has a client with the given role,
+        None if there is no such session.
+        """
+        return Session.objects.filter(**self.session_filter(hashpass, session_id)).annotate(
+            has_role=Exists(Client.objects.filter(session=OuterRef('pk'), role=role))
+        ).values_list('hashpass', 'has_role').first()
+
+    def reap(self, batch_size=1000, max_batches=None):
+        now = timezone.now()
+        deleted = 0
+        batches = 0
+
+        while max_batches is None or batches < max_batches:
+            # Served by the last_activity index, the batch bounds the cascade below
+            expired = dict(self.expired_sessions(now).values_list('id', 'hashpass')[:batch_size])
+            if not expired:
+                break
+
+            Session.objects.filter(id__in=expired).delete()
+            invalidate_sessions(expired.values())
+            deleted += len(expired)
+            batches += 1
+            if len(expired) < batch_size:
+                break
+
+        return deleted
@@ -0,0 +1,124 @@
+import itertools
+import threading
+import time
+
+from ..response_cache import invalidate_sessions
+from .base import BaseStore, OFFERER, ANSWERER, SessionNotFound, SessionExists, ClientNotFound, AnswerExists
+
+
+class MemorySession:
+    __slots__ = ('id', 'clients', 'descriptions', 'candidates', 'expires_at')
+
+    def __init__(self, session_id):
+        self.id = session_id
+        self.clients = {} # Client id -> role
+        self.descriptions = {} # Role -> body
+        self.candidates = {OFFERER: [], ANSWERER: []}
+        self.expires_at = 0
+
+
+class MemoryStore(BaseStore):
+    """
+    Keeps signaling data in the memory of the current process.
+    Sessions expire `ttl` seconds after their last write and are evicted lazily on
+    access and by a sweep every `sweep_interval` seconds.
+    Data is not shared between processes, so it only suits a single worker.
+    """
+
+    def __init__(self, ttl=300, sweep_interval=30):
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._session_ids = itertools.count(1)
+        self._client_ids = itertools.count(1)
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    def _get_session(self, hashpass, now, session_id=None):
+        session = self._sessions.get(hashpass)
+        if session is None or (session_id is not None and session.id != session_id):
+            raise SessionNotFound(hashpass)
+        if session.expires_at <= now:
+            del self._sessions[hashpass]
+            invalidate_sessions([hashpass])
+            raise SessionNotFound(hashpass)
+        return session
+
+    def _touch(self, session, now):
+        session.expires_at = now + self.ttl
+
+        if now >= self._next_sweep:
+            self._sweep(now)
+
+    def _sweep(self, now):
+        self._next_sweep = now + self.sweep_interval
+        expired = [hashpass for hashpass, stored in self._sessions.items() if stored.expires_at <= now]
+        for hashpass in expired:
+            del self._sessions[hashpass]
+        invalidate_sessions(expired)
+        return len(expired)
+
+    def _add_client(self, session, role, body, now):
+        client_id = next(self._client_ids)
+        session.clients[client_id] = role
+        session.descriptions[role] = body
+        self._touch(session, now)
+        return client_id
+
+    def create_session(self, hashpass, offer_body):
+        now = time.monotonic()
+        with self._lock:
+            try:
+                self._get_session(hashpass, now)
+            except SessionNotFound:
+                session = self._sessions[hashpass] = MemorySession(next(self._session_ids))
+                return session.id, self._add_client(session, OFFERER, offer_body, now)
+        raise SessionExists(hashpass)
+
+    def add_answer(self, hashpass, answer_body, session_id=None):
+        now = time.monotonic()
+        with self._lock:
+            session = self._get_session(hashpass, now, session_id)
+            if ANSWERER in session.descriptions:
+                raise AnswerExists(hashpass)
+            return session.id, self._add_client(session, ANSWERER, answer_body, now)
+
+    def get_description(self, hashpass, role, session_id=None):
+        with self._lock:
+            session = self._get_session(hashpass, time.monotonic(), session_id)
+            try:
+                return session.descriptions[role]
+            except KeyError:
+                raise ClientNotFound(role)
+
+    def add_candidates(self, hashpass, client_id, candidate_bodies, session_id=None):
+        now = time.monotonic()
+        with self._lock:
+            session = self._get_session(hashpass, now, session_id)
+            try:
+                role = session.clients[int(client_id)]
+            except (KeyError, ValueError):
+                raise ClientNotFound(client_id)
+            session.candidates[role].extend(candidate_bodies)
+            self._touch(session, now)
+
+    def get_candidates(self, hashpass, role, cursor, session_id=None):
+        with self._lock:
+            session = self._get_session(hashpass, time.monotonic(), session_id)
+            if role not in session.descriptions:
+                raise ClientNotFound(role)
+            # The cursor is the number of candidates already seen
+            candidates = session.candidates[role]
+            return candidates[cursor:], len(candidates)
+
+    def session_exists(self, hashpass, session_id=None):
+        with self._lock:
+            try:
+                self._get_session(hashpass, time.monotonic(), session_id)
+            except SessionNotFound:
+                return False
+            return True
+
+    def reap(self, batch_size=1000, max_batches=None):
+        with self._lock:
+            return self._sweep(time.monotonic())
@@ -0,0 +1,116 @@
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import BaseStore, OFFERER, ANSWERER, SessionNotFound, SessionExists, ClientNotFound, AnswerExists
+
+
+class RedisStore(BaseStore):
+    """
+    Keeps signaling data in Redis (or a Redis-compatible server), shared by all
+    worker processes. Every key of a session expires `ttl` seconds after its last write.
+
+    A session is a hash with one field per role holding "<client id>:<description body>",
+    so a client and its description are written atomically with HSETNX.
+    Candidates of each role are kept in a list, the cursor is the number of candidates seen.
+    Sessions are found by the pass hash, the session id is the offerer's client id.
+    """
+
+    def __init__(self, url='redis://localhost:6379/0', ttl=300, prefix='signaling', client=None):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise ImproperlyConfigured("RedisStore requires the 'redis' package.") from e
+            client = redis.Redis.from_url(url)
+
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _session_key(self, hashpass):
+        return f"{self.prefix}:session:{hashpass}"
+
+    def _candidates_key(self, hashpass, role):
+        return f"{self.prefix}:session:{hashpass}:{role}:candidates"
+
+    def _touch(self, pipeline, hashpass):
+        pipeline.expire(self._session_key(hashpass), self.ttl)
+        for role in (OFFERER, ANSWERER):
+            pipeline.expire(self._candidates_key(hashpass, role), self.ttl)
+
+    def _add_client(self, hashpass, role, body):
+        client_id = self.client.incr(f"{self.prefix}:client-ids")
+        # One MULTI/EXEC transaction, a session key is never left without its TTL.
+        # A rejected client refreshes the TTL of the session it collided with, which is harmless.
+        pipeline = self.client.pipeline(transaction=True)
+        pipeline.hsetnx(self._session_key(hashpass), role, f"{client_id}:{body}")
+        self._touch(pipeline, hashpass)
+        added = pipeline.execute()[0]
+        return client_id if added else None
+
+    @staticmethod
+    def _is_session(offerer, session_id):
+        """
+        Tells whether the stored offerer field belongs to the session with the given id, if any.
+        """
+        if offerer is None:
+            return False
+        return session_id is None or offerer.split(b':', 1)[0] == str(session_id).encode('utf-8')
+
+    def _get_clients(self, hashpass, session_id=None):
+        """
+        Returns the stored client field of each role, None for missing roles.
+        """
+        values = self.client.hmget(self._session_key(hashpass), [OFFERER, ANSWERER])
+        if not self._is_session(values[0], session_id):
+            raise SessionNotFound(hashpass)
+        return dict(zip((OFFERER, ANSWERER), (
+            value.decode('utf-8').split(':', 1) if value is not None else None for value in values
+        )))
+
+    def create_session(self, hashpass, offer_body):
+        client_id = self._add_client(hashpass, OFFERER, offer_body)
+        if client_id is None:
+            raise SessionExists(hashpass)
+        return client_id, client_id
+
+    def add_answer(self, hashpass, answer_body, session_id=None):
+        offerer_id = self._get_clients(hashpass, session_id)[OFFERER][0]
+
+        client_id = self._add_client(hashpass, ANSWERER, answer_body)
+        if client_id is None:
+            raise AnswerExists(hashpass)
+        return int(offerer_id), client_id
+
+    def get_description(self, hashpass, role, session_id=None):
+        client = self._get_clients(hashpass, session_id)[role]
+        if client is None:
+            raise ClientNotFound(role)
+        return client[1]
+
+    def add_candidates(self, hashpass, client_id, candidate_bodies, session_id=None):
+        clients = self._get_clients(hashpass, session_id)
+        for role, client in clients.items():
+            if client is not None and client[0] == str(client_id):
+                break
+        else:
+            raise ClientNotFound(client_id)
+
+        pipeline = self.client.pipeline()
+        pipeline.rpush(self._candidates_key(hashpass, role), *candidate_bodies)
+        self._touch(pipeline, hashpass)
+        pipeline.execute()
+
+    def get_candidates(self, hashpass, role, cursor, session_id=None):
+        pipeline = self.client.pipeline()
+        pipeline.hmget(self._session_key(hashpass), [OFFERER, role])
+        pipeline.lrange(self._candidates_key(hashpass, role), cursor, -1)
+        (offerer, client), bodies = pipeline.execute()
+
+        if not self._is_session(offerer, session_id):
+            raise SessionNotFound(hashpass)
+        if client is None:
+            raise ClientNotFound(role)
+        return [body.decode('utf-8') for body in bodies], cursor + len(bodies)
+
+    def session_exists(self, hashpass, session_id=None):
+        return self._is_session(self.client.hget(self._session_key(hashpass), OFFERER), session_id)
@@ -1,3 +1,611 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import hmac
+import io
+import json
+import time
+import unittest
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from .models import Session, SessionDescription, IceCandidate
+from .stores import OFFERER, ANSWERER, SessionNotFound, SessionExists, ClientNotFound, AnswerExists
+from .stores.database import DatabaseStore
+from .stores.memory import MemoryStore
+from .stores.redis import RedisStore
+from .views import client_hash, hash_password
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+
+class SignalingTestCase(TestCase):
+    """
+    Base test case with helpers to run the offer/answer exchange.
+    """
+    PASS = 'test-pass'
+
+    def post(self, name, data):
+        return self.client.post(f'/api/v1/{name}/', data, content_type='application/json')
+
+    def add_offer(self):
+        return self.post('add-offer-sd', {
+            'offer': {'type': 'offer', 'sdp': 'offer-sdp'},
+            'hash_pass': client_hash(self.PASS),
+        }).json()['client_id']
+
+    def add_answer(self):
+        return self.post('add-answer-sd', {
+            'answer': {'type': 'answer', 'sdp': 'answer-sdp'},
+            'pass': self.PASS,
+        }).json()['client_id']
+
+    def add_candidate(self, client_id, index):
+        return self.post('add-ice-candidate', {
+            'client_id': client_id,
+            'pass': self.PASS,
+            'candidate': {'candidate': f'candidate:{index}', 'sdpMid': '0'},
+        })
+
+
+class IceCandidateCursorTests(SignalingTestCase):
+    def test_returns_only_candidates_after_cursor(self):
+        offerer_id = self.add_offer()
+        self.add_answer()
+        for index in range(3):
+            self.add_candidate(offerer_id, index)
+
+        data = self.post('get-offer-ice-candidates', {'pass': self.PASS}).json()
+        self.assertEqual(len(data['candidates']), 3)
+
+        self.add_candidate(offerer_id, 3)
+        data = self.post('get-offer-ice-candidates', {'pass': self.PASS, 'cursor': data['cursor']}).json()
+        self.assertEqual(data['candidates'], [{'candidate': 'candidate:3', 'sdpMid': '0'}])
+
+        cursor = data['cursor']
+        data = self.post('get-offer-ice-candidates', {'pass': self.PASS, 'cursor': cursor}).json()
+        self.assertEqual(data['candidates'], [])
+        self.assertEqual(data['cursor'], cursor)
+
+    def test_rejects_invalid_cursor(self):
+        self.add_offer()
+        response = self.post('get-offer-ice-candidates', {'pass': self.PASS, 'cursor': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+
+class BatchIceCandidateTests(SignalingTestCase):
+    def test_candidates_are_stored_in_order_with_end_marker(self):
+        offerer_id = self.add_offer()
+        self.add_answer()
+        self.add_candidate(offerer_id, 0)
+        response = self.post('add-ice-candidates', {
+            'client_id': offerer_id,
+            'pass': self.PASS,
+            'candidates': [{'candidate': f'candidate:{index}', 'sdpMid': '0'} for index in (1, 2)],
+            'done': True,
+        })
+        self.assertEqual(response.status_code, 201)
+
+        data = self.post('get-offer-ice-candidates', {'pass': self.PASS}).json()
+        self.assertEqual([candidate['candidate'] for candidate in data['candidates']],
+                         ['candidate:0', 'candidate:1', 'candidate:2', ''])
+        self.assertTrue(data['complete'])
+
+    def test_rejects_empty_batch(self):
+        offerer_id = self.add_offer()
+        response = self.post('add-ice-candidates', {'client_id': offerer_id, 'pass': self.PASS, 'candidates': []})
+        self.assertEqual(response.status_code, 400)
+
+    def test_unknown_client(self):
+        offerer_id = self.add_offer()
+        response = self.post('add-ice-candidates', {
+            'client_id': offerer_id + 1000,
+            'pass': self.PASS,
+            'done': True,
+        })
+        self.assertEqual(response.status_code, 404)
+
+
+class ResponseCacheTests(SignalingTestCase):
+    def setUp(self):
+        self.add_offer()
+        self.add_answer()
+
+    def test_repeated_reads_are_served_from_cache(self):
+        for name in ('get-offer-sd', 'get-answer-sd'):
+            with self.subTest(name=name):
+                first = self.post(name, {'pass': self.PASS})
+                # Only the session is looked up, the description is not read nor rendered again
+                with self.assertNumQueries(1):
+                    second = self.post(name, {'pass': self.PASS})
+                self.assertEqual(second.content, first.content)
+                self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_if_none_match_returns_not_modified(self):
+        etag = self.post('get-offer-sd', {'pass': self.PASS})['ETag']
+        response = self.client.post('/api/v1/get-offer-sd/', {'pass': self.PASS},
+                                    content_type='application/json', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        response = self.client.post('/api/v1/get-answer-sd/', {'pass': self.PASS},
+                                    content_type='application/json', headers={'If-None-Match': '"other"'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_reaped_session_is_invalidated(self):
+        self.post('get-offer-sd', {'pass': self.PASS})
+        Session.objects.update(last_activity=timezone.now() - timedelta(days=1))
+        DatabaseStore().reap()
+        self.assertEqual(self.post('get-offer-sd', {'pass': self.PASS}).status_code, 404)
+
+    def test_expired_session_is_not_served_before_it_is_reaped(self):
+        self.post('get-offer-sd', {'pass': self.PASS})
+        Session.objects.update(last_activity=timezone.now() - timedelta(days=1))
+        for name in ('get-offer-sd', 'get-answer-sd', 'get-offer-ice-candidates'):
+            with self.subTest(name=name):
+                self.assertEqual(self.post(name, {'pass': self.PASS}).status_code, 404)
+        self.assertTrue(Session.objects.exists())
+
+    def test_cached_response_needs_the_session(self):
+        self.post('get-offer-sd', {'pass': self.PASS})
+        session_id = Session.objects.get().id
+        response = self.post('get-offer-sd', {'pass': self.PASS, 'session_id': session_id + 1})
+        self.assertEqual(response.status_code, 404)
+
+        # Deleted without going through the store, as when Redis expires the keys
+        Session.objects.all().delete()
+        for name in ('get-offer-sd', 'get-answer-sd'):
+            with self.subTest(name=name):
+                self.assertEqual(self.post(name, {'pass': self.PASS}).status_code, 404)
+
+    @override_settings(SIGNALING_RESPONSE_CACHE_TIMEOUT=3600)
+    def test_cache_timeout_is_capped_at_store_ttl(self):
+        with mock.patch('api_v1.response_cache.get_cache') as get_cache:
+            get_cache().get.return_value = None
+            self.post('get-offer-sd', {'pass': self.PASS})
+        self.assertEqual(get_cache().set.call_args.args[2], 600)
+
+
+class SessionIdTests(SignalingTestCase):
+    def setUp(self):
+        response = self.post('add-offer-sd', {
+            'offer': {'type': 'offer', 'sdp': 'offer-sdp'},
+            'hash_pass': client_hash(self.PASS),
+        }).json()
+        self.session_id = response['session_id']
+        self.offerer_id = response['client_id']
+
+    def test_requests_with_session_id(self):
+        response = self.post('add-ice-candidate', {
+            'client_id': self.offerer_id,
+            'session_id': self.session_id,
+            'pass': self.PASS,
+            'candidate': {'candidate': 'candidate:0', 'sdpMid': '0'},
+        })
+        self.assertEqual(response.status_code, 201)
+
+        with self.assertNumQueries(1):
+            response = self.post('get-offer-ice-candidates', {'session_id': self.session_id, 'pass': self.PASS})
+        self.assertEqual(len(response.json()['candidates']), 1)
+
+    def test_answerer_gets_the_session_id(self):
+        response = self.post('add-answer-sd', {'answer': {'type': 'answer', 'sdp': 'answer-sdp'}, 'pass': self.PASS})
+        self.assertEqual(response.json()['session_id'], self.session_id)
+        response = self.post('get-offer-ice-candidates', {'session_id': self.session_id, 'pass': self.PASS})
+        self.assertEqual(response.status_code, 200)
+
+    def test_sessions_are_stored_by_keyed_hash(self):
+        expected = hmac.new(settings.SECRET_KEY.encode('utf-8'), client_hash(self.PASS).encode('utf-8'),
+                            hashlib.sha256).hexdigest()
+        self.assertEqual(Session.objects.get().hashpass, expected)
+        self.assertEqual(hash_password(self.PASS), expected)
+
+    def test_session_id_must_match_pass(self):
+        response = self.post('get-offer-ice-candidates', {'session_id': self.session_id + 1, 'pass': self.PASS})
+        self.assertEqual(response.status_code, 404)
+        response = self.post('get-offer-ice-candidates', {'session_id': self.session_id, 'pass': 'other-pass'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_rejects_invalid_session_id(self):
+        response = self.post('get-answer-sd', {'session_id': 'abc', 'pass': self.PASS})
+        self.assertEqual(response.status_code, 400)
+
+
+class BodyEncodingTests(SignalingTestCase):
+    def test_bodies_are_stored_as_canonical_json(self):
+        self.post('add-offer-sd', {
+            'offer': str({'type': 'offer', 'sdp': 'offer-sdp'}), # Older clients send a Python literal
+            'hash_pass': client_hash(self.PASS),
+        })
+        self.assertEqual(SessionDescription.objects.get().body, '{"type":"offer","sdp":"offer-sdp"}')
+
+        response = self.post('get-offer-sd', {'pass': self.PASS})
+        self.assertEqual(response.json(), {'status': 'success', 'offer': {'type': 'offer', 'sdp': 'offer-sdp'}})
+
+    def test_rejects_malformed_body(self):
+        response = self.post('add-offer-sd', {'offer': '{not a dict', 'hash_pass': client_hash(self.PASS)})
+        self.assertEqual(response.status_code, 400)
+
+    def test_normalize_bodies_command(self):
+        offerer_id = self.add_offer()
+        self.add_candidate(offerer_id, 0)
+        SessionDescription.objects.update(body=str({'type': 'offer', 'sdp': 'offer-sdp'}))
+        IceCandidate.objects.update(body='{broken')
+
+        call_command('normalize_bodies', stdout=io.StringIO())
+
+        self.assertEqual(SessionDescription.objects.get().body, '{"type":"offer","sdp":"offer-sdp"}')
+        self.assertFalse(IceCandidate.objects.exists())
+
+
+@override_settings(SIGNALING_RECHECK_INTERVAL=0.05)
+class LongPollTests(SignalingTestCase):
+    async def long_poll(self, name, data):
+        return await self.async_client.post(f'/api/v1/{name}/', data, content_type='application/json')
+
+    async def test_answer_is_returned_once_stored(self):
+        await sync_to_async(self.add_offer)()
+
+        async def answer_later():
+            await asyncio.sleep(0.1)
+            await sync_to_async(self.add_answer)()
+
+        response, _ = await asyncio.gather(
+            self.long_poll('get-answer-sd', {'pass': self.PASS, 'wait': 5}),
+            answer_later(),
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['answer'], {'type': 'answer', 'sdp': 'answer-sdp'})
+
+    async def test_wait_expires_without_answer(self):
+        await sync_to_async(self.add_offer)()
+
+        start = time.monotonic()
+        response = await self.long_poll('get-answer-sd', {'pass': self.PASS, 'wait': 0.2})
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+        self.assertEqual(response.status_code, 404)
+
+    async def test_unknown_session_is_not_held(self):
+        start = time.monotonic()
+        response = await self.long_poll('get-answer-ice-candidates', {'pass': 'unknown', 'wait': 5})
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(response.status_code, 404)
+
+
+def parse_events(text):
+    """
+    Parses a server-sent event stream into (id, event, data) tuples, skipping comments.
+    """
+    events = []
+    for block in text.split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if line and not line.startswith(':'))
+        if 'event' in fields:
+            events.append((fields.get('id'), fields['event'], json.loads(fields['data'])))
+    return events
+
+
+@override_settings(SIGNALING_RECHECK_INTERVAL=0.05, SIGNALING_PUSH_MAX_DURATION=0.5)
+class SubscribeTests(SignalingTestCase):
+    async def subscribe(self, **headers):
+        return await self.async_client.get('/api/v1/subscribe/', {'pass': self.PASS}, headers=headers)
+
+    async def read_events(self, content, until=None):
+        """
+        Reads the stream content until it ends, or until an event named `until` arrived.
+        """
+        text = ''
+        async for chunk in content:
+            text += chunk.decode('utf-8')
+            if until is not None and until in {event for _, event, _ in parse_events(text)}:
+                break
+        return parse_events(text)
+
+    async def test_replays_stored_events(self):
+        offerer_id = await sync_to_async(self.add_offer)()
+        await sync_to_async(self.add_answer)()
+        await sync_to_async(self.add_candidate)(offerer_id, 0)
+
+        response = await self.subscribe()
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = await self.read_events(response.streaming_content)
+        self.assertEqual([(event, data) for _, event, data in events], [
+            ('offer', {'type': 'offer', 'sdp': 'offer-sdp'}),
+            ('offer-candidate', {'candidate': 'candidate:0', 'sdpMid': '0'}),
+            ('answer', {'type': 'answer', 'sdp': 'answer-sdp'}),
+        ])
+        # The batch is sent at once, its last event carries the stream position
+        self.assertEqual([event_id is None for event_id, _, _ in events], [True, True, False])
+        self.assertRegex(events[-1][0], r'^offerer:\d+,answerer:0$')
+
+    async def test_pushes_write_without_waiting_for_recheck(self):
+        await sync_to_async(self.add_offer)()
+
+        def add_answer():
+            # The test transaction is never committed, run the notification now
+            with self.captureOnCommitCallbacks(execute=True):
+                self.add_answer()
+
+        async def answer_later():
+            await asyncio.sleep(0.1)
+            await sync_to_async(add_answer)()
+
+        with override_settings(SIGNALING_RECHECK_INTERVAL=5, SIGNALING_PUSH_MAX_DURATION=5):
+            start = time.monotonic()
+            response = await self.subscribe()
+            events, _ = await asyncio.gather(self.read_events(response.streaming_content, until='answer'), answer_later())
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual([event for _, event, _ in events], ['offer', 'answer'])
+
+    async def test_resumes_after_last_event_id(self):
+        offerer_id = await sync_to_async(self.add_offer)()
+        await sync_to_async(self.add_answer)()
+        await sync_to_async(self.add_candidate)(offerer_id, 0)
+        events = await self.read_events((await self.subscribe()).streaming_content)
+
+        await sync_to_async(self.add_candidate)(offerer_id, 1)
+        response = await self.subscribe(**{'Last-Event-ID': events[-1][0]})
+        events = await self.read_events(response.streaming_content)
+        self.assertEqual([(event, data) for _, event, data in events], [
+            ('offer-candidate', {'candidate': 'candidate:1', 'sdpMid': '0'}),
+        ])
+
+    async def test_rejects_invalid_last_event_id(self):
+        await sync_to_async(self.add_offer)()
+        response = await self.subscribe(**{'Last-Event-ID': 'nobody:1'})
+        self.assertEqual(response.status_code, 400)
+
+    async def test_stream_ends(self):
+        self.assertEqual((await self.subscribe()).status_code, 404)
+
+        await sync_to_async(self.add_offer)()
+        with override_settings(SIGNALING_PUSH_MAX_DURATION=0.2):
+            start = time.monotonic()
+            await self.read_events((await self.subscribe()).streaming_content)
+            self.assertLess(time.monotonic() - start, 1)
+
+        # Streams also end once their session is deleted
+        with override_settings(SIGNALING_PUSH_MAX_DURATION=5):
+            content = aiter((await self.subscribe()).streaming_content)
+            self.assertEqual(await self.read_events(content, until='offer'), [
+                ('offerer:0', 'offer', {'type': 'offer', 'sdp': 'offer-sdp'}),
+            ])
+            await sync_to_async(Session.objects.all().delete)()
+            start = time.monotonic()
+            self.assertEqual(await self.read_events(content), [])
+            self.assertLess(time.monotonic() - start, 1)
+
+
+class QueryCountTests(SignalingTestCase):
+    """
+    Getters resolve session, role client and data in one query on the hot path.
+    """
+    def setUp(self):
+        offerer_id = self.add_offer()
+        self.answerer_id = self.add_answer()
+        self.add_candidate(offerer_id, 0)
+        self.add_candidate(self.answerer_id, 1)
+
+    def test_get_offer_sd(self):
+        with self.assertNumQueries(1):
+            response = self.post('get-offer-sd', {'pass': self.PASS})
+        self.assertEqual(response.status_code, 200)
+
+    def test_get_answer_sd(self):
+        with self.assertNumQueries(1):
+            response = self.post('get-answer-sd', {'pass': self.PASS})
+        self.assertEqual(response.status_code, 200)
+
+    def test_get_ice_candidates(self):
+        for name in ('get-offer-ice-candidates', 'get-answer-ice-candidates'):
+            with self.subTest(name=name), self.assertNumQueries(1):
+                response = self.post(name, {'pass': self.PASS})
+            self.assertEqual(len(response.json()['candidates']), 1)
+
+    def test_get_ice_candidates_without_new_ones(self):
+        cursor = self.post('get-answer-ice-candidates', {'pass': self.PASS}).json()['cursor']
+        with self.assertNumQueries(2):
+            response = self.post('get-answer-ice-candidates', {'pass': self.PASS, 'cursor': cursor})
+        self.assertEqual(response.json()['candidates'], [])
+
+    def test_add_ice_candidate(self):
+        with self.assertNumQueries(2):
+            response = self.add_candidate(self.answerer_id, 2)
+        self.assertEqual(response.status_code, 201)
+
+    def test_add_ice_candidates(self):
+        with self.assertNumQueries(2):
+            response = self.post('add-ice-candidates', {
+                'client_id': self.answerer_id,
+                'pass': self.PASS,
+                'candidates': [{'candidate': f'candidate:{index}', 'sdpMid': '0'} for index in range(2, 10)],
+            })
+        self.assertEqual(response.status_code, 201)
+
+    def test_second_answer_is_rejected(self):
+        response = self.post('add-answer-sd', {'answer': {'type': 'answer', 'sdp': 'other'}, 'pass': self.PASS})
+        self.assertEqual(response.status_code, 409)
+
+
+class StoreTestsMixin:
+    """
+    Behaviour shared by every signaling store backend.
+    """
+    def make_store(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        super().setUp()
+        self.store = self.make_store()
+
+    def test_offer_answer_and_candidates(self):
+        session_id, offerer_id = self.store.create_session('hash', '{"type":"offer"}')
+        with self.assertRaises(ClientNotFound):
+            self.store.get_description('hash', ANSWERER)
+        answer_session_id, answerer_id = self.store.add_answer('hash', '{"type":"answer"}')
+        self.assertEqual(answer_session_id, session_id)
+
+        self.assertEqual(self.store.get_description('hash', OFFERER), '{"type":"offer"}')
+        self.assertEqual(self.store.get_description('hash', ANSWERER), '{"type":"answer"}')
+
+        self.store.add_candidate('hash', offerer_id, 'offer-candidate')
+        self.store.add_candidate('hash', answerer_id, 'answer-candidate-1')
+        bodies, cursor = self.store.get_candidates('hash', ANSWERER, 0)
+        self.assertEqual(bodies, ['answer-candidate-1'])
+
+        self.store.add_candidate('hash', answerer_id, 'answer-candidate-2')
+        bodies, cursor = self.store.get_candidates('hash', ANSWERER, cursor)
+        self.assertEqual(bodies, ['answer-candidate-2'])
+        self.assertEqual(self.store.get_candidates('hash', ANSWERER, cursor), ([], cursor))
+
+    def test_lookup_by_session_id(self):
+        session_id, offerer_id = self.store.create_session('hash', 'offer')
+        other_id, _ = self.store.create_session('other', 'offer')
+        self.store.add_candidate('hash', offerer_id, 'candidate', session_id)
+        self.assertEqual(self.store.get_description('hash', OFFERER, session_id), 'offer')
+        self.assertEqual(self.store.get_candidates('hash', OFFERER, 0, session_id)[0], ['candidate'])
+        self.assertTrue(self.store.session_exists('hash', session_id))
+
+        # The id of another session, or the right id with another pass, finds nothing
+        self.assertFalse(self.store.session_exists('hash', other_id))
+        self.assertFalse(self.store.session_exists('other', session_id))
+        with self.assertRaises(SessionNotFound):
+            self.store.get_description('other', OFFERER, session_id)
+        with self.assertRaises(SessionNotFound):
+            self.store.get_candidates('other', OFFERER, 0, session_id)
+        with self.assertRaises(SessionNotFound):
+            self.store.add_answer('hash', 'answer', other_id)
+        self.assertEqual(self.store.add_answer('hash', 'answer', session_id)[0], session_id)
+
+    def test_conflicts_and_missing_data(self):
+        _, offerer_id = self.store.create_session('hash', 'offer')
+        with self.assertRaises(SessionExists):
+            self.store.create_session('hash', 'offer')
+        self.store.add_answer('hash', 'answer')
+        with self.assertRaises(AnswerExists):
+            self.store.add_answer('hash', 'answer')
+
+        with self.assertRaises(SessionNotFound):
+            self.store.add_answer('unknown', 'answer')
+        with self.assertRaises(SessionNotFound):
+            self.store.get_candidates('unknown', OFFERER, 0)
+        with self.assertRaises(ClientNotFound):
+            self.store.add_candidate('hash', offerer_id + 1000, 'candidate')
+        self.assertTrue(self.store.session_exists('hash'))
+        self.assertFalse(self.store.session_exists('unknown'))
+
+
+class DatabaseStoreTests(StoreTestsMixin, TestCase):
+    def make_store(self):
+        return DatabaseStore(ttl=60)
+
+    def expire(self, *hashpasses):
+        Session.objects.filter(hashpass__in=hashpasses).update(last_activity=timezone.now() - timedelta(seconds=61))
+
+    def test_reap_deletes_expired_sessions_in_batches(self):
+        for index in range(5):
+            _, client_id = self.store.create_session(f'hash-{index}', 'offer')
+            self.store.add_candidate(f'hash-{index}', client_id, 'candidate')
+        self.expire('hash-0', 'hash-1', 'hash-2')
+
+        self.assertEqual(self.store.reap(batch_size=2, max_batches=1), 2)
+        self.assertEqual(self.store.reap(batch_size=2), 1)
+        self.assertEqual(sorted(Session.objects.values_list('hashpass', flat=True)), ['hash-3', 'hash-4'])
+        self.assertEqual(IceCandidate.objects.count(), 2)
+
+    def test_expired_pass_can_be_reused(self):
+        self.store.create_session('hash', 'offer')
+        self.expire('hash')
+        self.store.create_session('hash', 'new-offer')
+        self.assertEqual(self.store.get_description('hash', OFFERER), 'new-offer')
+
+    def test_expired_session_is_not_found_before_it_is_reaped(self):
+        self.store.create_session('hash', 'offer')
+        _, answerer_id = self.store.add_answer('hash', 'answer')
+        session_id = Session.objects.get().id
+        self.expire('hash')
+
+        for lookup in ({}, {'session_id': session_id}):
+            with self.subTest(**lookup):
+                self.assertFalse(self.store.session_exists('hash', **lookup))
+                with self.assertRaises(SessionNotFound):
+                    self.store.get_description('hash', OFFERER, **lookup)
+                with self.assertRaises(SessionNotFound):
+                    self.store.add_answer('hash', 'answer', **lookup)
+                with self.assertRaises(SessionNotFound):
+                    self.store.add_candidate('hash', answerer_id, 'candidate', **lookup)
+                with self.assertRaises(SessionNotFound):
+                    self.store.get_candidates('hash', ANSWERER, 0, **lookup)
+        self.assertTrue(Session.objects.exists())
+        self.assertFalse(IceCandidate.objects.exists())
+
+    def test_reap_sessions_command(self):
+        self.store.create_session('hash', 'offer')
+        self.expire('hash')
+        with override_settings(SIGNALING_STORE={'BACKEND': 'api_v1.stores.database.DatabaseStore',
+                                                'OPTIONS': {'ttl': 60}}):
+            call_command('reap_sessions', stdout=io.StringIO())
+        self.assertFalse(Session.objects.exists())
+
+
+class MemoryStoreTests(StoreTestsMixin, SimpleTestCase):
+    def make_store(self):
+        return MemoryStore(ttl=60, sweep_interval=10)
+
+    def test_sessions_expire(self):
+        with mock.patch('api_v1.stores.memory.time.monotonic', return_value=1000):
+            self.store = self.make_store()
+            self.store.create_session('hash', 'offer')
+            self.store.create_session('other', 'offer')
+
+        with mock.patch('api_v1.stores.memory.time.monotonic', return_value=1061):
+            self.assertFalse(self.store.session_exists('hash'))
+            # The sweep evicts sessions nobody asks for anymore
+            self.store.create_session('new', 'offer')
+        self.assertNotIn('other', self.store._sessions)
+
+
+@unittest.skipUnless(fakeredis, "fakeredis is not installed")
+class RedisStoreTests(StoreTestsMixin, SimpleTestCase):
+    def make_store(self):
+        return RedisStore(client=fakeredis.FakeRedis(), ttl=60)
+
+    def test_keys_expire(self):
+        self.store.create_session('hash', 'offer')
+        self.assertTrue(0 < self.store.client.ttl(self.store._session_key('hash')) <= 60)
+
+    def test_client_and_ttl_are_written_in_one_transaction(self):
+        with mock.patch.object(self.store.client, 'pipeline', wraps=self.store.client.pipeline) as pipeline:
+            self.store.create_session('hash', 'offer')
+        pipeline.assert_called_once_with(transaction=True)
+        self.assertEqual(self.store.client.hkeys(self.store._session_key('hash')), [OFFERER.encode('utf-8')])
+
+
+@override_settings(SIGNALING_STORE={'BACKEND': 'api_v1.stores.memory.MemoryStore'})
+class MemoryStoreEndpointTests(SignalingTestCase):
+    def test_exchange(self):
+        offerer_id = self.add_offer()
+        self.add_answer()
+        self.add_candidate(offerer_id, 0)
+
+        self.assertEqual(self.post('get-answer-sd', {'pass': self.PASS}).json()['answer'],
+                         {'type': 'answer', 'sdp': 'answer-sdp'})
+        data = self.post('get-offer-ice-candidates', {'pass': self.PASS}).json()
+        self.assertEqual(data['candidates'], [{'candidate': 'candidate:0', 'sdpMid': '0'}])
+
+    def test_expired_session_is_not_served_from_cache(self):
+        self.PASS = 'expiring-pass' # The store outlives the tests of the class
+        with mock.patch('api_v1.stores.memory.time.monotonic', return_value=1000):
+            self.add_offer()
+            self.assertEqual(self.post('get-offer-sd', {'pass': self.PASS}).status_code, 200)
+
+        with mock.patch('api_v1.stores.memory.time.monotonic', return_value=1000 + 301):
+            self.assertEqual(self.post('get-offer-ice-candidates', {'pass': self.PASS}).status_code, 404)
+            self.assertEqual(self.post('get-offer-sd', {'pass': self.PASS}).status_code, 404)
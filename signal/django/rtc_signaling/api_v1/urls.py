@@ -7,6 +7,8 @@ urlpatterns = [
     path('get-offer-sd/', views.getOfferSessionDescription, name='get_offer_sd'),
     path('get-answer-sd/', views.getAnswerSessionDescription, name='get_answer_sd'),
     path('add-ice-candidate/', views.addIceCandidate, name='add_ice_candidate'),
+    path('add-ice-candidates/', views.addIceCandidates, name='add_ice_candidates'),
     path('get-offer-ice-candidates/', views.getOfferIceCandidates, name='get_offer_ice_candidates'),
     path('get-answer-ice-candidates/', views.getAnswerIceCandidates, name='get_answer_ice_candidates'),
+    path('subscribe/', views.subscribeSession, name='subscribe'),
 ]
@@ -1,16 +1,59 @@
+import asyncio
 import json
 import ast # Used for safely evaluating Python literal strings
-
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_GET, require_POST
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 import hashlib
+import hmac
+
+from .notifier import notifier
+from .response_cache import (
+    RenderedResponse,
+    get_description_response,
+    set_description_response,
+    invalidate_sessions,
+)
+from .stores import (
+    OFFERER,
+    ANSWERER,
+    SessionNotFound,
+    SessionExists,
+    ClientNotFound,
+    AnswerExists,
+    get_store,
+)
+
+# Keyed state of the HMAC of pass hashes, set up once and copied for each request
+PASS_HMAC = hmac.new(settings.SECRET_KEY.encode('utf-8'), digestmod=hashlib.sha256)
+
+def client_hash(password):
+    """
+    Hash of the pass as the offerer computes it client-side.
+    """
+    return hashlib.sha256(password.encode('utf-8')).hexdigest()
 
-from .models import Session, Client, SessionDescription, IceCandidate
+def keyed_hashpass(hash_pass):
+    """
+    Value sessions are stored and looked up by: an HMAC of the client-side pass hash,
+    keyed with the secret key, so it can't be derived from a pass without the key.
+    """
+    mac = PASS_HMAC.copy()
+    mac.update(hash_pass.encode('utf-8'))
+    return mac.hexdigest()
 
 # Helper function to hash passwords consistently
 def hash_password(password):
-    return hashlib.sha256(password.encode('utf-8')).hexdigest()
+    return keyed_hashpass(client_hash(password))
 
 def parse_python_dict_string(s: str):
     """
@@ -27,6 +70,134 @@ def parse_python_dict_string(s: str):
         except (ValueError, SyntaxError) as e:
             raise ValueError(f"String is neither valid JSON nor a Python literal: {s}. Error: {e}")
 
+def parse_cursor(value):
+    """
+    Parses the candidate cursor sent by the client.
+    Missing cursor means the client has not seen any candidate yet.
+    """
+    if value in (None, ''):
+        return 0
+    cursor = int(value)
+    if cursor < 0:
+        raise ValueError(f"Cursor must not be negative: {value}")
+    return cursor
+
+def parse_session_id(value):
+    """
+    Parses the optional session id issued by add-offer-sd.
+    With it sessions are looked up by id, clients that only send the pass keep working.
+    """
+    if value in (None, ''):
+        return None
+    session_id = int(value)
+    if session_id <= 0:
+        raise ValueError(f"Session id must be positive: {value}")
+    return session_id
+
+def encode_body(body):
+    """
+    Normalizes a session description or ICE candidate to canonical JSON text.
+    Bodies sent as strings (older clients) are parsed first, so every stored
+    body can be returned without parsing it again.
+    """
+    if isinstance(body, str):
+        body = parse_python_dict_string(body)
+    return json.dumps(body, separators=(',', ':'))
+
+class RawJSON(str):
+    """
+    JSON text inserted into rendered responses as is.
+    """
+
+def render_json(payload):
+    """
+    Renders a response payload, RawJSON values (stored bodies) are not encoded again.
+    """
+    return '{' + ', '.join(
+        f'{json.dumps(key)}: {value if isinstance(value, RawJSON) else json.dumps(value)}'
+        for key, value in payload.items()
+    ) + '}'
+
+def render_json_list(bodies):
+    return RawJSON('[' + ','.join(bodies) + ']')
+
+# Candidate stored after the last one of a client, passed to addIceCandidate() it ends the
+# remote candidate gathering (an RTCIceCandidateInit with an empty candidate string)
+END_OF_CANDIDATES = encode_body({'candidate': ''})
+
+def json_response(payload, status_code, request=None):
+    if isinstance(payload, RenderedResponse):
+        return rendered_response(request, payload)
+    return HttpResponse(render_json(payload), status=status_code, content_type='application/json')
+
+def rendered_response(request, rendered):
+    """
+    Returns a cached response, or 304 without a body if the client already has it (If-None-Match).
+    """
+    etags = parse_etags(request.headers.get('If-None-Match', '')) if request is not None else []
+    if rendered.etag in etags or '*' in etags:
+        response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = HttpResponse(rendered.content, content_type='application/json')
+    response['ETag'] = rendered.etag
+    return response
+
+def read_request_data(request):
+    """
+    Parses the JSON body of requests handled by plain (async) Django views.
+    """
+    if not request.body:
+        return {}
+    data = json.loads(request.body)
+    if not isinstance(data, dict):
+        raise ValueError("Request body must be a JSON object.")
+    return data
+
+def parse_wait(value):
+    """
+    Parses the long-poll 'wait' (seconds) sent by the client, capped by the server.
+    Missing wait means the request is answered immediately.
+    """
+    if value in (None, ''):
+        return 0
+    wait = float(value)
+    if wait < 0:
+        raise ValueError(f"Wait must not be negative: {value}")
+    return min(wait, settings.SIGNALING_LONG_POLL_MAX_WAIT)
+
+async def long_poll(request, session_hashpass, lookup, wait):
+    """
+    Runs the lookup and, while it reports pending data, holds the request open until
+    the session is notified or the wait expires. The store is re-checked every
+    recheck interval, so writes handled by other worker processes are picked up as well.
+    """
+    if wait <= 0:
+        payload, status_code, _ = await sync_to_async(lookup)()
+        return json_response(payload, status_code, request)
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+
+    # Subscribe before the first lookup, so a write right after it is not missed
+    with notifier.subscribe(session_hashpass) as subscription:
+        while True:
+            subscription.clear()
+            payload, status_code, pending = await sync_to_async(lookup)()
+
+            remaining = deadline - loop.time()
+            if not pending or remaining <= 0:
+                break
+
+            await subscription.wait(min(settings.SIGNALING_RECHECK_INTERVAL, remaining))
+
+    return json_response(payload, status_code, request)
+
+def notify_session(session_hashpass):
+    """
+    Wakes up subscribers of the session once the current transaction is committed.
+    """
+    transaction.on_commit(partial(notifier.notify, session_hashpass))
+
 
 @api_view(['POST'])
 def addOfferSessionDescription(request):
@@ -35,31 +206,37 @@ def addOfferSessionDescription(request):
     A new Session and Client are created.
     """
     offer_body = request.data.get('offer')
-    session_hashpass = request.data.get('hash_pass') # Hashed pass from offerer
+    hash_pass = request.data.get('hash_pass') # Hashed pass from offerer
 
-    if not offer_body or not session_hashpass:
+    if not offer_body or not hash_pass:
         return Response({"status": "error", "message": "Missing 'offer' or 'pass' in request body."},
                         status=status.HTTP_400_BAD_REQUEST)
 
     try:
-        # Create a new Session
-        session = Session.objects.create(hashpass=session_hashpass)
+        offer_body = encode_body(offer_body)
+    except (TypeError, ValueError):
+        return Response({"status": "error", "message": "Malformed 'offer' in request body."},
+                        status=status.HTTP_400_BAD_REQUEST)
 
-        # Create a new Client associated with this session (this is the offerer)
-        client = Client.objects.create(session=session)
+    session_hashpass = keyed_hashpass(hash_pass)
 
-        # Create the SessionDescription (offer) for this client
-        SessionDescription.objects.create(client=client, body=offer_body)
+    try:
+        # Create a new Session with its offerer Client and the offer
+        session_id, client_id = get_store().create_session(session_hashpass, offer_body)
+        # The pass may have belonged to an expired session, don't serve its responses
+        invalidate_sessions([session_hashpass])
+        notify_session(session_hashpass)
 
         return Response({
             "status": "success",
-            "client_id": client.id,
+            "session_id": session_id,
+            "client_id": client_id,
         }, status=status.HTTP_201_CREATED)
 
+    except SessionExists:
+        return Response({"status": "error", "message": "A session with this pass already exists."},
+                        status=status.HTTP_409_CONFLICT)
     except Exception as e:
-        if 'UNIQUE constraint failed' in str(e):
-             return Response({"status": "error", "message": "A session with this pass already exists."},
-                            status=status.HTTP_409_CONFLICT)
         return Response({"status": "error", "message": str(e)},
                         status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -77,30 +254,59 @@ def addAnswerSessionDescription(request):
         return Response({"status": "error", "message": "Missing 'answer' or 'pass' in request body."},
                         status=status.HTTP_400_BAD_REQUEST)
 
-    session_hashpass = hash_password(raw_pass) # Hash the incoming pass
+    try:
+        answer_body = encode_body(answer_body)
+    except (TypeError, ValueError):
+        return Response({"status": "error", "message": "Malformed 'answer' in request body."},
+                        status=status.HTTP_400_BAD_REQUEST)
 
     try:
-        session = Session.objects.get(hashpass=session_hashpass)
+        session_id = parse_session_id(request.data.get('session_id')) # Issued by add-offer-sd
+    except (TypeError, ValueError):
+        return Response({"status": "error", "message": "Invalid 'session_id' in request body."},
+                        status=status.HTTP_400_BAD_REQUEST)
 
-        # Create a new Client for the answerer
-        client = Client.objects.create(session=session)
+    session_hashpass = hash_password(raw_pass) # Hash the incoming pass
 
-        # Create the SessionDescription (answer) for this client
-        SessionDescription.objects.create(client=client, body=answer_body)
+    try:
+        # Create a new Client for the answerer with the answer
+        session_id, client_id = get_store().add_answer(session_hashpass, answer_body, session_id)
+        notify_session(session_hashpass)
 
+        # The answerer only knows the pass until now, later requests can send the id
         return Response({
             "status": "success",
-            "client_id": client.id,
+            "session_id": session_id,
+            "client_id": client_id,
         }, status=status.HTTP_201_CREATED)
 
-    except Session.DoesNotExist:
+    except SessionNotFound:
         return Response({"status": "error", "message": "Session not found with the provided pass."},
                         status=status.HTTP_404_NOT_FOUND)
+    except AnswerExists:
+        return Response({"status": "error", "message": "This session already has an answer."},
+                        status=status.HTTP_409_CONFLICT)
     except Exception as e:
         return Response({"status": "error", "message": str(e)},
                         status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def get_cached_description_response(session_hashpass, role, session_id):
+    """
+    Returns the cached response of the session description of the role, None on a miss.
+    The session is looked up first, so responses of expired sessions are never served
+    (stores expiring keys by themselves don't invalidate the cache).
+    Raises SessionNotFound.
+    """
+    cached = get_description_response(session_hashpass, role)
+    if cached is None:
+        return None
+    if not get_store().session_exists(session_hashpass, session_id):
+        invalidate_sessions([session_hashpass])
+        raise SessionNotFound(session_hashpass)
+    return cached
+
+
 @api_view(['POST'])
 def getOfferSessionDescription(request):
     """
@@ -113,34 +319,32 @@ def getOfferSessionDescription(request):
         return Response({"status": "error", "message": "Missing 'pass' in request body."},
                         status=status.HTTP_400_BAD_REQUEST)
 
+    try:
+        session_id = parse_session_id(request.data.get('session_id')) # Issued by add-offer-sd
+    except (TypeError, ValueError):
+        return Response({"status": "error", "message": "Invalid 'session_id' in request body."},
+                        status=status.HTTP_400_BAD_REQUEST)
+
     session_hashpass = hash_password(raw_pass) # Hash the incoming pass
 
     try:
-        session = Session.objects.get(hashpass=session_hashpass)
-        offerer_client = session.clients.order_by('id').first()
+        # The offer never changes once stored, repeated polls are served from the cache
+        cached = get_cached_description_response(session_hashpass, OFFERER, session_id)
+        if cached is not None:
+            return rendered_response(request, cached)
 
-        if not offerer_client:
-            return Response({"status": "error", "message": "No offerer found for this session."},
-                            status=status.HTTP_404_NOT_FOUND)
-
-        offer_sdp = SessionDescription.objects.get(client=offerer_client)
+        offer_body = get_store().get_description(session_hashpass, OFFERER, session_id)
 
-        try:
-            # Use the helper to parse the string into a Python dictionary
-            parsed_offer_body = parse_python_dict_string(offer_sdp.body)
-        except ValueError as e:
-            return Response({"status": "error", "message": f"Malformed offer SDP body: {e}"},
-                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-        return Response({
+        # The stored body is already JSON, it is inserted into the response as is
+        return rendered_response(request, set_description_response(session_hashpass, OFFERER, render_json({
             "status": "success",
-            "offer": parsed_offer_body
-        }, status=status.HTTP_200_OK)
+            "offer": RawJSON(offer_body)
+        })))
 
-    except Session.DoesNotExist:
+    except SessionNotFound:
         return Response({"status": "error", "message": "Session not found with the provided pass."},
                         status=status.HTTP_404_NOT_FOUND)
-    except SessionDescription.DoesNotExist:
+    except ClientNotFound:
         return Response({"status": "error", "message": "Offer SessionDescription not found for this session."},
                         status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
@@ -148,51 +352,61 @@ def getOfferSessionDescription(request):
                         status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-@api_view(['POST'])
-def getAnswerSessionDescription(request):
+def lookup_answer_session_description(session_hashpass, session_id):
     """
-    Retrieves the answer (SessionDescription) for a given session.
-    This is typically called by the offerer.
+    Looks up the answer of the session.
+    Returns the response payload, its status and whether the answer is still pending.
+    The answer never changes once stored, so its rendered response is cached.
     """
-    raw_pass = request.data.get('pass') # Unhashed pass from the client
+    try:
+        cached = get_cached_description_response(session_hashpass, ANSWERER, session_id)
+        if cached is not None:
+            return cached, status.HTTP_200_OK, False
 
-    if not raw_pass:
-        return Response({"status": "error", "message": "Missing 'pass' in request body."},
-                        status=status.HTTP_400_BAD_REQUEST)
+        answer_body = get_store().get_description(session_hashpass, ANSWERER, session_id)
+
+        # The stored body is already JSON, it is inserted into the response as is
+        return set_description_response(session_hashpass, ANSWERER, render_json({
+            "status": "success",
+            "answer": RawJSON(answer_body)
+        })), status.HTTP_200_OK, False
+
+    except SessionNotFound:
+        return ({"status": "error", "message": "Session not found with the provided pass."},
+                status.HTTP_404_NOT_FOUND, False)
+    except ClientNotFound:
+        return ({"status": "error", "message": "No answerer found yet for this session."},
+                status.HTTP_404_NOT_FOUND, True)
+    except Exception as e:
+        return ({"status": "error", "message": str(e)},
+                status.HTTP_500_INTERNAL_SERVER_ERROR, False)
 
-    session_hashpass = hash_password(raw_pass) # Hash the incoming pass
 
+@csrf_exempt
+@require_POST
+async def getAnswerSessionDescription(request):
+    """
+    Retrieves the answer (SessionDescription) for a given session.
+    This is typically called by the offerer.
+    With 'wait' (seconds) the request is held open until the answer is stored or the wait expires.
+    """
     try:
-        session = Session.objects.get(hashpass=session_hashpass)
-        clients_in_session = session.clients.order_by('id')
-        if clients_in_session.count() < 2:
-            return Response({"status": "error", "message": "No answerer found yet for this session."},
-                            status=status.HTTP_404_NOT_FOUND)
+        data = read_request_data(request)
+        wait = parse_wait(data.get('wait'))
+        session_id = parse_session_id(data.get('session_id')) # Issued by add-offer-sd
+    except (TypeError, ValueError):
+        return JsonResponse({"status": "error", "message": "Malformed request body, 'wait' or 'session_id'."},
+                            status=status.HTTP_400_BAD_REQUEST)
 
-        answerer_client = clients_in_session[1]
+    raw_pass = data.get('pass') # Unhashed pass from the client
 
-        answer_sdp = SessionDescription.objects.get(client=answerer_client)
+    if not raw_pass:
+        return JsonResponse({"status": "error", "message": "Missing 'pass' in request body."},
+                            status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            # Use the helper to parse the string into a Python dictionary
-            parsed_answer_body = parse_python_dict_string(answer_sdp.body)
-        except ValueError as e:
-            return Response({"status": "error", "message": f"Malformed offer SDP body: {e}"},
-                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        return Response({
-            "status": "success",
-            "answer": parsed_answer_body
-        }, status=status.HTTP_200_OK)
+    session_hashpass = hash_password(raw_pass) # Hash the incoming pass
 
-    except Session.DoesNotExist:
-        return Response({"status": "error", "message": "Session not found with the provided pass."},
-                        status=status.HTTP_404_NOT_FOUND)
-    except SessionDescription.DoesNotExist:
-        return Response({"status": "error", "message": "Answer SessionDescription not found for this session."},
-                        status=status.HTTP_404_NOT_FOUND)
-    except Exception as e:
-        return Response({"status": "error", "message": str(e)},
-                        status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    return await long_poll(request, session_hashpass, partial(lookup_answer_session_description, session_hashpass, session_id), wait)
 
 
 @api_view(['POST'])
@@ -208,20 +422,30 @@ def addIceCandidate(request):
         return Response({"status": "error", "message": "Missing 'client_id', 'pass', or 'candidate' in request body."},
                         status=status.HTTP_400_BAD_REQUEST)
 
-    session_hashpass = hash_password(raw_pass) # Hash the incoming pass
+    try:
+        candidate_body = encode_body(candidate_body)
+    except (TypeError, ValueError):
+        return Response({"status": "error", "message": "Malformed 'candidate' in request body."},
+                        status=status.HTTP_400_BAD_REQUEST)
 
     try:
-        session = Session.objects.get(hashpass=session_hashpass)
-        client = Client.objects.get(id=client_id, session=session)
+        session_id = parse_session_id(request.data.get('session_id')) # Issued by add-offer-sd
+    except (TypeError, ValueError):
+        return Response({"status": "error", "message": "Invalid 'session_id' in request body."},
+                        status=status.HTTP_400_BAD_REQUEST)
 
-        IceCandidate.objects.create(client=client, body=candidate_body)
+    session_hashpass = hash_password(raw_pass) # Hash the incoming pass
+
+    try:
+        get_store().add_candidate(session_hashpass, client_id, candidate_body, session_id)
+        notify_session(session_hashpass)
 
         return Response({"status": "success"}, status=status.HTTP_201_CREATED)
 
-    except Session.DoesNotExist:
+    except SessionNotFound:
         return Response({"status": "error", "message": "Session not found with the provided pass."},
                         status=status.HTTP_404_NOT_FOUND)
-    except Client.DoesNotExist:
+    except ClientNotFound:
         return Response({"status": "error", "message": "Client not found or does not belong to this session."},
                         status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
@@ -230,87 +454,262 @@ def addIceCandidate(request):
 
 
 @api_view(['POST'])
-def getOfferIceCandidates(request):
+def addIceCandidates(request):
     """
-    Retrieves ICE candidates for the client who initiated the offer in a session.
+    Adds a batch of ICE candidates for a specific client within a session at once.
+    With 'done' the end-of-candidates marker is stored after them.
     """
+    client_id = request.data.get('client_id')
     raw_pass = request.data.get('pass') # Unhashed pass from the client
+    candidate_bodies = request.data.get('candidates', [])
+    done = request.data.get('done') is True
 
-    if not raw_pass:
-        return Response({"status": "error", "message": "Missing 'pass' in request body."},
+    if not client_id or not raw_pass or not isinstance(candidate_bodies, list) or not (candidate_bodies or done):
+        return Response({"status": "error", "message": "Missing 'client_id', 'pass', or 'candidates' in request body."},
                         status=status.HTTP_400_BAD_REQUEST)
 
-    session_hashpass = hash_password(raw_pass) # Hash the incoming pass
+    try:
+        candidate_bodies = [encode_body(body) for body in candidate_bodies if body]
+    except (TypeError, ValueError):
+        return Response({"status": "error", "message": "Malformed 'candidates' in request body."},
+                        status=status.HTTP_400_BAD_REQUEST)
+    if done:
+        candidate_bodies.append(END_OF_CANDIDATES)
 
     try:
-        session = Session.objects.get(hashpass=session_hashpass)
-        offerer_client = session.clients.order_by('id').first()
+        session_id = parse_session_id(request.data.get('session_id')) # Issued by add-offer-sd
+    except (TypeError, ValueError):
+        return Response({"status": "error", "message": "Invalid 'session_id' in request body."},
+                        status=status.HTTP_400_BAD_REQUEST)
 
-        if not offerer_client:
-            return Response({"status": "error", "message": "No offerer found for this session."},
-                            status=status.HTTP_404_NOT_FOUND)
+    session_hashpass = hash_password(raw_pass) # Hash the incoming pass
 
-        raw_candidates_bodies = IceCandidate.objects.filter(client=offerer_client).values_list('body', flat=True)
-        
-        parsed_candidates = []
-        for body_string in raw_candidates_bodies:
-            try:
-                parsed_candidates.append(parse_python_dict_string(body_string))
-            except ValueError as e:
-                print(f"Warning: Malformed ICE candidate body encountered: {body_string}. Error: {e}")
-               
-        return Response({
-            "status": "success",
-            "candidates": parsed_candidates
-        }, status=status.HTTP_200_OK)
+    try:
+        get_store().add_candidates(session_hashpass, client_id, candidate_bodies, session_id)
+        notify_session(session_hashpass)
 
-    except Session.DoesNotExist:
+        return Response({"status": "success"}, status=status.HTTP_201_CREATED)
+
+    except SessionNotFound:
         return Response({"status": "error", "message": "Session not found with the provided pass."},
                         status=status.HTTP_404_NOT_FOUND)
+    except ClientNotFound:
+        return Response({"status": "error", "message": "Client not found or does not belong to this session."},
+                        status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         return Response({"status": "error", "message": str(e)},
                         status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-@api_view(['POST'])
-def getAnswerIceCandidates(request):
+def lookup_ice_candidates(session_hashpass, session_id, role, cursor):
     """
-    Retrieves ICE candidates for the client who provided the answer in a session.
+    Looks up ICE candidates of the session client with the given role stored after the cursor.
+    Returns the response payload, its status and whether no new candidates are available yet.
     """
-    raw_pass = request.data.get('pass') # Unhashed pass from the client
+    try:
+        bodies, next_cursor = get_store().get_candidates(session_hashpass, role, cursor, session_id)
+
+        return ({
+            "status": "success",
+            "candidates": render_json_list(bodies),
+            "cursor": next_cursor,
+            "complete": END_OF_CANDIDATES in bodies
+        }, status.HTTP_200_OK, not bodies)
+
+    except SessionNotFound:
+        return ({"status": "error", "message": "Session not found with the provided pass."},
+                status.HTTP_404_NOT_FOUND, False)
+    except ClientNotFound:
+        if role == OFFERER:
+            return ({"status": "error", "message": "No offerer found for this session."},
+                    status.HTTP_404_NOT_FOUND, False)
+        return ({"status": "error", "message": "No answerer found for this session yet."},
+                status.HTTP_404_NOT_FOUND, True)
+    except Exception as e:
+        return ({"status": "error", "message": str(e)},
+                status.HTTP_500_INTERNAL_SERVER_ERROR, False)
+
+
+async def get_ice_candidates(request, role):
+    """
+    Shared implementation of the ICE candidate getters.
+    """
+    try:
+        data = read_request_data(request)
+        wait = parse_wait(data.get('wait'))
+        session_id = parse_session_id(data.get('session_id')) # Issued by add-offer-sd
+    except (TypeError, ValueError):
+        return JsonResponse({"status": "error", "message": "Malformed request body, 'wait' or 'session_id'."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+    raw_pass = data.get('pass') # Unhashed pass from the client
 
     if not raw_pass:
-        return Response({"status": "error", "message": "Missing 'pass' in request body."},
-                        status=status.HTTP_400_BAD_REQUEST)
+        return JsonResponse({"status": "error", "message": "Missing 'pass' in request body."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        cursor = parse_cursor(data.get('cursor')) # Id of the last candidate the client has seen
+    except (TypeError, ValueError):
+        return JsonResponse({"status": "error", "message": "Invalid 'cursor' in request body."},
+                            status=status.HTTP_400_BAD_REQUEST)
 
     session_hashpass = hash_password(raw_pass) # Hash the incoming pass
 
-    try:
-        session = Session.objects.get(hashpass=session_hashpass)
-        clients_in_session = session.clients.order_by('id')
-        if clients_in_session.count() < 2:
-            return Response({"status": "error", "message": "No answerer found for this session yet."},
-                            status=status.HTTP_404_NOT_FOUND)
+    return await long_poll(request, session_hashpass, partial(lookup_ice_candidates, session_hashpass, session_id, role, cursor), wait)
+
+
+@csrf_exempt
+@require_POST
+async def getOfferIceCandidates(request):
+    """
+    Retrieves ICE candidates for the client who initiated the offer in a session.
+    Only candidates stored after the optional 'cursor' are returned, along with the next cursor.
+    With 'wait' (seconds) the request is held open until new candidates are stored or the wait expires.
+    """
+    return await get_ice_candidates(request, OFFERER)
+
 
-        answerer_client = clients_in_session[1]
+@csrf_exempt
+@require_POST
+async def getAnswerIceCandidates(request):
+    """
+    Retrieves ICE candidates for the client who provided the answer in a session.
+    Only candidates stored after the optional 'cursor' are returned, along with the next cursor.
+    With 'wait' (seconds) the request is held open until new candidates are stored or the wait expires.
+    """
+    return await get_ice_candidates(request, ANSWERER)
+
+
+# Event names of the descriptions streamed for each client role
+ROLE_EVENTS = {
+    OFFERER: 'offer',
+    ANSWERER: 'answer',
+}
+
+def format_event(event, data, event_id=None):
+    """
+    Formats a single server-sent event, `data` is JSON text without line breaks.
+    """
+    if event_id is None:
+        return f"event: {event}\ndata: {data}\n\n"
+    return f"id: {event_id}\nevent: {event}\ndata: {data}\n\n"
 
-        raw_candidates_bodies = IceCandidate.objects.filter(client=answerer_client).values_list('body', flat=True)
+def format_event_id(cursors):
+    """
+    Formats the stream position as an event id: the candidate cursor of each role
+    whose description was sent, e.g. "offerer:12,answerer:0".
+    """
+    return ','.join(f'{role}:{cursor}' for role, cursor in cursors.items())
 
-        parsed_candidates = []
-        for body_string in raw_candidates_bodies:
+def parse_event_id(value):
+    """
+    Parses the Last-Event-ID sent by a reconnecting EventSource back into cursors.
+    A missing id means the client has not seen any event yet.
+    """
+    cursors = {}
+    if value in (None, ''):
+        return cursors
+    for part in value.split(','):
+        role, _, cursor = part.partition(':')
+        if role not in ROLE_EVENTS:
+            raise ValueError(f"Unknown role in event id: {value}")
+        cursors[role] = parse_cursor(cursor)
+    return cursors
+
+def collect_session_events(session_hashpass, session_id, cursors):
+    """
+    Collects signaling events of the session that were not streamed yet.
+    `cursors` holds the candidate cursor of each role whose description was sent
+    and is updated in place.
+    """
+    store = get_store()
+    events = []
+
+    for role, event in ROLE_EVENTS.items():
+        if role not in cursors:
             try:
-                parsed_candidates.append(parse_python_dict_string(body_string))
-            except ValueError as e:
-                print(f"Warning: Malformed ICE candidate body encountered: {body_string}. Error: {e}")
+                body = store.get_description(session_hashpass, role, session_id)
+            except ClientNotFound:
+                continue
 
-        return Response({
-            "status": "success",
-            "candidates": parsed_candidates
-        }, status=status.HTTP_200_OK)
+            cursors[role] = 0
+            events.append((event, body))
 
-    except Session.DoesNotExist:
-        return Response({"status": "error", "message": "Session not found with the provided pass."},
-                        status=status.HTTP_404_NOT_FOUND)
-    except Exception as e:
-        return Response({"status": "error", "message": str(e)},
-                        status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        bodies, cursors[role] = store.get_candidates(session_hashpass, role, cursors[role], session_id)
+        events.extend((f"{event}-candidate", body) for body in bodies)
+
+    return events
+
+async def stream_session_events(session_hashpass, session_id=None, cursors=None):
+    """
+    Yields session events as soon as they are stored, until the session is gone.
+    Waits on the in-process notifier and re-checks the store every recheck
+    interval, so writes handled by other worker processes are picked up as well.
+    Each batch of events is yielded at once and its last event carries the stream
+    position as id, so a reconnecting client resumes after it instead of getting
+    the offer, the answer and the candidates again.
+    """
+    cursors = dict(cursors or {})
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.SIGNALING_PUSH_MAX_DURATION
+
+    with notifier.subscribe(session_hashpass) as subscription:
+        while True:
+            subscription.clear()
+            try:
+                events = await sync_to_async(collect_session_events)(session_hashpass, session_id, cursors)
+            except SessionNotFound:
+                break
+
+            if events:
+                event_id = format_event_id(cursors)
+                yield ''.join(
+                    format_event(event, data, event_id if index == len(events) - 1 else None)
+                    for index, (event, data) in enumerate(events)
+                )
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+
+            if not await subscription.wait(min(settings.SIGNALING_RECHECK_INTERVAL, remaining)):
+                yield ": keepalive\n\n"
+
+
+@require_GET
+async def subscribeSession(request):
+    """
+    Streams the offer, the answer and ICE candidates of a session as server-sent events.
+    Reconnecting clients send the id of the last event they got (Last-Event-ID) and
+    only get what was stored after it.
+    The get-* endpoints stay available as a polling fallback.
+    """
+    raw_pass = request.GET.get('pass') # Unhashed pass from the client
+
+    if not raw_pass:
+        return JsonResponse({"status": "error", "message": "Missing 'pass' in query string."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        session_id = parse_session_id(request.GET.get('session_id')) # Issued by add-offer-sd
+    except ValueError:
+        return JsonResponse({"status": "error", "message": "Invalid 'session_id' in query string."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        cursors = parse_event_id(request.headers.get('Last-Event-ID')) # Set by EventSource on reconnects
+    except ValueError:
+        return JsonResponse({"status": "error", "message": "Invalid 'Last-Event-ID' header."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+    session_hashpass = hash_password(raw_pass) # Hash the incoming pass
+
+    if not await sync_to_async(get_store().session_exists)(session_hashpass, session_id):
+        return JsonResponse({"status": "error", "message": "Session not found with the provided pass."},
+                            status=status.HTTP_404_NOT_FOUND)
+
+    response = StreamingHttpResponse(stream_session_events(session_hashpass, session_id, cursors), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no' # Disable proxy buffering
+    return response
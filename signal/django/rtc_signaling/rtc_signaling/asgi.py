@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rtc_signaling.settings')
 
 application = get_asgi_application()
+
+# Periodically delete expired signaling sessions, if enabled in settings
+from api_v1.reaper import start_reaper
+
+start_reaper()
@@ -57,6 +57,43 @@ DATABASES = {
 }
 
 
+# Signaling store
+# Backends:
+#   api_v1.stores.database.DatabaseStore - the default database (OPTIONS: ttl, activity_resolution)
+#   api_v1.stores.memory.MemoryStore - process memory, single worker process only (OPTIONS: ttl, sweep_interval)
+#   api_v1.stores.redis.RedisStore - Redis, needs the redis package (OPTIONS: url, ttl, prefix)
+# ttl is the number of seconds a session is kept after its last write
+
+SIGNALING_STORE = {
+    'BACKEND': 'api_v1.stores.database.DatabaseStore',
+    'OPTIONS': {},
+}
+
+# Seconds between runs of the in-process reaper of expired sessions, None disables it.
+# Expired sessions can also be deleted with `manage.py reap_sessions`, e.g. from cron.
+SIGNALING_REAPER_INTERVAL = None
+SIGNALING_REAPER_BATCH_SIZE = 1000
+
+
+# Signaling push (server-sent events) and long polling
+# Writes wake held requests and streams through a notifier in the worker process that
+# handled them, so instant delivery needs a single worker process (see the Dockerfile).
+# With several workers, writes handled by another one are picked up at the next recheck.
+
+# Seconds between database re-checks of held requests and streams (and keepalive comments)
+SIGNALING_RECHECK_INTERVAL = 5
+# Seconds after which a subscription stream is closed and the client has to reconnect
+SIGNALING_PUSH_MAX_DURATION = 120
+# Upper bound for the 'wait' a long-polling client may ask for, in seconds
+SIGNALING_LONG_POLL_MAX_WAIT = 30
+
+# Cache (alias in CACHES) of the rendered offer and answer responses, a shared cache such as
+# Redis lets all worker processes reuse them. Entries are dropped when their session is deleted
+# and only served while the session exists; the timeout is capped at the store's ttl.
+SIGNALING_RESPONSE_CACHE = 'default'
+SIGNALING_RESPONSE_CACHE_TIMEOUT = 300
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
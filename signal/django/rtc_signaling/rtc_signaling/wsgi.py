@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rtc_signaling.settings')
 
 application = get_wsgi_application()
+
+# Periodically delete expired signaling sessions, if enabled in settings
+from api_v1.reaper import start_reaper
+
+start_reaper()